@@ -1,22 +1,82 @@
-from fastapi import FastAPI, Query, HTTPException
-from datetime import datetime
+from fastapi import FastAPI, Query, HTTPException, Request, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import RedirectResponse
-from typing import Optional
+from starlette.responses import RedirectResponse, StreamingResponse, Response
+from pydantic import BaseModel
+from typing import List, Optional
+from contextlib import asynccontextmanager
 from uvicorn import run as app_run
-import pandas as pd
-import joblib
+import asyncio
+import hmac
+import json
 import os
+import time
 
-from src.Stock_Movement_Predicition.components.data_preprocessing import FeatureEngineering
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.components.ticker_cache import ticker_cache
+from src.Stock_Movement_Predicition.components.model_registry import model_registry
+from src.Stock_Movement_Predicition.pipeline.prediction_service import PredictionService, PredictionRequestError
+from src.Stock_Movement_Predicition.pipeline.prediction_scheduler import prediction_scheduler, AdmissionRejected
+from src.Stock_Movement_Predicition.pipeline.refresh_scheduler import RefreshScheduler, SymbolRefresher, REFRESH_ENABLED
+from src.Stock_Movement_Predicition.utils import telemetry
+from src.Stock_Movement_Predicition.utils.telemetry import span, profile_call
 
-app = FastAPI()
+PREDICT_BATCH_MAX_ITEMS = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", "1000"))
+# Endpoints that change server state need this token in the X-Admin-Token header; without
+# it set they are disabled, since CORS lets any origin call the API
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+prediction_service = PredictionService()
+# Refreshes tracked symbols after each close and warms this process's caches
+refresh_scheduler = RefreshScheduler(SymbolRefresher(prediction_service))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if REFRESH_ENABLED:
+        refresh_scheduler.start()
+    yield
+    await refresh_scheduler.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"]
 )
 
+# Cache and queue counters are read from the components when /metrics is scraped
+telemetry.register_stats("ticker_cache", ticker_cache.stats)
+telemetry.register_stats("prediction_index", prediction_service.index.stats)
+telemetry.register_stats("prediction_scheduler", prediction_scheduler.stats)
+telemetry.register_stats("refresh_scheduler", refresh_scheduler.stats)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    telemetry.HTTP_REQUESTS_IN_PROGRESS.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        telemetry.HTTP_REQUESTS_IN_PROGRESS.dec()
+        # The route template keeps label cardinality bounded (/models/{ticker}, not one per ticker)
+        route = request.scope.get("route")
+        telemetry.HTTP_REQUEST_SECONDS.labels(
+            request.method, route.path if route is not None else "unmatched", str(status)
+        ).observe(time.perf_counter() - started)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled on this server")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="A valid X-Admin-Token header is required")
+
+
 @app.get("/", tags=["home"])
 def home():
     return RedirectResponse(url="/docs")
@@ -25,109 +85,127 @@ def home():
 async def predict(
     ticker: str = Query(..., description="Stock ticker symbol, e.g., AAPL"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    profile: bool = Query(False, description="Add a sampling profile of this request (folded stacks) to the response")
 ):
     symbol = ticker.upper()
     try:
-        start = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end = datetime.strptime(end_date, "%Y-%m-%d").date()
-
-        # Load existing full dataset
-        full_path = f"data/{symbol}_full_dataset.csv"
-        if not os.path.exists(full_path):
-            raise HTTPException(status_code=404, detail="Full dataset not found.")
-        df = pd.read_csv(full_path, parse_dates=["Date"])
-        df["Date"] = pd.to_datetime(df["Date"]).dt.date
-
-        # Filter requested date range
-        requested_dates = set(pd.date_range(start, end).date)
-        available_dates = set(df["Date"].unique())
-        missing_dates = sorted(list(requested_dates - available_dates))
-
-        if missing_dates:
-            print(f"Missing dates found: {missing_dates}")
-            # Add placeholder rows
-            for date in missing_dates:
-                df = pd.concat([df, pd.DataFrame([{
-                    "Date": date,
-                    "Open": None, "High": None, "Low": None, "Close": None, "Volume": None,
-                    "sentiment_score": None, "text": None
-                }])], ignore_index=True)
-
-            df = df.drop_duplicates(subset=["Date"]).sort_values("Date")
-            df.to_csv(full_path, index=False)
-            print(f"Updated full dataset with missing dates.")
-
-        # Feature Engineering
-        fe = FeatureEngineering()
-        df_fe = fe.initiate_feature_engineering(df.copy())
-        df_fe["Date"] = pd.to_datetime(df_fe["Date"]).dt.date
-
-        # Filter engineered data to requested range
-        df_final = df_fe[(df_fe["Date"] >= start) & (df_fe["Date"] <= end)]
-
-        if df_final.empty:
-            raise HTTPException(status_code=400, detail="No feature-engineered data in range")
-
-        # Load model
-        model_path = f"models/{symbol}_lightgbm_6.pkl"
-        if not os.path.exists(model_path):
-            raise HTTPException(status_code=404, detail="Model not found.")
-        model = joblib.load(model_path)
-
-        # Get top 15 features by importance
-        if hasattr(model, "feature_importances_") and hasattr(model, "feature_name_"):
-            importance_df = pd.DataFrame({
-                "feature": model.feature_name_,
-                "importance": model.feature_importances_
-            }).sort_values(by="importance", ascending=False).head(15)
-            top_features = importance_df.to_dict(orient="records")
+        if profile:
+            if not telemetry.PROFILE_ENABLED:
+                raise HTTPException(status_code=403, detail="Profiling is disabled on this server")
+            # A profiled request gets its own computation, it is never shared with others
+            result, report = await prediction_scheduler.run(
+                ("profile", object()), profile_call, prediction_service.predict, symbol, start_date, end_date
+            )
+            result = {**result, "profile": report}
         else:
-            top_features = []
-
-        # Drop columns not used in prediction
-        drop_cols = ["Date", "target", "Open", "High", "Low", "Close", "Volume", "text", "sentiment_score"]
-        X = df_final.drop(columns=drop_cols, errors="ignore")
-
-        # Predict or use actual target
-        predictions = []
-        for i, row in df_final.iterrows():
-            date = row["Date"]
-
-            if not pd.isna(row.get("target")):
-                label = int(row["target"])
-                pred = "UP" if label == 1 else "DOWN"
-                source = "predicted"
-            else:
-                row_input = row.drop(labels=drop_cols, errors="ignore").values.reshape(1, -1)
-
-                if row_input is not None and not pd.isna(row_input).any():
-                    label = model.predict(row_input)[0]
-                    pred = "UP" if label == 1 else "DOWN"
-                    source = "predicted"
-                else:
-                    pred = "N/A"
-                    source = "insufficient_data"
-
-            predictions.append({
-                "date": str(date),
-                "prediction": pred,
-                "source": source
-            })
-
-        return {
-            "symbol": symbol,
-            "start_date": start.strftime("%Y-%m-%d"),
-            "end_date": end.strftime("%Y-%m-%d"),
-            "predictions": predictions,
-            "top_15_features": top_features
-        }
-
+            # Disk reads, feature engineering and inference run on the prediction pool; identical
+            # concurrent requests share one computation
+            result = await prediction_scheduler.run(
+                ("predict", symbol, start_date, end_date), prediction_service.predict, symbol, start_date, end_date
+            )
+        with span("predict", "serialize"):
+            body = json.dumps(result)
+        return Response(content=body, media_type="application/json")
+
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+    except PredictionRequestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Prediction failed for {symbol}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class BatchPredictionItem(BaseModel):
+    symbol: str
+    start_date: str
+    end_date: str
+
+
+class BatchPredictionRequest(BaseModel):
+    items: List[BatchPredictionItem]
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: BatchPredictionRequest):
+    if len(request.items) > PREDICT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {PREDICT_BATCH_MAX_ITEMS} items per batch")
+    try:
+        # A batch is admitted as a whole; its symbols then queue on the pool behind each other
+        prediction_scheduler.admit()
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+    # Each symbol is loaded, engineered and scored once for all of its ranges, symbols run
+    # in parallel on the prediction pool and their lines are streamed as soon as they finish
+    groups = prediction_service.group_by_symbol((item.symbol, item.start_date, item.end_date) for item in request.items)
+
+    async def run_symbol(symbol, items):
+        try:
+            return await prediction_scheduler.run(
+                ("batch", symbol, tuple(items)), prediction_service.predict_symbol_batch, symbol, items, admit=False
+            )
+        except AdmissionRejected as e:
+            return [{"index": index, "symbol": symbol, "start_date": start_date, "end_date": end_date,
+                     "error": {"status_code": e.status_code, "detail": e.detail}} for index, start_date, end_date in items]
+
+    async def stream():
+        tasks = [run_symbol(symbol, items) for symbol, items in groups.items()]
+        for task in asyncio.as_completed(tasks):
+            for record in await task:
+                yield json.dumps(record) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/metrics", tags=["metrics"])
+def metrics():
+    payload, content_type = telemetry.metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
+
+@app.get("/cache/stats", tags=["cache"])
+def cache_stats():
+    return ticker_cache.stats()
+
+@app.get("/predict/stats", tags=["cache"])
+def predict_stats():
+    return {**prediction_scheduler.stats(), "prediction_index": prediction_service.index.stats()}
+
+
+@app.get("/refresh/status", tags=["refresh"])
+def refresh_status():
+    # Without an in-process scheduler, report what a sidecar (refresh.py) last wrote
+    if refresh_scheduler.state == "stopped" and refresh_scheduler.last_run is None:
+        status = refresh_scheduler.load_status()
+        if status is not None:
+            return {**status, "source": "sidecar"}
+    return {**refresh_scheduler.status(), "source": "in_process"}
+
+@app.post("/refresh/run", tags=["refresh"], dependencies=[Depends(require_admin)])
+async def refresh_run():
+    # Refreshes every tracked symbol now, in the background
+    if refresh_scheduler.trigger() is None:
+        raise HTTPException(status_code=409, detail="A refresh is already running")
+    return {"state": "running", "tracked_symbols": refresh_scheduler.tracked_symbols()}
+
+
+@app.get("/models/{ticker}", tags=["models"])
+def model_versions(ticker: str):
+    return model_registry.versions(ticker.upper())
+
+@app.post("/models/{ticker}/promote", tags=["models"], dependencies=[Depends(require_admin)])
+def promote_model(ticker: str, version: str = Query(..., description="Registered version to make current")):
+    symbol = ticker.upper()
+    if version not in model_registry.versions(symbol)["versions"]:
+        raise HTTPException(status_code=404, detail=f"{symbol} has no model version {version}")
+    # Requests pick the new version up on their next cache lookup, no restart needed
+    model_registry.promote(symbol, version)
+    return {"symbol": symbol, "current": model_registry.current_version(symbol)}
+
+
 if __name__=="__main__":
     app_run(app,host="0.0.0.0",port=8000)
@@ -0,0 +1,375 @@
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARKS = ["features", "sentiment", "ingestion", "predict"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmarks on synthetic OHLCV and news data")
+    parser.add_argument("--symbols", type=int, default=2, help="Number of synthetic symbols")
+    parser.add_argument("--years", type=float, default=2, help="Years of daily bars per symbol")
+    parser.add_argument("--articles-per-day", type=int, default=5, help="News articles per trading day")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions of each batch benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="/predict requests in the warm and concurrent runs")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight in the concurrent /predict run")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"Comma separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", default=None, help="Earlier JSON report; adds p50 ratios against it")
+    parser.add_argument("--workdir", default=None, help="Run in this directory instead of a temporary one (kept afterwards)")
+    parser.add_argument("--verbose", action="store_true", help="Keep INFO logging from the pipeline")
+    return parser.parse_args()
+
+
+def summarize(samples):
+    # samples in seconds -> milliseconds
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "n": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "min_ms": float(ms.min()),
+        "max_ms": float(ms.max()),
+    }
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit or None, "dirty": dirty}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+# Synthetic data, deterministic for a given seed
+
+def make_stock_frame(rng, years: float, end: str = "2024-12-31"):
+    dates = pd.bdate_range(end=end, periods=int(years * 252))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(dates))))
+    open_ = close * (1 + rng.normal(0, 0.005, len(dates)))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, len(dates)))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, len(dates)))
+    volume = rng.integers(1_000_000, 50_000_000, len(dates)).astype(float)
+    return pd.DataFrame({"Date": dates, "Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume})
+
+
+WORDS = ("shares rose fell beat missed earnings guidance revenue growth outlook analysts upgrade downgrade "
+         "profit loss margin demand supply lawsuit merger buyback dividend record weak strong quarter").split()
+
+
+def make_news_frame(rng, symbol: str, dates, articles_per_day: int):
+    n = len(dates) * articles_per_day
+    words = np.asarray(WORDS)
+    headlines = [" ".join(words[rng.integers(0, len(words), rng.integers(6, 14))]) for _ in range(n)]
+    summaries = [" ".join(words[rng.integers(0, len(words), rng.integers(20, 60))]) for _ in range(n)]
+    days = np.repeat(pd.DatetimeIndex(dates).strftime("%Y-%m-%d").to_numpy(), articles_per_day)
+    return pd.DataFrame({
+        "category": "company",
+        "datetime": (pd.to_datetime(days) + pd.Timedelta(hours=14)).astype("int64") // 10**9,
+        "headline": headlines,
+        "id": np.arange(n),
+        "related": symbol,
+        "source": "benchmark",
+        "summary": summaries,
+        "fetched_date": days,
+    })
+
+
+# Tiny local stand-in for FinBERT: a hashed bag-of-words linear model run through the same
+# token-budgeted batching. Deterministic and download-free, so scoring cost depends only
+# on the number and length of the texts.
+class StandInSentimentEngine:
+    variant = "benchmark-stand-in"
+    effective_variant = variant
+    labels = ["positive", "negative", "neutral"]
+
+    def __init__(self, buckets: int = 1 << 14, seed: int = 0):
+        self.buckets = buckets
+        self.weights = np.random.default_rng(seed).normal(0, 1, (buckets, len(self.labels)))
+
+    def score(self, texts):
+        from src.Stock_Movement_Predicition.components.sentiment_engine import make_token_batches, softmax
+
+        token_ids = [[zlib.crc32(word.encode()) % self.buckets for word in text.lower().split()] for text in texts]
+        scores = np.zeros(len(texts))
+        preds = np.zeros(len(texts), dtype=np.int64)
+        for batch in make_token_batches([len(ids) for ids in token_ids]):
+            counts = np.zeros((len(batch), self.buckets))
+            for row, index in enumerate(batch):
+                np.add.at(counts[row], token_ids[index], 1.0)
+            probs = softmax(counts @ self.weights)
+            scores[batch] = probs.max(axis=1)
+            preds[batch] = probs.argmax(axis=1)
+        return scores.tolist(), [self.labels[p] for p in preds]
+
+
+def make_ingestion(cache_path: str):
+    from src.Stock_Movement_Predicition.components.data_ingestion import DataIngestion
+    from src.Stock_Movement_Predicition.components.sentiment_cache import SentimentCache
+
+    ingestion = DataIngestion()
+    ingestion.engine = StandInSentimentEngine()
+    ingestion.sentiment_cache = SentimentCache(db_path=cache_path, model_name=ingestion.engine.variant)
+    return ingestion
+
+
+def bench_sentiment(texts, repeat: int):
+    # Cold: every text goes through the model; warm: every text comes from the cache
+    cold = []
+    for i in range(repeat):
+        ingestion = make_ingestion(os.path.join("data", f"bench_sentiment_{i}.sqlite"))
+        start = time.perf_counter()
+        ingestion.perform_sentiment_analysis(texts)
+        cold.append(time.perf_counter() - start)
+    warm = timed(lambda: ingestion.perform_sentiment_analysis(texts), repeat)
+    cold = summarize(cold)
+    return {
+        "sentiment_cold": {**cold, "texts": len(texts), "texts_per_s": len(texts) / (cold["p50_ms"] / 1000)},
+        "sentiment_warm": {**warm, "texts": len(texts), "texts_per_s": len(texts) / (warm["p50_ms"] / 1000)},
+    }
+
+
+def bench_ingestion(symbols, months: int, repeat: int):
+    # Sentiment comes from a warm cache, so this is reading, aggregating, merging and writing
+    ingestion = make_ingestion(os.path.join("data", "bench_ingestion.sqlite"))
+    for symbol in symbols:
+        ingestion.initiate_data_ingestion(symbol, months)
+    result = timed(lambda: [ingestion.initiate_data_ingestion(symbol, months) for symbol in symbols], repeat)
+    return {"ingestion_merge": {**result, "symbols": len(symbols)}}
+
+
+def bench_features(symbols, repeat: int):
+    # initiate_feature_engineering end to end (features plus the dataset store write), and
+    # the feature computation alone with each backend
+    from src.Stock_Movement_Predicition.components.dataset_journal import dataset_journal
+    from src.Stock_Movement_Predicition.components.data_preprocessing import FeatureEngineering
+    from src.Stock_Movement_Predicition.components.feature_graph import feature_graph
+
+    frames = {symbol: dataset_journal.read(f"{symbol}_full_dataset") for symbol in symbols}
+    sizes = {"symbols": len(symbols), "rows": int(sum(len(df) for df in frames.values()))}
+    fe = FeatureEngineering()
+    results = {"feature_engineering": {**timed(lambda: [fe.initiate_feature_engineering(df.copy(), symbol)
+                                                        for symbol, df in frames.items()], repeat), **sizes}}
+    default_backend = feature_graph.backend
+    try:
+        for backend in ("pandas", "numpy"):
+            feature_graph.backend = backend
+            result = timed(lambda: [fe.add_features(df.copy()) for df in frames.values()], repeat)
+            results[f"features_{backend}"] = {**result, **sizes}
+    finally:
+        feature_graph.backend = default_backend
+
+    # The same universe as one panel: alignment into (fields, symbols, dates) plus every
+    # indicator and the cross-sectional features in one vectorized pass
+    from src.Stock_Movement_Predicition.components.panel import Panel
+    from src.Stock_Movement_Predicition.components.panel_features import panel_features
+    result = timed(lambda: panel_features(Panel.from_frames(frames)), repeat)
+    results["features_panel"] = {**result, **sizes}
+    return results
+
+
+def register_models(symbols):
+    # A small LightGBM model per symbol, trained on its synthetic features
+    from lightgbm import LGBMClassifier
+    from src.Stock_Movement_Predicition.components.dataset_store import dataset_store
+    from src.Stock_Movement_Predicition.components.model_registry import model_registry
+    from src.Stock_Movement_Predicition.pipeline.prediction_pipeline import NON_FEATURE_COLUMNS
+
+    for symbol in symbols:
+        df = dataset_store.read(f"{symbol}_final_dataset", date_column="Date")
+        features = [col for col in df.columns if col not in NON_FEATURE_COLUMNS and col not in ("sentiment_label", "positive_ratio", "news_count")]
+        train = df.dropna(subset=features + ["target"])
+        model = LGBMClassifier(n_estimators=50, num_leaves=15, verbose=-1)
+        model.fit(train[features], train["target"].astype(int))
+        model_registry.register(symbol, model, features=features, source="benchmark", promote=True)
+
+
+def bench_predict(symbols, n_requests: int, concurrency: int, seed: int):
+    import httpx
+    from app import app
+    from src.Stock_Movement_Predicition.components.dataset_journal import dataset_journal
+
+    spans = {}
+    for symbol in symbols:
+        dates = dataset_journal.read(f"{symbol}_full_dataset")["Date"]
+        spans[symbol] = (dates.min(), dates.max())
+
+    rng = np.random.default_rng(seed)
+
+    def random_request():
+        symbol = symbols[rng.integers(len(symbols))]
+        first, last = spans[symbol]
+        start = first + pd.Timedelta(days=int(rng.integers(0, max((last - first).days - 30, 1))))
+        end = start + pd.Timedelta(days=int(rng.integers(5, 30)))
+        return {"ticker": symbol, "start_date": start.strftime("%Y-%m-%d"), "end_date": end.strftime("%Y-%m-%d")}
+
+    async def get(client, params):
+        start = time.perf_counter()
+        response = await client.get("/predict", params=params)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            # Cold: the first request per symbol loads the dataset and model, engineers
+            # features and materializes the prediction index over the whole span
+            cold = [await get(client, {"ticker": symbol, "start_date": spans[symbol][0].strftime("%Y-%m-%d"),
+                                       "end_date": spans[symbol][1].strftime("%Y-%m-%d")}) for symbol in symbols]
+
+            warm = [await get(client, random_request()) for _ in range(n_requests)]
+
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def limited(params):
+                async with semaphore:
+                    return await get(client, params)
+
+            requests = [random_request() for _ in range(n_requests)]
+            start = time.perf_counter()
+            concurrent = await asyncio.gather(*(limited(params) for params in requests))
+            wall = time.perf_counter() - start
+            return cold, warm, concurrent, wall
+
+    cold, warm, concurrent, wall = asyncio.run(run())
+    warm_stats = summarize(warm)
+    return {
+        "predict_cold": summarize(cold),
+        "predict_warm": {**warm_stats, "requests_per_s": len(warm) / (sum(warm) or 1e-9)},
+        "predict_concurrent": {**summarize(concurrent), "concurrency": concurrency, "requests_per_s": len(concurrent) / wall},
+    }
+
+
+def add_baseline_ratios(results, baseline_path: str):
+    # ratio < 1 means faster than the baseline
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    for name, result in results.items():
+        if name in baseline and baseline[name].get("p50_ms"):
+            result["baseline_p50_ratio"] = result["p50_ms"] / baseline[name]["p50_ms"]
+
+
+def main():
+    args = parse_args()
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        sys.exit(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    if args.baseline:
+        args.baseline = os.path.abspath(args.baseline)
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    # The pipeline reads and writes data/, models/ and logs/ relative to the working
+    # directory, so everything runs in a scratch directory
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="stock-benchmark-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+
+    from src.Stock_Movement_Predicition.components.dataset_store import dataset_store
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    # The pipeline prints progress; keep stdout for the report
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        rng = np.random.default_rng(args.seed)
+        months = int(round(args.years * 12))
+        symbols = [f"SYN{i}" for i in range(args.symbols)]
+        texts = []
+        for symbol in symbols:
+            stock_df = make_stock_frame(rng, args.years)
+            news_df = make_news_frame(rng, symbol, stock_df["Date"], args.articles_per_day)
+            dataset_store.write(f"{symbol}_stock_data_{months}months", stock_df, date_column="Date")
+            dataset_store.write(f"{symbol}_finnhub_daily_news_{months}months", news_df, date_column="fetched_date")
+            texts.extend((news_df["headline"] + ". " + news_df["summary"]).tolist())
+
+        results = {}
+        if "sentiment" in selected:
+            results.update(bench_sentiment(texts, args.repeat))
+        # Later stages need the merged dataset, features and a model, timed or not
+        if "ingestion" in selected:
+            results.update(bench_ingestion(symbols, months, args.repeat))
+        else:
+            ingestion = make_ingestion(os.path.join("data", "bench_ingestion.sqlite"))
+            for symbol in symbols:
+                ingestion.initiate_data_ingestion(symbol, months)
+        if "features" in selected:
+            results.update(bench_features(symbols, args.repeat))
+        elif "predict" in selected:
+            bench_features(symbols, 1)
+        if "predict" in selected:
+            register_models(symbols)
+            results.update(bench_predict(symbols, args.requests, args.concurrency, args.seed))
+
+        if args.baseline:
+            add_baseline_ratios(results, args.baseline)
+
+        import lightgbm
+        report = {
+            "schema": 1,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "lightgbm": lightgbm.__version__,
+            },
+            "config": {
+                "symbols": args.symbols, "years": args.years, "articles_per_day": args.articles_per_day,
+                "repeat": args.repeat, "requests": args.requests, "concurrency": args.concurrency, "seed": args.seed,
+                "benchmarks": selected,
+                "env": {key: os.environ[key] for key in ("DATASET_STORE_FORMAT", "FEATURE_BACKEND", "MODEL_BACKEND",
+                                                         "PREDICT_WORKERS") if key in os.environ},
+            },
+            "results": results,
+        }
+    finally:
+        logging.disable(logging.NOTSET)
+        sys.stdout = stdout
+        os.chdir(REPO_DIR)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
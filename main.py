@@ -1,10 +1,11 @@
 import sys
 import os
+import json
+import argparse
 from datetime import datetime, timedelta
 from src.Stock_Movement_Predicition.logging import logger
 from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
-from src.Stock_Movement_Predicition.components.data_ingestion import DataIngestion
-from src.Stock_Movement_Predicition.components.data_preprocessing import FeatureEngineering
+from src.Stock_Movement_Predicition.pipeline.orchestrator import PipelineOrchestrator, STAGES, load_symbols
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,21 +15,53 @@ finn_api_key = os.getenv('finn_api_key')
 vantage_api_key = os.getenv('vantage_api_key')
 symbol = 'AAPL'
 months=24
-if __name__ == '__main__':
-    logger.info("Data Ingestion has Started")
-    data_ingestion = DataIngestion()
-    full_data = data_ingestion.initiate_data_ingestion(
-        symbol=symbol,
-        months=months
-    )
-    logger.info("Data Ingestion Completed Successfully")
 
-    logger.info("Data Preprocessing has Started Successfully")
 
-    data_preprocessing = FeatureEngineering()
-    final_data = data_preprocessing.initiate_feature_engineering(full_data)
-    logger.info("Data Preprocessing Completed Successfully")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run ingestion, sentiment and feature engineering for a universe of symbols")
+    parser.add_argument("--symbols", nargs="*", default=None, help="Symbols to process, e.g. AAPL MSFT")
+    parser.add_argument("--symbols-file", default=None, help="File with one symbol per line (or comma separated)")
+    parser.add_argument("--months", type=int, default=months)
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma separated subset of {STAGES}")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for sentiment and feature engineering")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="Threads for API fetches")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Ingest news in date-ordered chunks with bounded memory (INGESTION_MEMORY_LIMIT_MB)")
+    parser.add_argument("--panel", default=None,
+                        help="After the run, build this panel (data/panels/NAME) from the succeeded symbols and engineer its features")
+    parser.add_argument("--summary-path", default=None, help="Write the run summary as JSON to this path")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    symbols = load_symbols(args.symbols, args.symbols_file) or [symbol]
+
+    logger.info(f"Pipeline has Started for {len(symbols)} symbols")
+    orchestrator = PipelineOrchestrator(
+        months=args.months,
+        stages=args.stages.split(","),
+        workers=args.workers,
+        fetch_workers=args.fetch_workers,
+        vantage_api_key=vantage_api_key,
+        finn_api_key=finn_api_key,
+        streaming=args.streaming,
+    )
+    summary = orchestrator.run(symbols)
+    logger.info(f"Pipeline Completed in {summary['wall_seconds']:.1f}s: {len(summary['succeeded'])} succeeded, {len(summary['failed'])} failed")
 
+    for stage, timing in summary["stages"].items():
+        logger.info(f"{stage}: {timing['count']} symbols, total {timing['total_seconds']:.1f}s, mean {timing['mean_seconds']:.2f}s, max {timing['max_seconds']:.2f}s")
+    for failed_symbol, failure in summary["failed"].items():
+        logger.info(f"{failed_symbol} failed in {failure['stage']}: {failure['error']}")
 
+    if args.panel and summary["succeeded"]:
+        from src.Stock_Movement_Predicition.components.data_ingestion import DataIngestion
+        from src.Stock_Movement_Predicition.components.data_preprocessing import FeatureEngineering
 
+        panel = DataIngestion().initiate_panel_ingestion(summary["succeeded"], args.months, args.panel)
+        FeatureEngineering().initiate_panel_feature_engineering(panel, args.panel)
 
+    if args.summary_path:
+        with open(args.summary_path, "w") as f:
+            json.dump(summary, f, indent=2, default=str)
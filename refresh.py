@@ -0,0 +1,41 @@
+import sys
+import json
+import asyncio
+import argparse
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.pipeline.prediction_service import PredictionService
+from src.Stock_Movement_Predicition.pipeline.orchestrator import load_symbols
+from src.Stock_Movement_Predicition.pipeline.refresh_scheduler import RefreshScheduler, SymbolRefresher
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Refresh tracked symbols after each market close (sidecar to app.py)")
+    parser.add_argument("--symbols", nargs="*", default=None, help="Symbols to refresh (default: REFRESH_SYMBOLS or every registered model)")
+    parser.add_argument("--symbols-file", default=None, help="File with one symbol per line (or comma separated)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Symbols refreshed at the same time")
+    parser.add_argument("--jitter", type=float, default=None, help="Maximum random start delay per symbol, in seconds")
+    parser.add_argument("--once", action="store_true", help="Refresh the latest closed session now and exit")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    options = {key: value for key, value in (("concurrency", args.concurrency), ("jitter_seconds", args.jitter)) if value is not None}
+    # The prediction index and feature state it warms are on disk, so the API process
+    # serves them without recomputing; its in-memory ticker cache reloads on first use
+    scheduler = RefreshScheduler(SymbolRefresher(PredictionService()), symbols=load_symbols(args.symbols, args.symbols_file),
+                                 **options)
+
+    if args.once:
+        summary = asyncio.run(scheduler.run_once())
+        logger.info(f"Refresh finished: {summary['succeeded']} succeeded, {summary['failed']} failed")
+        print(json.dumps(scheduler.status(), indent=2, default=str))
+        sys.exit(1 if summary["failed"] else 0)
+
+    try:
+        asyncio.run(scheduler.serve())
+    except KeyboardInterrupt:
+        pass
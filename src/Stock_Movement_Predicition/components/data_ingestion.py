@@ -1,103 +1,279 @@
 import pandas as pd
+import numpy as np
 import os
 import sys
-import torch
-import torch.nn.functional as F
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import json
+import uuid
+import resource
+from datetime import date, datetime, timedelta
+from src.Stock_Movement_Predicition.logging import logger
 from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.utils.telemetry import span
+from src.Stock_Movement_Predicition.components.sentiment_cache import SentimentCache
+from src.Stock_Movement_Predicition.components.sentiment_engine import finbert_engine
+from src.Stock_Movement_Predicition.components.sentiment_aggregation import aggregate_daily_sentiment
+from src.Stock_Movement_Predicition.components.dataset_store import dataset_store
+from src.Stock_Movement_Predicition.components.dataset_journal import dataset_journal
+from src.Stock_Movement_Predicition.components.prediction_index import prediction_index
+from src.Stock_Movement_Predicition.components.panel import Panel, panel_store
+
+# Streaming ingestion: the articles of one chunk (with their texts and hashes, estimated at
+# INGESTION_MEMORY_OVERHEAD times the frame size) are kept under INGESTION_MEMORY_LIMIT_MB,
+# and no chunk spans more than INGESTION_CHUNK_DAYS days
+INGESTION_MEMORY_LIMIT_MB = float(os.getenv("INGESTION_MEMORY_LIMIT_MB", "256"))
+INGESTION_CHUNK_DAYS = int(os.getenv("INGESTION_CHUNK_DAYS", "31"))
+INGESTION_MEMORY_OVERHEAD = float(os.getenv("INGESTION_MEMORY_OVERHEAD", "3"))
 
 class DataIngestion:
     def __init__(self):
         try:
-            # Load model and tokenizer only once to avoid redundant calls
-            self.tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
-            self.model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
+            # FinBERT is loaded on first use and shared by every instance in the process
+            self.engine = finbert_engine
             self.label_mapping = {"negative": -1, "neutral": 0, "positive": 1}
-            self.id2label = self.model.config.id2label
+            # Scores already computed for the same text are reused instead of re-running FinBERT
+            self.sentiment_cache = SentimentCache(model_name=self.engine.effective_variant)
         except Exception as e:
-            raise StockMovingPredicitionException(f"Error loading tokenizer/model: {str(e)}", sys)
+            raise StockMovingPredicitionException(f"Error opening sentiment cache: {str(e)}", sys)
 
-    def perform_sentiment_analysis(self, texts):
+    def score_texts(self, texts):
         try:
-            sentiment_labels = []
-            sentiment_scores = []
-            
-            # Process texts in batches for efficiency
-            batch_size = 32  # Adjust this based on your available memory
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i:i + batch_size]
-                inputs = self.tokenizer(batch_texts, padding=True, truncation=True, return_tensors="pt")
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-
-                logits = outputs.logits
-                probs = F.softmax(logits, dim=1)
-                scores, preds = torch.max(probs, dim=1)
-
-                # Collect results for batch
-                sentiment_labels.extend([self.id2label[pred.item()].lower() for pred in preds])
-                sentiment_scores.extend(scores.tolist())
-
+            # Length-bucketed, token-budgeted batches; results come back in input order
+            sentiment_scores, sentiment_labels = self.engine.score(texts)
             sentiment_numeric = [self.label_mapping.get(label, 0) for label in sentiment_labels]
             return sentiment_scores, sentiment_numeric
         except Exception as e:
             raise StockMovingPredicitionException(f"Error during sentiment analysis: {str(e)}", sys)
 
-    def initiate_data_ingestion(self, symbol: str,months: int):
+    def perform_sentiment_analysis(self, texts):
         try:
-            # File paths
-            stock_file_path = f"data/{symbol}_stock_data_{months}months.csv"
-            news_file_path = f"data/{symbol}_finnhub_daily_news_{months}months.csv"
+            # Only texts never scored before (and each distinct text once) go to the model
+            hashes = [SentimentCache.hash_text(text) for text in texts]
+            self.sentiment_cache.model_name = self.engine.effective_variant
+            results = self.sentiment_cache.get_many(hashes)
 
-            # Read data
-            stock_df = pd.read_csv(stock_file_path)
-            news_df = pd.read_csv(news_file_path)
+            unseen = {}
+            for text_hash, text in zip(hashes, texts):
+                if text_hash not in results:
+                    unseen.setdefault(text_hash, text)
 
-            # Combine headline + summary
-            news_df["text"] = news_df["headline"].fillna('') + ". " + news_df["summary"].fillna('')
-            news_df["fetched_date"] = pd.to_datetime(news_df["fetched_date"]).dt.date
+            if unseen:
+                scores, labels = self.score_texts(list(unseen.values()))
+                scored = list(zip(unseen.keys(), scores, labels))
+                # The first scoring call validates an optimised engine and may fall back to
+                # fp32, so the new scores are stored under the variant that produced them
+                self.sentiment_cache.model_name = self.engine.effective_variant
+                self.sentiment_cache.put_many(scored)
+                results.update({text_hash: (score, label) for text_hash, score, label in scored})
 
-            # Sentiment analysis
+            logger.info(f"Sentiment cache: {len(texts) - len(unseen)} of {len(texts)} texts reused, {len(unseen)} scored")
+
+            sentiment_scores = [results[text_hash][0] for text_hash in hashes]
+            sentiment_numeric = [int(results[text_hash][1]) for text_hash in hashes]
+            return sentiment_scores, sentiment_numeric
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Error during sentiment analysis: {str(e)}", sys)
+
+    def merge_sentiment(self, stock_df, news_df):
+        # Scores the articles, aggregates them per day and joins the days that have both
+        # prices and news
+        news_df["text"] = news_df["headline"].fillna('') + ". " + news_df["summary"].fillna('')
+        news_df["fetched_date"] = pd.to_datetime(news_df["fetched_date"]).dt.normalize()
+
+        # Sentiment analysis
+        with span("ingestion", "sentiment"):
             sentiment_scores, sentiment_labels = self.perform_sentiment_analysis(news_df["text"].tolist())
+
+        with span("ingestion", "merge"):
             news_df["sentiment_score"] = sentiment_scores
             news_df["sentiment_label"] = sentiment_labels
-            news_df["is_positive"] = (news_df["sentiment_label"] == 1).astype(int)
 
-            # Aggregate sentiment by date
-            sentiment_df = news_df.groupby("fetched_date").agg(
-                sentiment_score=("sentiment_score", "mean"),
-                sentiment_label=("sentiment_label", lambda x: x.mode().iloc[0] if not x.mode().empty else 0),
-                positive_ratio=("is_positive", "mean"),
-                news_count=("is_positive", "count")
-            ).reset_index()
+            # Aggregate sentiment by date (mean score, most common label, positive share, count)
+            sentiment_df = aggregate_daily_sentiment(news_df, date_column="fetched_date")
 
-            stock_df["Date"] = pd.to_datetime(stock_df["Date"]).dt.date
+            stock_df["Date"] = pd.to_datetime(stock_df["Date"]).dt.normalize()
 
             # Merge datasets
             full_df = pd.merge(stock_df, sentiment_df, left_on="Date", right_on="fetched_date", how="inner")
             full_df.drop(columns=["fetched_date"], inplace=True)
             full_df.sort_values(by="Date", inplace=True)
-            full_df.reset_index(drop=True, inplace=True)    
+            full_df.reset_index(drop=True, inplace=True)
 
             # Handle missing values
             full_df["sentiment_score"] = full_df["sentiment_score"].fillna(0.0)
             full_df["sentiment_label"] = full_df["sentiment_label"].fillna(0).astype(int)
+        return full_df
+
+    def initiate_data_ingestion(self, symbol: str,months: int):
+        try:
+            # Read data (dates come back typed from the dataset store)
+            with span("ingestion", "load"):
+                stock_df = dataset_store.read(f"{symbol}_stock_data_{months}months", date_column="Date")
+                news_df = dataset_store.read(f"{symbol}_finnhub_daily_news_{months}months", date_column="fetched_date")
+
+            full_df = self.merge_sentiment(stock_df, news_df)
 
             # Save the merged dataset
-            os.makedirs("data", exist_ok=True)
-            full_path = f"data/{symbol}_full_dataset.csv"
-            full_df.to_csv(full_path, index=False)
+            with span("ingestion", "save"):
+                dataset_journal.write(f"{symbol}_full_dataset", full_df, date_column="Date")
+            # Historical rows may have been revised, so materialized predictions are rebuilt
+            prediction_index.invalidate(symbol)
 
-            print(f"Full dataset with sentiment saved at '{full_path}'")
+            logger.info(f"Full dataset with sentiment saved as '{symbol}_full_dataset'")
             return full_df
 
         except Exception as e:
             raise StockMovingPredicitionException(f"Error during data ingestion: {str(e)}", sys)
 
+    def checkpoint_path(self, symbol: str):
+        return os.path.join(dataset_store.data_dir, f"{symbol}_full_dataset.checkpoint.json")
 
+    def load_checkpoint(self, symbol: str, months: int):
+        # A checkpoint left by an interrupted run with the same history length is resumed
+        path = self.checkpoint_path(symbol)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            checkpoint = json.load(f)
+        return checkpoint if checkpoint.get("months") == months else None
 
+    def save_checkpoint(self, symbol: str, checkpoint):
+        path = self.checkpoint_path(symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
 
+    def read_news_chunk(self, symbol: str, months: int, start, end, fetcher=None):
+        # Articles of [start, end] from the Finnhub fetcher (its per-day disk cache makes
+        # this cheap after the fetch stage) or a range read of the stored news dataset
+        if fetcher is not None:
+            return fetcher.fetch_dataframe(symbol, start, end)
+        return dataset_store.read(f"{symbol}_finnhub_daily_news_{months}months", start=start, end=end,
+                                  date_column="fetched_date")
 
+    def next_chunk_days(self, news_df, days: int, memory_limit_mb: float, max_chunk_days: int):
+        # Sizes the next chunk from the bytes per day of the one just processed, so the
+        # articles, their texts and hashes held while scoring stay under the ceiling
+        frame_bytes = news_df.memory_usage(deep=True).sum() if len(news_df) else 0
+        bytes_per_day = INGESTION_MEMORY_OVERHEAD * frame_bytes / max(days, 1)
+        if bytes_per_day == 0:
+            return max_chunk_days
+        return int(min(max(memory_limit_mb * 1024 * 1024 // bytes_per_day, 1), max_chunk_days))
 
-        
-        
+    def initiate_streaming_ingestion(self, symbol: str, months: int, finn_api_key: str = None,
+                                     memory_limit_mb: float = INGESTION_MEMORY_LIMIT_MB,
+                                     max_chunk_days: int = INGESTION_CHUNK_DAYS):
+        # Same result as initiate_data_ingestion, built in date-ordered chunks: each chunk
+        # of news is read (or fetched), scored, aggregated per day, merged with its stock
+        # rows and appended to the dataset journal, then a checkpoint records the last
+        # finished day. Only one chunk of articles is in memory at a time, and a run that
+        # dies part way through picks up after the last checkpoint.
+        try:
+            name = f"{symbol}_full_dataset"
+            end_date = datetime.today().date()
+            start_date = end_date - timedelta(days=months * 30)
+
+            checkpoint = self.load_checkpoint(symbol, months)
+            if checkpoint is not None:
+                start_date = date.fromisoformat(checkpoint["start"])
+                logger.info(f"Resuming streaming ingestion of {symbol} after {checkpoint['through']}")
+            else:
+                checkpoint = {"months": months, "start": start_date.isoformat(), "through": None,
+                              "written": False, "chunks": 0, "articles": 0, "rows": 0}
+
+            fetcher = None
+            if finn_api_key:
+                from src.Stock_Movement_Predicition.components.news_fetcher import AsyncFinnhubNewsFetcher
+                fetcher = AsyncFinnhubNewsFetcher(api_key=finn_api_key)
+
+            chunk_start = date.fromisoformat(checkpoint["through"]) + timedelta(days=1) if checkpoint["through"] else start_date
+            chunk_days = max_chunk_days
+            while chunk_start <= end_date:
+                chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+                with span("ingestion", "load"):
+                    stock_df = dataset_store.read(f"{symbol}_stock_data_{months}months", start=chunk_start,
+                                                  end=chunk_end, date_column="Date")
+                    news_df = self.read_news_chunk(symbol, months, chunk_start, chunk_end, fetcher)
+
+                full_df = self.merge_sentiment(stock_df, news_df) if len(news_df) else None
+                with span("ingestion", "save"):
+                    if full_df is not None and not full_df.empty:
+                        if checkpoint["written"]:
+                            dataset_journal.append(name, full_df, date_column="Date")
+                        else:
+                            # The first rows replace whatever an earlier run stored
+                            dataset_journal.write(name, full_df, date_column="Date")
+                            checkpoint["written"] = True
+                        checkpoint["rows"] += len(full_df)
+                    checkpoint["through"] = chunk_end.isoformat()
+                    checkpoint["chunks"] += 1
+                    checkpoint["articles"] += len(news_df)
+                    self.save_checkpoint(symbol, checkpoint)
+
+                logger.info(f"{symbol}: streamed {chunk_start} to {chunk_end} ({len(news_df)} articles, "
+                            f"{0 if full_df is None else len(full_df)} rows)")
+                chunk_days = self.next_chunk_days(news_df, (chunk_end - chunk_start).days + 1, memory_limit_mb, max_chunk_days)
+                chunk_start = chunk_end + timedelta(days=1)
+                del stock_df, news_df, full_df
+
+            with span("ingestion", "save"):
+                if checkpoint["written"]:
+                    # Fold the appended chunks into the main store before features read it
+                    dataset_journal.compact(name, date_column="Date")
+                else:
+                    dataset_journal.write(name, self.merge_sentiment(
+                        dataset_store.read(f"{symbol}_stock_data_{months}months", date_column="Date"),
+                        pd.DataFrame(columns=["fetched_date", "headline", "summary"])), date_column="Date")
+            os.remove(self.checkpoint_path(symbol))
+            prediction_index.invalidate(symbol)
+
+            logger.info(f"Streamed {checkpoint['articles']} articles for {symbol} in {checkpoint['chunks']} chunks "
+                        f"into '{name}' ({checkpoint['rows']} rows)")
+            return {"chunks": checkpoint["chunks"], "articles": checkpoint["articles"], "rows": checkpoint["rows"],
+                    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Error during streaming data ingestion: {str(e)}", sys)
+
+    def initiate_panel_ingestion(self, symbols, months: int, name: str):
+        # Builds one panel for the universe: prices on the union of the symbols' trading
+        # days and the daily sentiment fields on the same calendar. News is scored symbol by
+        # symbol (through the sentiment cache) and only the small daily aggregates are kept,
+        # then both are scattered into the panel in one assignment each. Days without news
+        # keep NaN sentiment and a news_count of 0.
+        try:
+            with span("ingestion", "load"):
+                stock_frames = {symbol: dataset_store.read(f"{symbol}_stock_data_{months}months", date_column="Date")
+                                for symbol in symbols}
+            prices = Panel.from_frames(stock_frames, ["Open", "High", "Low", "Close", "Volume"])
+
+            daily = []
+            for symbol in symbols:
+                news_df = dataset_store.read(f"{symbol}_finnhub_daily_news_{months}months", date_column="fetched_date")
+                if news_df.empty:
+                    continue
+                news_df["text"] = news_df["headline"].fillna('') + ". " + news_df["summary"].fillna('')
+                with span("ingestion", "sentiment"):
+                    news_df["sentiment_score"], news_df["sentiment_label"] = self.perform_sentiment_analysis(news_df["text"].tolist())
+                daily.append(aggregate_daily_sentiment(news_df, date_column="fetched_date").assign(symbol=symbol))
+
+            with span("ingestion", "merge"):
+                sentiment_fields = ["sentiment_score", "sentiment_label", "positive_ratio", "news_count"]
+                if daily:
+                    sentiment = Panel.from_long(pd.concat(daily, ignore_index=True), sentiment_fields,
+                                                date_column="fetched_date", dates=prices.dates, symbols=prices.symbols)
+                    fields = {field: sentiment.field(field) for field in sentiment_fields}
+                else:
+                    fields = {field: np.full(prices.values.shape[1:], np.nan) for field in sentiment_fields}
+                # No news on a trading day means no articles, not an unknown count
+                fields["news_count"] = np.where(np.isnan(prices.field("Close")), np.nan, np.nan_to_num(fields["news_count"]))
+                panel = prices.with_fields(fields)
+
+            with span("ingestion", "save"):
+                panel_store.write(name, panel)
+            logger.info(f"Panel '{name}' ingested for {len(symbols)} symbols")
+            return panel
+
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Error during panel ingestion: {str(e)}", sys)
@@ -0,0 +1,165 @@
+import os
+import sys
+import fcntl
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.components.dataset_store import dataset_store
+from src.Stock_Movement_Predicition.components.trading_calendar import trading_calendar
+
+# Journals with at least this many rows are merged into the main store in the background.
+# Reads already merge the journal, so compaction only bounds its size; each one rewrites
+# the dataset and invalidates cached features, so it runs in batches rather than per row
+# (the refresh scheduler compacts synchronously after its nightly append)
+JOURNAL_COMPACT_ROWS = int(os.getenv("JOURNAL_COMPACT_ROWS", "64"))
+
+
+# Append-only journal next to each dataset in the store. Rows written on the request
+# path (placeholder rows for missing dates) are appended here in one write under a
+# file lock, and a single background writer later merges them into the main store.
+class DatasetJournal:
+    def __init__(self, store=dataset_store):
+        try:
+            self.store = store
+            self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-compactor")
+            self._pending = set()
+            self._pending_lock = threading.Lock()
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def journal_path(self, name: str):
+        return os.path.join(self.store.data_dir, f"{name}.journal.jsonl")
+
+    def lock_path(self, name: str):
+        return os.path.join(self.store.data_dir, f"{name}.lock")
+
+    @contextmanager
+    def lock(self, name: str, exclusive: bool = True):
+        # flock is held per open file, so it serialises threads as well as processes
+        os.makedirs(self.store.data_dir, exist_ok=True)
+        with open(self.lock_path(name), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def migrate(self, name: str, date_column: str = "Date"):
+        # A dataset that only exists as CSV is migrated under the exclusive lock before its
+        # mtime is handed out, so caches keyed on the mtime do not see it change on the
+        # first read
+        if not self.store.needs_migration(name):
+            return
+        with self.lock(name):
+            if self.store.needs_migration(name):
+                self.store.migrate_csv(name, date_column)
+
+    def mtime(self, name: str):
+        self.migrate(name)
+        base_mtime = self.store.mtime(name)
+        if os.path.exists(self.journal_path(name)):
+            return max(base_mtime, os.stat(self.journal_path(name)).st_mtime_ns)
+        return base_mtime
+
+    def journal_rows(self, name: str):
+        if not os.path.exists(self.journal_path(name)):
+            return 0
+        with open(self.journal_path(name)) as f:
+            return sum(1 for _ in f)
+
+    def _read_journal(self, name: str, date_column: str):
+        path = self.journal_path(name)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        journal_df = pd.read_json(path, lines=True, convert_dates=[date_column], dtype=False)
+        journal_df[date_column] = pd.to_datetime(journal_df[date_column])
+        return journal_df
+
+    def _merge(self, base_df, journal_df, date_column: str):
+        if journal_df is None or journal_df.empty:
+            return base_df
+        journal_df = journal_df.reindex(columns=base_df.columns)
+        for col in base_df.columns:
+            if base_df[col].dtype.kind == "f":
+                journal_df[col] = journal_df[col].astype("float64")
+        # For the same date a row with data wins over a placeholder (e.g. a session ingested
+        # after /predict journaled it), otherwise the stored row wins over the journaled one
+        merged = pd.concat([base_df, journal_df], ignore_index=True)
+        filled = merged.drop(columns=[date_column]).notna().any(axis=1)
+        merged = merged.iloc[np.argsort(~filled.to_numpy(), kind="stable")]
+        merged = merged.drop_duplicates(subset=[date_column], keep="first")
+        return merged.sort_values(date_column, kind="stable").reset_index(drop=True)
+
+    def append(self, name: str, df, date_column: str = "Date"):
+        try:
+            if df.empty:
+                return
+            payload = df.to_json(orient="records", lines=True, date_format="iso")
+            if not payload.endswith("\n"):
+                payload += "\n"
+            with self.lock(name):
+                with open(self.journal_path(name), "a") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+            logger.info(f"Journaled {len(df)} rows for {name}")
+
+            if self.journal_rows(name) >= JOURNAL_COMPACT_ROWS:
+                self.request_compaction(name, date_column)
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def read(self, name: str, date_column: str = "Date"):
+        try:
+            self.migrate(name, date_column)
+            with self.lock(name, exclusive=False):
+                base_df = self.store.read(name, date_column=date_column)
+                journal_df = self._read_journal(name, date_column)
+            # Placeholder rows journaled for closed days by older versions are left out
+            return trading_calendar.drop_placeholders(self._merge(base_df, journal_df, date_column), date_column)
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def write(self, name: str, df, date_column: str = "Date"):
+        # Full rewrites (e.g. a fresh ingestion) take the same lock as compaction
+        try:
+            with self.lock(name):
+                self.store.write(name, df, date_column=date_column)
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def compact(self, name: str, date_column: str = "Date"):
+        try:
+            with self._pending_lock:
+                self._pending.discard(name)
+            with self.lock(name):
+                journal_df = self._read_journal(name, date_column)
+                if journal_df is None:
+                    return
+                base_df = self.store.read(name, date_column=date_column)
+                merged = trading_calendar.drop_placeholders(self._merge(base_df, journal_df, date_column), date_column)
+                self.store.write(name, merged, date_column=date_column)
+                os.remove(self.journal_path(name))
+            logger.info(f"Compacted {len(journal_df)} journaled rows into {name}")
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def request_compaction(self, name: str, date_column: str = "Date"):
+        # Single background writer; a dataset already queued is not queued twice
+        with self._pending_lock:
+            if name in self._pending:
+                return
+            self._pending.add(name)
+        future = self._compactor.submit(self.compact, name, date_column)
+        future.add_done_callback(self._log_compaction_error)
+
+    def _log_compaction_error(self, future):
+        if future.exception() is not None:
+            logger.error(f"Journal compaction failed: {future.exception()}")
+
+
+dataset_journal = DatasetJournal()
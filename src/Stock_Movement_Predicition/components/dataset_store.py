@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+
+# csv (legacy text files), npy (memory-mapped column files) or parquet (needs pyarrow)
+DATASET_STORE_FORMAT = os.getenv("DATASET_STORE_FORMAT", "npy")
+
+MANIFEST_FILE = "_manifest.json"
+UNDATED_PARTITION = "undated"
+VERSION_PREFIX = "v-"
+# Suffix a legacy CSV gets once it has been migrated, so it is never read or migrated again
+MIGRATED_SUFFIX = ".migrated"
+
+
+def _to_timestamp(value):
+    return None if value is None else pd.Timestamp(value)
+
+
+class DatasetStore:
+    def __init__(self, data_dir: str = "data"):
+        try:
+            self.data_dir = data_dir
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def csv_path(self, name: str):
+        return os.path.join(self.data_dir, f"{name}.csv")
+
+    def read_csv(self, name: str, date_column: str = "Date"):
+        df = pd.read_csv(self.csv_path(name))
+        if date_column in df.columns:
+            df[date_column] = pd.to_datetime(df[date_column], errors="coerce")
+        return df
+
+    def needs_migration(self, name: str):
+        return False
+
+    def _filter_range(self, df, date_column: str, start=None, end=None):
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        if date_column not in df.columns or (start is None and end is None):
+            return df
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= (df[date_column] >= start).to_numpy()
+        if end is not None:
+            mask &= (df[date_column] <= end).to_numpy()
+        return df[mask].reset_index(drop=True)
+
+
+# Plain CSV files, kept so existing data/*.csv keep working unchanged
+class CsvDatasetStore(DatasetStore):
+    def exists(self, name: str):
+        return os.path.exists(self.csv_path(name))
+
+    def mtime(self, name: str):
+        return os.stat(self.csv_path(name)).st_mtime_ns
+
+    def read(self, name: str, start=None, end=None, columns=None, date_column: str = "Date"):
+        try:
+            df = self.read_csv(name, date_column)
+            if columns is not None:
+                df = df[[col for col in columns if col in df.columns]]
+            return self._filter_range(df, date_column, start, end)
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def write(self, name: str, df, date_column: str = "Date"):
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+            tmp_path = self.csv_path(name) + f".{uuid.uuid4().hex}.tmp"
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, self.csv_path(name))
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+
+# Typed columnar layout partitioned by month of the date column:
+#   data/{name}/_manifest.json
+#   data/{name}/v-{version}/{YYYY-MM}/...
+# Every write builds a new version directory and then replaces the manifest, which names
+# the current version, with os.replace; readers see either the old or the new version and
+# never a dataset without a manifest. A range query only opens the partitions it overlaps.
+# Datasets that only exist as CSV are read from the CSV until DatasetJournal.migrate moves
+# them to this layout.
+class PartitionedDatasetStore(DatasetStore):
+    def dataset_dir(self, name: str):
+        return os.path.join(self.data_dir, name)
+
+    def version_dir(self, name: str, manifest):
+        # Datasets written before versioning keep their partitions in the dataset directory
+        version = manifest.get("version")
+        return os.path.join(self.dataset_dir(name), version) if version else self.dataset_dir(name)
+
+    def manifest_path(self, name: str):
+        return os.path.join(self.dataset_dir(name), MANIFEST_FILE)
+
+    def load_manifest(self, name: str):
+        with open(self.manifest_path(name)) as f:
+            return json.load(f)
+
+    def exists(self, name: str):
+        return os.path.exists(self.manifest_path(name)) or os.path.exists(self.csv_path(name))
+
+    def needs_migration(self, name: str):
+        return not os.path.exists(self.manifest_path(name)) and os.path.exists(self.csv_path(name))
+
+    def mtime(self, name: str):
+        # The manifest is replaced on every write and never removed, so once a dataset is
+        # migrated its mtime never falls back to the (retired) CSV
+        if os.path.exists(self.manifest_path(name)):
+            return os.stat(self.manifest_path(name)).st_mtime_ns
+        return os.stat(self.csv_path(name)).st_mtime_ns
+
+    def _column_kind(self, series):
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return "datetime"
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            return "numeric"
+        return "string"
+
+    def _partition_keys(self, df, date_column: str):
+        if date_column not in df.columns:
+            return pd.Series(UNDATED_PARTITION, index=df.index)
+        return df[date_column].dt.strftime("%Y-%m").fillna(UNDATED_PARTITION)
+
+    def _partitions_in_range(self, manifest, start=None, end=None):
+        partitions = manifest["partitions"]
+        if start is None and end is None:
+            return partitions
+        low = start.strftime("%Y-%m") if start is not None else None
+        high = end.strftime("%Y-%m") if end is not None else None
+        return [
+            p for p in partitions
+            if p != UNDATED_PARTITION and (low is None or p >= low) and (high is None or p <= high)
+        ]
+
+    def write(self, name: str, df, date_column: str = "Date"):
+        try:
+            # Object columns that only hold numbers and None (e.g. placeholder rows) get a real dtype
+            df = df.reset_index(drop=True).infer_objects()
+            if date_column in df.columns:
+                df[date_column] = pd.to_datetime(df[date_column], errors="coerce")
+                df = df.sort_values(date_column, kind="stable").reset_index(drop=True)
+
+            columns = [{"name": col, "kind": self._column_kind(df[col]), "dtype": str(df[col].dtype)} for col in df.columns]
+            keys = self._partition_keys(df, date_column)
+            partitions = sorted(keys.unique().tolist())
+
+            # Build the new version next to the current one, then point the manifest at it
+            dataset_dir = self.dataset_dir(name)
+            os.makedirs(dataset_dir, exist_ok=True)
+            version = f"{VERSION_PREFIX}{uuid.uuid4().hex}"
+            tmp_dir = os.path.join(dataset_dir, f".{version}.tmp")
+            os.makedirs(tmp_dir)
+            for partition in partitions:
+                part_dir = os.path.join(tmp_dir, partition)
+                os.makedirs(part_dir)
+                self._write_partition(part_dir, df[(keys == partition).to_numpy()], columns)
+            os.rename(tmp_dir, os.path.join(dataset_dir, version))
+
+            previous = self.load_manifest(name).get("version") if os.path.exists(self.manifest_path(name)) else None
+            tmp_manifest = os.path.join(dataset_dir, f".{MANIFEST_FILE}.{uuid.uuid4().hex}.tmp")
+            with open(tmp_manifest, "w") as f:
+                json.dump({
+                    "format": self.format,
+                    "version": version,
+                    "date_column": date_column,
+                    "columns": columns,
+                    "partitions": partitions,
+                    "rows": len(df),
+                }, f)
+            os.replace(tmp_manifest, self.manifest_path(name))
+            self._retire_versions(name, keep={version, previous})
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def _retire_versions(self, name: str, keep):
+        # The previous version stays for readers that loaded the old manifest a moment ago;
+        # older versions and partitions from the unversioned layout are removed
+        dataset_dir = self.dataset_dir(name)
+        for entry in os.listdir(dataset_dir):
+            if entry == MANIFEST_FILE or entry in keep or entry.startswith("."):
+                continue
+            path = os.path.join(dataset_dir, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def read(self, name: str, start=None, end=None, columns=None, date_column: str = "Date"):
+        try:
+            while True:
+                manifest = self.load_manifest(name) if os.path.exists(self.manifest_path(name)) else None
+                try:
+                    return self._read_version(name, manifest, start, end, columns, date_column)
+                except FileNotFoundError:
+                    # A writer retired the version (or migrated the CSV) this read started
+                    # from; read again from the current manifest
+                    current = self.load_manifest(name) if os.path.exists(self.manifest_path(name)) else None
+                    if current == manifest:
+                        raise
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def _read_version(self, name: str, manifest, start=None, end=None, columns=None, date_column: str = "Date"):
+        if manifest is None:
+            # Not migrated yet: read the CSV as it is, migrating is left to the journal's
+            # exclusive lock
+            df = self.read_csv(name, date_column)
+            if columns is not None:
+                df = df[[col for col in columns if col in df.columns]]
+            return self._filter_range(df, date_column, start, end)
+
+        date_column = manifest["date_column"]
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        schema = [col for col in manifest["columns"] if columns is None or col["name"] in columns]
+        version_dir = self.version_dir(name, manifest)
+        frames = [
+            self._read_partition(os.path.join(version_dir, partition), schema, date_column, start, end)
+            for partition in self._partitions_in_range(manifest, start, end)
+        ]
+        if not frames:
+            return pd.DataFrame({col["name"]: pd.Series(dtype=col["dtype"] if col["kind"] != "string" else object) for col in schema})
+        return pd.concat(frames, ignore_index=True)
+
+    def migrate_csv(self, name: str, date_column: str = "Date"):
+        # Callers hold the dataset's exclusive lock (DatasetJournal.migrate). The CSV is
+        # renamed once its rows are in the store, so it can never be migrated over newer data.
+        logger.info(f"Migrating {self.csv_path(name)} to the {self.format} dataset store")
+        self.write(name, self.read_csv(name, date_column), date_column)
+        os.replace(self.csv_path(name), self.csv_path(name) + MIGRATED_SUFFIX)
+
+
+# One .npy file per column and partition, opened with mmap_mode so a query only
+# pages in the rows it slices. Strings are fixed-width unicode plus a null mask.
+class NpyDatasetStore(PartitionedDatasetStore):
+    format = "npy"
+
+    def _write_partition(self, part_dir: str, df, columns):
+        for col in columns:
+            series = df[col["name"]]
+            if col["kind"] == "datetime":
+                values = series.to_numpy(dtype="datetime64[ns]")
+            elif col["kind"] == "numeric":
+                values = series.to_numpy()
+            else:
+                nulls = series.isna().to_numpy()
+                np.save(os.path.join(part_dir, f"{col['name']}.null.npy"), nulls)
+                values = np.where(nulls, "", series.astype(str).to_numpy()).astype(str)
+            np.save(os.path.join(part_dir, f"{col['name']}.npy"), values)
+
+    def _read_partition(self, part_dir: str, schema, date_column: str, start=None, end=None):
+        lo, hi = 0, None
+        if date_column in [col["name"] for col in schema] or start is not None or end is not None:
+            dates = np.load(os.path.join(part_dir, f"{date_column}.npy"), mmap_mode="r")
+            # Rows are sorted by date on write, so the requested slice is a binary search away
+            lo = int(np.searchsorted(dates, start.to_datetime64(), side="left")) if start is not None else 0
+            hi = int(np.searchsorted(dates, end.to_datetime64(), side="right")) if end is not None else len(dates)
+
+        data = {}
+        for col in schema:
+            values = np.load(os.path.join(part_dir, f"{col['name']}.npy"), mmap_mode="r")[lo:hi]
+            if col["kind"] == "string":
+                nulls = np.load(os.path.join(part_dir, f"{col['name']}.null.npy"), mmap_mode="r")[lo:hi]
+                values = values.astype(object)
+                values[nulls] = np.nan
+            else:
+                values = np.array(values)
+            data[col["name"]] = values
+        return pd.DataFrame(data)
+
+
+# One Parquet file per partition, read back with memory mapping
+class ParquetDatasetStore(PartitionedDatasetStore):
+    format = "parquet"
+
+    def __init__(self, data_dir: str = "data"):
+        try:
+            super().__init__(data_dir)
+            import pyarrow.parquet as pq
+            self._pq = pq
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Parquet dataset store needs pyarrow: {str(e)}", sys)
+
+    def _write_partition(self, part_dir: str, df, columns):
+        df.to_parquet(os.path.join(part_dir, "part.parquet"), index=False)
+
+    def _read_partition(self, part_dir: str, schema, date_column: str, start=None, end=None):
+        table = self._pq.read_table(
+            os.path.join(part_dir, "part.parquet"),
+            columns=list(dict.fromkeys([col["name"] for col in schema] + [date_column])),
+            memory_map=True,
+        )
+        df = self._filter_range(table.to_pandas(), date_column, start, end)
+        return df[[col["name"] for col in schema]]
+
+
+def get_dataset_store(fmt: str = None, data_dir: str = "data"):
+    fmt = (fmt or DATASET_STORE_FORMAT).lower()
+    stores = {"csv": CsvDatasetStore, "npy": NpyDatasetStore, "parquet": ParquetDatasetStore}
+    if fmt not in stores:
+        raise ValueError(f"Unknown dataset store format '{fmt}', expected one of {sorted(stores)}")
+    return stores[fmt](data_dir)
+
+
+dataset_store = get_dataset_store()
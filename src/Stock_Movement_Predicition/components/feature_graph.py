@@ -0,0 +1,199 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import ta
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.components.indicator_kernels import INDICATORS
+
+# pandas (pandas/ta operations, the reference) or numpy (indicator_kernels.py, equal within
+# floating point tolerance, see FeatureGraph.parity)
+FEATURE_BACKEND = os.getenv("FEATURE_BACKEND", "pandas")
+
+
+# One engineered column: the columns it reads, how to compute it, and a key naming the
+# computation itself. Nodes that share a key (volatility and rolling_std_5 are the same
+# rolling std) are computed once.
+class FeatureNode:
+    def __init__(self, name: str, inputs, compute, key=None, group: str = None):
+        self.name = name
+        self.inputs = list(inputs)
+        self.compute = compute
+        self.key = key or name
+        self.group = group
+
+
+# Shared intermediates for one pass over a frame, so e.g. SMA_5 and rolling_std_5 reuse
+# the same rolling window over lag_1_close and the dates are parsed once
+class FeatureContext:
+    def __init__(self, df):
+        self.df = df
+        self._rolling = {}
+        self._dates = None
+        self._arrays = {}
+
+    def __getitem__(self, column: str):
+        return self.df[column]
+
+    def rolling(self, column: str, window: int):
+        if (column, window) not in self._rolling:
+            self._rolling[(column, window)] = self.df[column].rolling(window=window)
+        return self._rolling[(column, window)]
+
+    def dates(self):
+        if self._dates is None:
+            self._dates = pd.to_datetime(self.df['Date'])
+        return self._dates
+
+    def array(self, column: str):
+        # Column accessor for the NumPy kernels; kernel results are kept here as arrays
+        if column not in self._arrays:
+            if column == 'Date':
+                self._arrays[column] = self.dates().to_numpy().astype('datetime64[D]')
+            elif column not in self.df.columns and column in INDICATORS:
+                self._arrays[column] = INDICATORS[column](self.array)
+            else:
+                self._arrays[column] = self.df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        return self._arrays[column]
+
+
+def _dates(ctx):
+    return ctx.dates()
+
+
+def _news_count(ctx):
+    # 1 when the row has non-blank text
+    text = ctx['text']
+    present = text.notna()
+    if present.any():
+        present &= text.astype(str).str.strip().ne('')
+    return present.astype(int)
+
+
+# Declared in the order FeatureEngineering has always produced its columns, which is also
+# a valid evaluation order
+FEATURE_NODES = [
+    FeatureNode('lag_1_close', ['Close'], lambda c: c['Close'].shift(1), group='price'),
+    FeatureNode('lag_1_open', ['Open'], lambda c: c['Open'].shift(1), group='price'),
+    FeatureNode('lag_1_high', ['High'], lambda c: c['High'].shift(1), group='price'),
+    FeatureNode('lag_1_low', ['Low'], lambda c: c['Low'].shift(1), group='price'),
+    FeatureNode('lag_1_volume', ['Volume'], lambda c: c['Volume'].shift(1), group='price'),
+    FeatureNode('lag_1_return', ['lag_1_close', 'lag_1_open'],
+                lambda c: (c['lag_1_close'] - c['lag_1_open']) / c['lag_1_open'], group='price'),
+    FeatureNode('lag_2_return', ['lag_1_return'], lambda c: c['lag_1_return'].shift(1), group='price'),
+    FeatureNode('lag_3_return', ['lag_1_return'], lambda c: c['lag_1_return'].shift(2), group='price'),
+    FeatureNode('cumulative_return_3', ['lag_1_return'], lambda c: c.rolling('lag_1_return', 3).sum(), group='price'),
+    FeatureNode('SMA_5', ['lag_1_close'], lambda c: c.rolling('lag_1_close', 5).mean(), group='price'),
+    FeatureNode('SMA_10', ['lag_1_close'], lambda c: c.rolling('lag_1_close', 10).mean(), group='price'),
+    FeatureNode('EMA_10', ['lag_1_close'], lambda c: c['lag_1_close'].ewm(span=10, adjust=False).mean(), group='price'),
+    FeatureNode('EMA_20', ['lag_1_close'], lambda c: c['lag_1_close'].ewm(span=20, adjust=False).mean(), group='price'),
+    FeatureNode('MACD', ['lag_1_close'], lambda c: ta.trend.macd(c['lag_1_close']), group='price'),
+    FeatureNode('RSI', ['lag_1_close'], lambda c: ta.momentum.rsi(c['lag_1_close']), group='price'),
+    FeatureNode('bollinger_h', ['lag_1_close'], lambda c: ta.volatility.bollinger_hband(c['lag_1_close']), group='price'),
+    FeatureNode('bollinger_l', ['lag_1_close'], lambda c: ta.volatility.bollinger_lband(c['lag_1_close']), group='price'),
+    FeatureNode('volatility', ['lag_1_close'], lambda c: c.rolling('lag_1_close', 5).std(),
+                key=('rolling_std', 'lag_1_close', 5), group='price'),
+    FeatureNode('rolling_std_5', ['lag_1_close'], lambda c: c.rolling('lag_1_close', 5).std(),
+                key=('rolling_std', 'lag_1_close', 5), group='price'),
+    FeatureNode('close_to_open_ratio', ['lag_1_close', 'lag_1_open'],
+                lambda c: c['lag_1_close'] / c['lag_1_open'], group='price'),
+    FeatureNode('high_to_low_ratio', ['lag_1_high', 'lag_1_low'],
+                lambda c: c['lag_1_high'] / c['lag_1_low'], group='price'),
+
+    FeatureNode('volume_change', ['lag_1_volume'], lambda c: c['lag_1_volume'].pct_change(fill_method=None), group='volume'),
+    FeatureNode('volume_SMA_5', ['lag_1_volume'], lambda c: c.rolling('lag_1_volume', 5).mean(), group='volume'),
+    FeatureNode('lag_2_volume', ['lag_1_volume'], lambda c: c['lag_1_volume'].shift(1), group='volume'),
+
+    FeatureNode('sentiment_momentum', ['sentiment_score'], lambda c: c['sentiment_score'].diff(), group='sentiment'),
+    FeatureNode('rolling_sentiment_3', ['sentiment_score'], lambda c: c.rolling('sentiment_score', 3).mean(), group='sentiment'),
+    FeatureNode('news_count', ['text'], _news_count, group='sentiment'),
+
+    FeatureNode('day_of_week', ['Date'], lambda c: _dates(c).dt.dayofweek, group='temporal'),
+    FeatureNode('month', ['Date'], lambda c: _dates(c).dt.month, group='temporal'),
+    FeatureNode('quarter', ['Date'], lambda c: _dates(c).dt.quarter, group='temporal'),
+    FeatureNode('is_month_end', ['Date'], lambda c: _dates(c).dt.is_month_end.astype(int), group='temporal'),
+
+    # Left as NaN when the next close is not known yet, those rows are the ones to predict
+    FeatureNode('target', ['Close'], lambda c: (c['Close'].shift(-1) > c['Close']).astype(int).where(
+        c['Close'].shift(-1).notna() & c['Close'].notna()), group='target'),
+]
+
+
+class FeatureGraph:
+    def __init__(self, nodes=FEATURE_NODES, backend: str = FEATURE_BACKEND):
+        try:
+            if backend not in ("pandas", "numpy"):
+                raise ValueError(f"Unknown feature backend '{backend}', expected pandas or numpy")
+            self.backend = backend
+            self.nodes = {node.name: node for node in nodes}
+            self.order = [node.name for node in nodes]
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def group(self, group: str):
+        return [name for name in self.order if self.nodes[name].group == group]
+
+    def plan(self, outputs, available_columns):
+        # Requested nodes plus everything they depend on, in declaration order. A node whose
+        # raw inputs are missing is skipped (e.g. sentiment features without sentiment_score).
+        available = set(available_columns)
+        needed, stack = set(), list(outputs)
+        while stack:
+            name = stack.pop()
+            if name in needed or name not in self.nodes:
+                continue
+            needed.add(name)
+            stack.extend(self.nodes[name].inputs)
+
+        computable = set()
+        plan = []
+        for name in self.order:
+            node = self.nodes[name]
+            if name in needed and all(col in computable or (col in available and col not in self.nodes) for col in node.inputs):
+                computable.add(name)
+                plan.append(node)
+        return plan
+
+    def compute(self, df, outputs=None, backend: str = None):
+        # Adds the requested columns (all of them when outputs is None) to df in place.
+        # Nodes without a NumPy kernel (news_count, target) always use pandas.
+        try:
+            use_kernels = (backend or self.backend) == "numpy"
+            plan = self.plan(self.order if outputs is None else outputs, df.columns)
+            ctx = FeatureContext(df)
+            computed = {}
+            for node in plan:
+                if node.key not in computed:
+                    if use_kernels and node.name in INDICATORS:
+                        computed[node.key] = ctx._arrays[node.name] = INDICATORS[node.name](ctx.array)
+                    else:
+                        computed[node.key] = node.compute(ctx)
+                df[node.name] = computed[node.key]
+            return df
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def parity(self, df, outputs=None, rtol: float = 1e-9, atol: float = 1e-9):
+        # Computes the features with both backends and compares them column by column: the
+        # NaN positions must match exactly, values within rtol/atol
+        try:
+            reference = self.compute(df.copy(), outputs, backend="pandas")
+            candidate = self.compute(df.copy(), outputs, backend="numpy")
+            report = {}
+            for column in candidate.columns.difference(df.columns, sort=False):
+                expected = reference[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                actual = candidate[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                nan_mismatches = int((np.isnan(expected) != np.isnan(actual)).sum())
+                both = np.isfinite(expected) & np.isfinite(actual)
+                max_abs_diff = float(np.abs(expected[both] - actual[both]).max(initial=0.0))
+                report[column] = {
+                    "max_abs_diff": max_abs_diff,
+                    "nan_mismatches": nan_mismatches,
+                    "ok": nan_mismatches == 0 and bool(np.allclose(expected, actual, rtol=rtol, atol=atol, equal_nan=True)),
+                }
+            return report
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+
+feature_graph = FeatureGraph()
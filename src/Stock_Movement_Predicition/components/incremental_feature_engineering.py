@@ -0,0 +1,411 @@
+import os
+import sys
+import copy
+import math
+import uuid
+from collections import deque
+import joblib
+import numpy as np
+import pandas as pd
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.components.data_preprocessing import FeatureEngineering
+
+# Raw rows before the first new row that the stateless features look back over
+# (lag_3_return needs the close/open three sessions back)
+TAIL_CONTEXT_ROWS = 3
+
+RAW_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume", "sentiment_score", "text"]
+# Engineered rows kept in the small state file before they are folded into the base file;
+# an update re-engineers and rewrites only these, folding rewrites the whole history once
+# per this many rows
+FEATURE_TAIL_ROWS = int(os.getenv("FEATURE_TAIL_ROWS", "256"))
+
+# Inputs of the indicator state machine, always engineered when a subset is requested
+STATE_INPUTS = ["lag_1_close", "lag_1_return", "lag_1_volume", "target"]
+
+
+# Fixed-window rolling sum/mean/var with the same add/remove accumulators pandas keeps
+# internally (Kahan compensated sums and Welford updates), so values continue bit-for-bit
+class RollingWindowState:
+    def __init__(self, window: int, kind: str, ddof: int = 1):
+        self.window = window
+        self.kind = kind
+        self.ddof = ddof
+        self.values = deque()
+        self.count = 0
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.neg_ct = 0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = math.nan
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        if self.kind == "var":
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+            prev_mean = self.mean_x - self.compensation_add
+            y = val - self.compensation_add
+            t = y - self.mean_x
+            self.compensation_add = t + self.mean_x - y
+            self.mean_x = self.mean_x + t / self.nobs
+            self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+            return
+        y = val - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        if val == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = val
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        if self.kind == "var":
+            if self.nobs:
+                prev_mean = self.mean_x - self.compensation_remove
+                y = val - self.compensation_remove
+                t = y - self.mean_x
+                self.compensation_remove = t + self.mean_x - y
+                self.mean_x = self.mean_x - t / self.nobs
+                self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+            else:
+                self.mean_x = 0.0
+                self.ssqdm_x = 0.0
+            return
+        y = -val - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def _result(self):
+        minp = self.window
+        if self.kind == "sum":
+            if self.nobs >= minp:
+                if self.num_consecutive_same_value >= self.nobs:
+                    return self.prev_value * self.nobs
+                return self.sum_x
+            return math.nan
+        if self.kind == "mean":
+            if self.nobs >= minp and self.nobs > 0:
+                result = self.sum_x / self.nobs
+                if self.num_consecutive_same_value >= self.nobs:
+                    result = self.prev_value
+                elif self.neg_ct == 0 and result < 0:
+                    result = 0.0
+                elif self.neg_ct == self.nobs and result > 0:
+                    result = 0.0
+                return result
+            return math.nan
+        if self.nobs >= minp and self.nobs > self.ddof:
+            if self.nobs == 1 or self.num_consecutive_same_value >= self.nobs:
+                return 0.0
+            return self.ssqdm_x / (self.nobs - self.ddof)
+        return math.nan
+
+    def update(self, val):
+        val = float(val)
+        if self.count == 0:
+            self.prev_value = val
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self._add(val)
+        self.values.append(val)
+        self.count += 1
+        result = self._result()
+        if self.kind == "var":
+            # pandas' rolling std is sqrt of the rolling var with negatives clipped to 0
+            return math.sqrt(result) if result >= 0 else (0.0 if result == result else math.nan)
+        return result
+
+
+# Exponentially weighted mean (adjust=False) following pandas' recursive ewm update
+class EwmState:
+    def __init__(self, com: float, min_periods: int = 0):
+        alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = alpha
+        self.minp = max(int(min_periods), 1)
+        self.count = 0
+        self.nobs = 0
+        self.weighted = math.nan
+        self.old_wt = 1.0
+
+    @classmethod
+    def from_span(cls, span: int, min_periods: int = 0):
+        return cls((span - 1) / 2.0, min_periods)
+
+    @classmethod
+    def from_alpha(cls, alpha: float, min_periods: int = 0):
+        return cls(1.0 / alpha - 1, min_periods)
+
+    def update(self, cur):
+        cur = float(cur)
+        is_observation = cur == cur
+        if self.count == 0:
+            self.weighted = cur
+            self.nobs = int(is_observation)
+            self.old_wt = 1.0
+        else:
+            self.nobs += int(is_observation)
+            if self.weighted == self.weighted:
+                self.old_wt *= self.old_wt_factor
+                if is_observation:
+                    if self.weighted != cur:
+                        self.weighted = self.old_wt * self.weighted + self.new_wt * cur
+                        self.weighted /= (self.old_wt + self.new_wt)
+                    self.old_wt = 1.0
+            elif is_observation:
+                self.weighted = cur
+        self.count += 1
+        return self.weighted if self.nobs >= self.minp else math.nan
+
+
+class IndicatorState:
+    def __init__(self, has_sentiment: bool):
+        self.sma_5 = RollingWindowState(5, "mean")
+        self.sma_10 = RollingWindowState(10, "mean")
+        self.std_5 = RollingWindowState(5, "var", ddof=1)
+        self.bollinger_mavg = RollingWindowState(20, "mean")
+        self.bollinger_mstd = RollingWindowState(20, "var", ddof=0)
+        self.cumulative_return_3 = RollingWindowState(3, "sum")
+        self.volume_sma_5 = RollingWindowState(5, "mean")
+        self.ema_10 = EwmState.from_span(10)
+        self.ema_20 = EwmState.from_span(20)
+        self.macd_fast = EwmState.from_span(12, min_periods=12)
+        self.macd_slow = EwmState.from_span(26, min_periods=26)
+        self.rsi_up = EwmState.from_alpha(1 / 14, min_periods=14)
+        self.rsi_down = EwmState.from_alpha(1 / 14, min_periods=14)
+        self.rolling_sentiment_3 = RollingWindowState(3, "mean") if has_sentiment else None
+
+    def update(self, lag_1_close, close_diff, lag_1_return, lag_1_volume, sentiment_score):
+        row = {}
+        row['SMA_5'] = self.sma_5.update(lag_1_close)
+        row['SMA_10'] = self.sma_10.update(lag_1_close)
+        row['EMA_10'] = self.ema_10.update(lag_1_close)
+        row['EMA_20'] = self.ema_20.update(lag_1_close)
+
+        fast = self.macd_fast.update(lag_1_close)
+        slow = self.macd_slow.update(lag_1_close)
+        row['MACD'] = fast - slow
+
+        # ta's RSI maps a missing diff to 0.0 on both sides before smoothing
+        up = close_diff if close_diff > 0 else 0.0
+        down = -(close_diff if close_diff < 0 else 0.0)
+        ema_up = self.rsi_up.update(up)
+        ema_down = self.rsi_down.update(down)
+        if ema_down == 0:
+            row['RSI'] = 100.0
+        else:
+            row['RSI'] = float(100 - (100 / (1 + np.float64(ema_up) / np.float64(ema_down))))
+
+        mavg = self.bollinger_mavg.update(lag_1_close)
+        mstd = self.bollinger_mstd.update(lag_1_close)
+        row['bollinger_h'] = mavg + 2 * mstd
+        row['bollinger_l'] = mavg - 2 * mstd
+
+        std_5 = self.std_5.update(lag_1_close)
+        row['volatility'] = std_5
+        row['rolling_std_5'] = std_5
+
+        row['cumulative_return_3'] = self.cumulative_return_3.update(lag_1_return)
+        row['volume_SMA_5'] = self.volume_sma_5.update(lag_1_volume)
+        if self.rolling_sentiment_3 is not None:
+            row['rolling_sentiment_3'] = self.rolling_sentiment_3.update(sentiment_score)
+        return row
+
+
+class IncrementalFeatureEngineering(FeatureEngineering):
+    def __init__(self, state_dir: str = "data"):
+        try:
+            super().__init__()
+            self.state_dir = state_dir
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def state_path(self, symbol: str):
+        return os.path.join(self.state_dir, f"{symbol}_feature_state.pkl")
+
+    def base_path(self, symbol: str):
+        return os.path.join(self.state_dir, f"{symbol}_feature_base.pkl")
+
+    def _raw_frame(self, df):
+        return df[[col for col in RAW_COLUMNS if col in df.columns]]
+
+    def _row_hashes(self, df):
+        # One hash per raw row, so any changed row (e.g. a placeholder the journal replaced
+        # with real data) is found, and where the change starts
+        return pd.util.hash_pandas_object(self._raw_frame(df), index=False).to_numpy()
+
+    def _dump(self, value, path: str):
+        # Written next to the target and renamed over it, so a crash never leaves half a file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _add_all_features(self, df, outputs=None):
+        return self.add_features(df, outputs)
+
+    def _outputs(self, features):
+        # None means every feature; a subset is widened by what the state machine reads
+        if features is None:
+            return None
+        return sorted(set(features) | set(STATE_INPUTS))
+
+    def _covers(self, persisted_outputs, outputs):
+        if persisted_outputs is None:
+            return True
+        return outputs is not None and set(outputs) <= set(persisted_outputs)
+
+    def _advance_state(self, state, df_fe, start: int = 0):
+        # Feeds rows from `start` onwards, the rows before it only provide the close diff
+        sentiment = df_fe['sentiment_score'] if 'sentiment_score' in df_fe.columns else pd.Series(np.nan, index=df_fe.index)
+        inputs = zip(
+            df_fe['lag_1_close'].to_numpy(dtype=np.float64)[start:],
+            df_fe['lag_1_close'].diff().to_numpy(dtype=np.float64)[start:],
+            df_fe['lag_1_return'].to_numpy(dtype=np.float64)[start:],
+            df_fe['lag_1_volume'].to_numpy(dtype=np.float64)[start:],
+            sentiment.to_numpy(dtype=np.float64, na_value=np.nan)[start:],
+        )
+        rows = [state.update(*values) for values in inputs]
+        return pd.DataFrame(rows, index=df_fe.index[start:])
+
+    def _full_recompute(self, df, symbol: str, outputs=None, hashes=None):
+        df_fe = self._add_all_features(df.copy(), outputs)
+
+        # Seed the indicator state from the full history and keep it only if it reproduces
+        # pandas/ta exactly, otherwise every later call falls back to a full recompute. The
+        # checkpoint is the state before the last row, where the base file ends.
+        state = IndicatorState(has_sentiment='sentiment_score' in df_fe.columns)
+        stateful = self._advance_state(state, df_fe.iloc[:-1])
+        checkpoint = copy.deepcopy(state)
+        stateful = pd.concat([stateful, self._advance_state(state, df_fe, start=len(df_fe) - 1)])
+        for col in stateful.columns:
+            if col not in df_fe.columns:
+                continue
+            expected = df_fe[col].to_numpy(dtype=np.float64)
+            if not np.array_equal(stateful[col].to_numpy(dtype=np.float64), expected, equal_nan=True):
+                logger.info(f"Incremental state for {col} diverges from a full recompute, disabling incremental mode for {symbol}")
+                checkpoint = None
+                break
+
+        # The last row stays in the tail: its target is filled in by the next update
+        hashes = self._row_hashes(df) if hashes is None else hashes
+        self._save_state(symbol, hashes, df_fe.iloc[:-1], df_fe.iloc[-1:], checkpoint, outputs)
+        return df_fe
+
+    def _save_state(self, symbol: str, hashes, base_fe, tail_fe, checkpoint, outputs=None, base_token: str = None):
+        # The engineered frame is split in two files: the base (every row but the recent
+        # ones) is only rewritten when base_token is None, the tail travels with the
+        # indicator state at the end of the base (the checkpoint) in the state file, which
+        # every update rewrites. Each file keeps the raw row hashes of its rows.
+        os.makedirs(self.state_dir, exist_ok=True)
+        base_rows = len(base_fe)
+        if base_token is None:
+            base_token = uuid.uuid4().hex
+            self._dump({"token": base_token, "features": base_fe, "row_hashes": hashes[:base_rows]}, self.base_path(symbol))
+        self._dump({
+            "tail": tail_fe,
+            "checkpoint": checkpoint,
+            "row_hashes": hashes[base_rows:],
+            "outputs": outputs,
+            "base_token": base_token,
+            "base_rows": base_rows,
+        }, self.state_path(symbol))
+
+    def _load_base(self, symbol: str, persisted):
+        path = self.base_path(symbol)
+        if not os.path.exists(path):
+            return None
+        base = joblib.load(path)
+        # A base from another save (e.g. a crash between the two writes) is not reused
+        if base["token"] != persisted["base_token"] or len(base["features"]) != persisted["base_rows"]:
+            return None
+        return base
+
+    def initiate_incremental_feature_engineering(self, df, symbol: str, features=None):
+        # features: columns the caller needs (e.g. a model's feature_name_); None engineers all
+        try:
+            outputs = self._outputs(features)
+            path = self.state_path(symbol)
+            persisted = joblib.load(path) if os.path.exists(path) else None
+            hashes = self._row_hashes(df)
+
+            can_resume = (
+                persisted is not None
+                and "checkpoint" in persisted
+                and persisted["checkpoint"] is not None
+                and TAIL_CONTEXT_ROWS <= persisted["base_rows"]
+                and list(persisted["tail"].columns[:len(df.columns)]) == list(df.columns)
+                and self._covers(persisted.get("outputs"), outputs)
+            )
+            base = self._load_base(symbol, persisted) if can_resume else None
+            if base is None:
+                logger.info(f"Running full feature engineering for {symbol}")
+                return self._full_recompute(df, symbol, outputs, hashes)
+
+            # First row that differs from what the persisted features were engineered from
+            stored = np.concatenate([base["row_hashes"], persisted["row_hashes"]])
+            n_same = min(len(stored), len(hashes))
+            changed = np.flatnonzero(stored[:n_same] != hashes[:n_same])
+            first_changed = int(changed[0]) if len(changed) else n_same
+            base_fe, base_rows = base["features"], persisted["base_rows"]
+
+            if first_changed == len(stored) == len(hashes):
+                return pd.concat([base_fe, persisted["tail"]])
+            if first_changed < base_rows or len(df) <= base_rows:
+                logger.info(f"Row {first_changed} of {symbol} changed before the feature checkpoint, running full feature engineering")
+                return self._full_recompute(df, symbol, outputs, hashes)
+
+            # Everything after the checkpoint is engineered again: stateless features only
+            # look a few rows back, windowed indicators continue from the checkpointed
+            # accumulators. This covers appended rows and replaced rows (placeholders that
+            # got real data) alike.
+            outputs = persisted.get("outputs")
+            context_fe = self._add_all_features(df.iloc[base_rows - TAIL_CONTEXT_ROWS:].copy(), outputs)
+            tail = context_fe.iloc[TAIL_CONTEXT_ROWS:].copy()
+            state = copy.deepcopy(persisted["checkpoint"])
+            stateful = self._advance_state(state, context_fe.iloc[:-1], start=TAIL_CONTEXT_ROWS)
+            checkpoint = copy.deepcopy(state)
+            stateful = pd.concat([stateful, self._advance_state(state, context_fe, start=len(context_fe) - 1)])
+            for col in stateful.columns:
+                if col in tail.columns:
+                    tail[col] = stateful[col]
+
+            # The last base row's target depends on the first tail row's close
+            base_token = persisted["base_token"]
+            target = context_fe['target'].iloc[TAIL_CONTEXT_ROWS - 1]
+            old_target = base_fe['target'].iloc[-1]
+            if not (target == old_target or (pd.isna(target) and pd.isna(old_target))):
+                base_fe = base_fe.copy()
+                base_fe.iloc[-1, base_fe.columns.get_loc('target')] = target
+                base_token = None
+
+            df_fe = pd.concat([base_fe, tail])
+            if len(tail) > FEATURE_TAIL_ROWS:
+                self._save_state(symbol, hashes, df_fe.iloc[:-1], df_fe.iloc[-1:], checkpoint, outputs)
+            else:
+                self._save_state(symbol, hashes, base_fe, tail, persisted["checkpoint"], outputs, base_token=base_token)
+            logger.info(f"Re-engineered {len(tail)} rows after the feature checkpoint for {symbol} "
+                        f"({len(df) - len(stored)} new, first change at row {first_changed})")
+            return df_fe
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
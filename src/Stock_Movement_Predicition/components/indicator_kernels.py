@@ -0,0 +1,204 @@
+import sys
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+
+# NumPy versions of the engineered features. Every kernel takes float64 arrays with time on
+# the last axis, either one series (days,) or a panel (symbols, days), and handles NaN the
+# way the pandas/ta code does: rolling windows need every value present, exponential means
+# carry through gaps.
+
+
+def as_float(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def shift(x, periods: int):
+    x = as_float(x)
+    out = np.full(x.shape, np.nan)
+    if periods > 0:
+        out[..., periods:] = x[..., :-periods]
+    elif periods < 0:
+        out[..., :periods] = x[..., -periods:]
+    else:
+        out[...] = x
+    return out
+
+
+def diff(x, periods: int = 1):
+    x = as_float(x)
+    return x - shift(x, periods)
+
+
+def pct_change(x):
+    x = as_float(x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return x / shift(x, 1) - 1
+
+
+def _rolling(x, window: int, reduce):
+    # Windows are views over the input; any NaN inside a window makes it NaN
+    x = as_float(x)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = reduce(sliding_window_view(x, window, axis=-1))
+    return out
+
+
+def rolling_sum(x, window: int):
+    return _rolling(x, window, lambda w: w.sum(axis=-1))
+
+
+def rolling_mean(x, window: int):
+    return _rolling(x, window, lambda w: w.mean(axis=-1))
+
+
+def rolling_std(x, window: int, ddof: int = 1):
+    return _rolling(x, window, lambda w: w.std(axis=-1, ddof=ddof))
+
+
+def _linear_scan(beta, values, block: int = 64):
+    # w[t] = beta[t] * w[t-1] + values[t] along the last axis, starting from w = 0. Within a
+    # block w is P * cumsum(values / P) with P the running product of beta, which is
+    # stable since beta <= 1; blocks keep P away from underflow, and a row whose product
+    # still underflows (very long gaps) is finished step by step
+    out = np.empty(values.shape)
+    state = np.zeros(values.shape[0])
+    for start in range(0, values.shape[1], block):
+        b = beta[:, start:start + block]
+        v = values[:, start:start + block]
+        product = np.cumprod(b, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            chunk = product * (state[:, None] + np.cumsum(v / product, axis=1))
+        for row in np.flatnonzero(~(product[:, -1] > 1e-280)):
+            w = state[row]
+            for j in range(b.shape[1]):
+                w = b[row, j] * w + v[row, j]
+                chunk[row, j] = w
+        out[:, start:start + block] = chunk
+        state = chunk[:, -1]
+    return out
+
+
+def ewm_mean(x, com: float, min_periods: int = 0):
+    # pandas' ewm(adjust=False).mean() as a linear recurrence evaluated in blocks of days
+    # for every row at once. Like pandas, a gap decays the previous weight once per missing
+    # row, and the output is NaN until min_periods values have been seen.
+    x = as_float(x)
+    alpha = 1.0 / (1.0 + com)
+    panel = x.reshape(-1, x.shape[-1])
+    observed = ~np.isnan(panel)
+    days = np.arange(panel.shape[1])
+
+    last_seen = np.maximum.accumulate(np.where(observed, days, -1), axis=1)
+    previous = np.full(panel.shape, -1)
+    previous[:, 1:] = last_seen[:, :-1]
+    update = observed & (previous >= 0)
+    old_wt = (1.0 - alpha) ** (days - previous)
+    new_wt = 1.0 - old_wt if com == 1 else alpha
+    # The first observation starts the mean at its own value (gain 1 on a zero state)
+    beta = np.where(update, old_wt / (old_wt + new_wt), 1.0)
+    gain = np.where(update, new_wt / (old_wt + new_wt), observed.astype(np.float64))
+    out = _linear_scan(beta, np.where(observed, panel, 0.0) * gain)
+
+    out[np.cumsum(observed, axis=1) < max(min_periods, 1)] = np.nan
+    return out.reshape(x.shape)
+
+
+def ema(x, span: int, min_periods: int = 0):
+    return ewm_mean(x, (span - 1) / 2, min_periods)
+
+
+def macd(close, window_slow: int = 26, window_fast: int = 12):
+    # ta.trend.macd
+    return ema(close, window_fast, window_fast) - ema(close, window_slow, window_slow)
+
+
+def rsi(close, window: int = 14):
+    # ta.momentum.rsi; a missing change counts as no movement
+    change = np.nan_to_num(diff(close), nan=0.0)
+    up = np.where(change > 0, change, 0.0)
+    down = np.where(change < 0, -change, 0.0)
+    com = (1 - 1 / window) / (1 / window)
+    ema_up = ewm_mean(up, com, window)
+    ema_down = ewm_mean(down, com, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ema_down == 0, 100.0, 100 - (100 / (1 + ema_up / ema_down)))
+
+
+def bollinger_bands(close, window: int = 20, window_dev: int = 2):
+    # ta.volatility.bollinger_hband / bollinger_lband
+    mavg = rolling_mean(close, window)
+    mstd = rolling_std(close, window, ddof=0)
+    return mavg + window_dev * mstd, mavg - window_dev * mstd
+
+
+def calendar_features(dates):
+    # dates: datetime64 array (days,), shared by every symbol of a panel
+    days = np.asarray(dates, dtype="datetime64[D]")
+    months = days.astype("datetime64[M]")
+    month = (months.astype(np.int64) % 12 + 1).astype(np.int32)
+    return {
+        # 1970-01-01 was a Thursday
+        "day_of_week": ((days.astype(np.int64) + 3) % 7).astype(np.int32),
+        "month": month,
+        "quarter": ((month - 1) // 3 + 1).astype(np.int32),
+        "is_month_end": ((days + 1).astype("datetime64[M]") != months).astype(np.int64),
+    }
+
+
+# Feature name -> kernel over a column accessor, with the same names and definitions as
+# FEATURE_NODES in feature_graph.py. Underscored entries are shared intermediates.
+INDICATORS = {
+    "lag_1_close": lambda c: shift(c("Close"), 1),
+    "lag_1_open": lambda c: shift(c("Open"), 1),
+    "lag_1_high": lambda c: shift(c("High"), 1),
+    "lag_1_low": lambda c: shift(c("Low"), 1),
+    "lag_1_volume": lambda c: shift(c("Volume"), 1),
+    "lag_1_return": lambda c: (c("lag_1_close") - c("lag_1_open")) / c("lag_1_open"),
+    "lag_2_return": lambda c: shift(c("lag_1_return"), 1),
+    "lag_3_return": lambda c: shift(c("lag_1_return"), 2),
+    "cumulative_return_3": lambda c: rolling_sum(c("lag_1_return"), 3),
+    "SMA_5": lambda c: rolling_mean(c("lag_1_close"), 5),
+    "SMA_10": lambda c: rolling_mean(c("lag_1_close"), 10),
+    "EMA_10": lambda c: ema(c("lag_1_close"), 10),
+    "EMA_20": lambda c: ema(c("lag_1_close"), 20),
+    "MACD": lambda c: macd(c("lag_1_close")),
+    "RSI": lambda c: rsi(c("lag_1_close")),
+    "_bollinger": lambda c: bollinger_bands(c("lag_1_close")),
+    "bollinger_h": lambda c: c("_bollinger")[0],
+    "bollinger_l": lambda c: c("_bollinger")[1],
+    "volatility": lambda c: rolling_std(c("lag_1_close"), 5),
+    "rolling_std_5": lambda c: c("volatility"),
+    "close_to_open_ratio": lambda c: c("lag_1_close") / c("lag_1_open"),
+    "high_to_low_ratio": lambda c: c("lag_1_high") / c("lag_1_low"),
+    "volume_change": lambda c: pct_change(c("lag_1_volume")),
+    "volume_SMA_5": lambda c: rolling_mean(c("lag_1_volume"), 5),
+    "lag_2_volume": lambda c: shift(c("lag_1_volume"), 1),
+    "sentiment_momentum": lambda c: diff(c("sentiment_score")),
+    "rolling_sentiment_3": lambda c: rolling_mean(c("sentiment_score"), 3),
+    "_calendar": lambda c: calendar_features(c("Date")),
+    "day_of_week": lambda c: c("_calendar")["day_of_week"],
+    "month": lambda c: c("_calendar")["month"],
+    "quarter": lambda c: c("_calendar")["quarter"],
+    "is_month_end": lambda c: c("_calendar")["is_month_end"],
+}
+
+
+def indicator_features(columns: dict, outputs=None):
+    # columns: raw arrays by name ("Open", "High", "Low", "Close", "Volume", optionally
+    # "sentiment_score" and "Date"), each (days,) or (symbols, days). Returns the requested
+    # features (all of them by default); intermediates are computed once.
+    try:
+        values = dict(columns)
+
+        def column(name):
+            if name not in values:
+                values[name] = INDICATORS[name](column)
+            return values[name]
+
+        if outputs is None:
+            outputs = [name for name in INDICATORS if not name.startswith("_")]
+        return {name: column(name) for name in outputs}
+    except Exception as e:
+        raise StockMovingPredicitionException(e, sys)
@@ -0,0 +1,160 @@
+import os
+import sys
+import pandas as pd
+import requests
+from datetime import datetime, timedelta
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.utils.telemetry import span
+from src.Stock_Movement_Predicition.components.dataset_store import dataset_store
+from src.Stock_Movement_Predicition.components.news_fetcher import AsyncFinnhubNewsFetcher
+
+# Alpha Vantage's compact output holds the latest 100 trading days, which covers any start
+# date up to this many calendar days back
+ALPHA_VANTAGE_COMPACT_DAYS = int(os.getenv("ALPHA_VANTAGE_COMPACT_DAYS", "130"))
+# Days of news fetched per chunk in streaming mode
+INGESTION_CHUNK_DAYS = int(os.getenv("INGESTION_CHUNK_DAYS", "31"))
+
+def require_frame(df, what: str):
+    # Alpha Vantage answers rate limits and bad symbols with a JSON note instead of prices,
+    # so a fetch can come back without a frame; failing here keeps it out of the dataset
+    if not isinstance(df, pd.DataFrame):
+        raise ValueError(f"{what}: expected a DataFrame, got {type(df).__name__}")
+
+
+# Alpha Vantage (daily prices) and Finnhub (company news) clients; etl.py is the
+# command-line entry point and the pipelines import the class from here
+class MarketDataIngestion():
+    def __init__(self):
+        try:
+            pass
+        except Exception as e:
+            raise StockMovingPredicitionException(e,sys)
+        
+
+    def fetch_finnhub_news_daily(self, symbol: str, finn_api_key: str, start_date: datetime, end_date: datetime):
+        try:
+            # Multi-day range calls run concurrently under a token bucket matched to the API
+            # quota, and every finished day is cached on disk so re-runs only fetch what is missing
+            fetcher = AsyncFinnhubNewsFetcher(api_key=finn_api_key)
+            df = fetcher.fetch_dataframe(symbol, start_date, end_date)
+            logger.info(f"Fetched news for {symbol} with {fetcher.requests_made} API calls")
+            return df
+
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys) from e
+
+    def fetch_finnhub_news_chunked(self, symbol: str, finn_api_key: str, start_date: datetime, end_date: datetime,
+                                   chunk_days: int = INGESTION_CHUNK_DAYS):
+        try:
+            # Fills the per-day news cache one chunk at a time without keeping the articles;
+            # the streaming sentiment stage reads them back chunk by chunk
+            fetcher = AsyncFinnhubNewsFetcher(api_key=finn_api_key)
+            articles = 0
+            chunk_start = start_date
+            while chunk_start <= end_date:
+                chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+                articles += len(fetcher.fetch_dataframe(symbol, chunk_start, chunk_end))
+                chunk_start = chunk_end + timedelta(days=1)
+            logger.info(f"Fetched {articles} news articles for {symbol} with {fetcher.requests_made} API calls")
+            return articles
+
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+
+
+    def fetch_alpha_vantage_stock_data(self, symbol: str, start_date: datetime, end_date: datetime, vantage_api_key: str):
+        try:
+            # Alpha Vantage API endpoint for daily stock data (time series)
+            base_url = "https://www.alphavantage.co/query"
+            function = "TIME_SERIES_DAILY"
+            
+            # "full" is the whole history (20+ years), so it is only requested when needed
+            recent = (datetime.today().date() - pd.to_datetime(start_date).date()).days <= ALPHA_VANTAGE_COMPACT_DAYS
+            params = {
+                "function": function,
+                "symbol": symbol,
+                "apikey": vantage_api_key,
+                "outputsize": "compact" if recent else "full"
+            }
+
+            response = requests.get(base_url, params=params)
+            data = response.json()
+
+            # Check if data is available
+            if "Time Series (Daily)" in data:
+                # Keep only the requested days before building the frame (ISO dates sort as strings)
+                low, high = pd.to_datetime(start_date).strftime("%Y-%m-%d"), pd.to_datetime(end_date).strftime("%Y-%m-%d")
+                time_series = {day: values for day, values in data["Time Series (Daily)"].items() if low <= day <= high}
+                del data
+                df = pd.DataFrame(time_series).T  # Transpose to have dates as rows
+                df.reset_index(inplace=True)
+                df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+                # Convert types
+                df['Date'] = pd.to_datetime(df['Date'])
+                df[['Open', 'High', 'Low', 'Close', 'Volume']] = df[['Open', 'High', 'Low', 'Close', 'Volume']].astype(float)
+
+                # Filter data for the last `months` months
+                df = df[(df['Date'] >= pd.to_datetime(start_date)) & (df['Date'] <= pd.to_datetime(end_date))]
+
+                # Sort by date descending
+                df = df.sort_values(by='Date', ascending=False).reset_index(drop=True)
+
+                return df
+            
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+    
+    def save_news_to_data(self,df: pd.DataFrame, symbol: str, months: int):
+        try:
+            name = f"{symbol}_finnhub_daily_news_{months}months"
+            dataset_store.write(name, df, date_column="fetched_date")
+            logger.info(f"Saved daily news for {months} months as {name}")
+
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys) from e
+        
+    def save_stock_data_to_csv(self, df: pd.DataFrame, symbol: str, months: int):
+        try:
+            name = f"{symbol}_stock_data_{months}months"
+            dataset_store.write(name, df, date_column="Date")
+            logger.info(f"Saved stock data for {months} months as {name}")
+        except Exception as e:
+            raise StockMovingPredicitionException(e,sys)
+        
+    
+    
+    
+        
+
+    def initiate_data_ingestion(self, symbol: str, months: int, vantage_api_key: str, finn_api_key: str,
+                                streaming: bool = False):
+        try:
+            end_date = datetime.today().date()
+            start_date = end_date - timedelta(days=months * 30)
+
+        # Fetch and Save Stock Data
+            with span("ingestion", "fetch_stock"):
+                stock_data_df = self.fetch_alpha_vantage_stock_data(symbol, start_date, end_date, vantage_api_key)
+            require_frame(stock_data_df, f"Alpha Vantage prices for {symbol}")
+            with span("ingestion", "save"):
+                self.save_stock_data_to_csv(stock_data_df, symbol, months)
+
+        # Fetch and Save News Data
+            if streaming:
+                # Articles stay in the per-day cache instead of one in-memory dataset
+                with span("ingestion", "fetch_news"):
+                    articles = self.fetch_finnhub_news_chunked(symbol, finn_api_key, start_date, end_date)
+                return {"stock_rows": len(stock_data_df), "news_rows": articles}
+
+            with span("ingestion", "fetch_news"):
+                news_df = self.fetch_finnhub_news_daily(symbol, finn_api_key, start_date, end_date)
+            require_frame(news_df, f"Finnhub news for {symbol}")
+            with span("ingestion", "save"):
+                self.save_news_to_data(news_df, symbol, months)
+            return {"stock_rows": len(stock_data_df), "news_rows": len(news_df)}
+
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import uuid
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import joblib
+import numpy as np
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join("models", "registry"))
+# sklearn (unpickled LGBMClassifier), booster (native LightGBM text model) or treelite
+# (trees compiled to a shared library, needs treelite and tl2cgen)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "booster")
+# Requests already run in parallel on the prediction pool, so one thread per call by default
+MODEL_NUM_THREADS = int(os.getenv("MODEL_NUM_THREADS", "1"))
+# Pickle picked up as version 1 for symbols that have no manifest yet
+LEGACY_MODEL_TEMPLATE = os.getenv("LEGACY_MODEL_TEMPLATE", os.path.join("models", "{symbol}_lightgbm_6.pkl"))
+
+
+def file_sha256(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Exposes the attributes PredictionPipeline uses from LGBMClassifier on top of a native
+# LightGBM Booster (or a compiled treelite library) for binary models
+class BoosterPredictor:
+    def __init__(self, booster, feature_names, classes, predict_fn=None, feature_importances=None):
+        self.booster = booster
+        self.feature_name_ = list(feature_names)
+        self.classes_ = np.asarray(classes)
+        self.feature_importances_ = (
+            np.asarray(feature_importances) if feature_importances is not None
+            else booster.feature_importance(importance_type="split")
+        )
+        self._predict_fn = predict_fn or (lambda X: booster.predict(X, num_threads=MODEL_NUM_THREADS))
+
+    def predict_proba(self, X):
+        p_up = np.asarray(self._predict_fn(X), dtype=np.float64).reshape(len(X), -1)[:, -1]
+        return np.column_stack([1.0 - p_up, p_up])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+class ModelVersion:
+    def __init__(self, symbol: str, version: str, record: dict, version_dir: str):
+        self.symbol = symbol
+        self.version = version
+        self.record = record
+        self.version_dir = version_dir
+
+    def artifact_path(self, kind: str):
+        return os.path.join(self.version_dir, self.record["artifacts"][kind]["path"])
+
+    def verify(self, kind: str):
+        path = self.artifact_path(kind)
+        if file_sha256(path) != self.record["artifacts"][kind]["sha256"]:
+            raise ValueError(f"Checksum mismatch for {path}")
+        return path
+
+
+# Versioned model artifacts per symbol:
+#   models/registry/{symbol}/manifest.json   current version + one record per version
+#   models/registry/{symbol}/{version}/model.pkl, model.txt
+# Each record holds the feature list and sha256 of every artifact. Promotion rewrites the
+# manifest atomically, and readers pick the change up on their next lookup.
+class ModelRegistry:
+    def __init__(self, registry_dir: str = MODEL_REGISTRY_DIR, backend: str = MODEL_BACKEND,
+                 legacy_template: str = LEGACY_MODEL_TEMPLATE):
+        try:
+            if backend not in ("sklearn", "booster", "treelite"):
+                raise ValueError(f"Unknown model backend '{backend}', expected sklearn, booster or treelite")
+            self.registry_dir = registry_dir
+            self.backend = backend
+            self.legacy_template = legacy_template
+            self._manifests = {}
+            self._lock = threading.Lock()
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def symbol_dir(self, symbol: str):
+        return os.path.join(self.registry_dir, symbol)
+
+    def manifest_path(self, symbol: str):
+        return os.path.join(self.symbol_dir(symbol), "manifest.json")
+
+    @contextmanager
+    def lock(self, symbol: str):
+        os.makedirs(self.symbol_dir(symbol), exist_ok=True)
+        with open(os.path.join(self.symbol_dir(symbol), ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def load_manifest(self, symbol: str):
+        # Parsed manifests are reused until the file is replaced, so a lookup costs one stat
+        path = self.manifest_path(symbol)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._manifests.get(symbol)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path) as f:
+            manifest = json.load(f)
+        with self._lock:
+            self._manifests[symbol] = (mtime, manifest)
+        return manifest
+
+    def _write_manifest(self, symbol: str, manifest: dict):
+        tmp_path = f"{self.manifest_path(symbol)}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path(symbol))
+
+    def _migrate_legacy(self, symbol: str):
+        legacy_path = self.legacy_template.format(symbol=symbol)
+        if not os.path.exists(legacy_path):
+            return None
+        with self.lock(symbol):
+            # Another process may have migrated while this one waited for the lock
+            if os.path.exists(self.manifest_path(symbol)):
+                return self.load_manifest(symbol)
+            logger.info(f"Registering {legacy_path} as version 1 of {symbol}")
+            self._register_locked(symbol, joblib.load(legacy_path), source=legacy_path, promote=True)
+        return self.load_manifest(symbol)
+
+    def current(self, symbol: str):
+        try:
+            manifest = self.load_manifest(symbol) or self._migrate_legacy(symbol)
+            if manifest is None or manifest.get("current") is None:
+                return None
+            version = manifest["current"]
+            return ModelVersion(symbol, version, manifest["versions"][version], os.path.join(self.symbol_dir(symbol), version))
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def current_version(self, symbol: str):
+        model_version = self.current(symbol)
+        return None if model_version is None else model_version.version
+
+    def symbols(self):
+        # Symbols with a registered model
+        if not os.path.isdir(self.registry_dir):
+            return []
+        return sorted(name for name in os.listdir(self.registry_dir) if os.path.exists(self.manifest_path(name)))
+
+    def versions(self, symbol: str):
+        manifest = self.load_manifest(symbol) or self._migrate_legacy(symbol)
+        if manifest is None:
+            return {"current": None, "versions": {}}
+        return {"current": manifest["current"], "versions": manifest["versions"]}
+
+    def _register_locked(self, symbol: str, model, features=None, metrics=None, source: str = None, promote: bool = False):
+        manifest = self.load_manifest(symbol) or {"symbol": symbol, "current": None, "versions": {}}
+        version = str(max((int(v) for v in manifest["versions"]), default=0) + 1)
+        version_dir = os.path.join(self.symbol_dir(symbol), version)
+        tmp_dir = f"{version_dir}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_dir)
+
+        artifacts = {}
+        joblib.dump(model, os.path.join(tmp_dir, "model.pkl"))
+        artifacts["pkl"] = "model.pkl"
+        # The native text model lets the server skip unpickling sklearn wrappers
+        if hasattr(model, "booster_"):
+            model.booster_.save_model(os.path.join(tmp_dir, "model.txt"))
+            artifacts["txt"] = "model.txt"
+        os.replace(tmp_dir, version_dir)
+
+        manifest["versions"][version] = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "source": source,
+            "features": list(features if features is not None else getattr(model, "feature_name_", [])),
+            "classes": np.asarray(getattr(model, "classes_", [0, 1])).tolist(),
+            "metrics": metrics or {},
+            "artifacts": {
+                kind: {"path": name, "sha256": file_sha256(os.path.join(version_dir, name))}
+                for kind, name in artifacts.items()
+            },
+        }
+        if promote:
+            manifest["current"] = version
+        self._write_manifest(symbol, manifest)
+        return version
+
+    def register(self, symbol: str, model, features=None, metrics=None, source: str = None, promote: bool = False):
+        try:
+            with self.lock(symbol):
+                version = self._register_locked(symbol, model, features, metrics, source, promote)
+            logger.info(f"Registered {symbol} model version {version}{' (promoted)' if promote else ''}")
+            return version
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def promote(self, symbol: str, version: str):
+        # Also used for rollbacks: any registered version can be made current again
+        try:
+            version = str(version)
+            with self.lock(symbol):
+                manifest = self.load_manifest(symbol)
+                if manifest is None or version not in manifest["versions"]:
+                    raise ValueError(f"{symbol} has no model version {version}")
+                manifest["current"] = version
+                self._write_manifest(symbol, manifest)
+            logger.info(f"Promoted {symbol} model version {version}")
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def _load_treelite(self, model_version: ModelVersion):
+        import treelite
+        import tl2cgen
+
+        # Compiled once per version and machine, next to the other artifacts
+        lib_path = os.path.join(model_version.version_dir, "model.so")
+        if not os.path.exists(lib_path):
+            tmp_path = f"{lib_path}.{uuid.uuid4().hex}.so"
+            tl2cgen.export_lib(treelite.frontend.load_lightgbm_model(model_version.verify("txt")),
+                               toolchain="gcc", libpath=tmp_path)
+            os.replace(tmp_path, lib_path)
+        predictor = tl2cgen.Predictor(lib_path, nthread=MODEL_NUM_THREADS)
+        return lambda X: predictor.predict(tl2cgen.DMatrix(np.asarray(X, dtype=np.float32)))
+
+    def load(self, model_version: ModelVersion):
+        try:
+            record = model_version.record
+            if self.backend == "sklearn" or "txt" not in record["artifacts"]:
+                return joblib.load(model_version.verify("pkl"))
+
+            import lightgbm
+            booster = lightgbm.Booster(model_file=model_version.verify("txt"))
+            predict_fn = self._load_treelite(model_version) if self.backend == "treelite" else None
+            return BoosterPredictor(booster, record["features"] or booster.feature_name(), record["classes"], predict_fn)
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import threading
+from datetime import date, datetime, timedelta, timezone
+import aiohttp
+import pandas as pd
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+
+FINNHUB_NEWS_URL = os.getenv("FINNHUB_NEWS_URL", "https://finnhub.io/api/v1/company-news")
+# Free tier quota is 60 calls per minute
+FINNHUB_CALLS_PER_MINUTE = int(os.getenv("FINNHUB_CALLS_PER_MINUTE", "60"))
+FINNHUB_BURST = int(os.getenv("FINNHUB_BURST", "5"))
+# Days covered by one company-news call; a call that comes back with at least
+# FINNHUB_RANGE_SATURATION articles may be truncated and is split in half
+FINNHUB_RANGE_DAYS = int(os.getenv("FINNHUB_RANGE_DAYS", "7"))
+FINNHUB_RANGE_SATURATION = int(os.getenv("FINNHUB_RANGE_SATURATION", "200"))
+FINNHUB_MAX_CONCURRENCY = int(os.getenv("FINNHUB_MAX_CONCURRENCY", "8"))
+FINNHUB_MAX_RETRIES = int(os.getenv("FINNHUB_MAX_RETRIES", "5"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+# Token bucket for one API key. The refill rate leaves room for the burst so that no 60
+# second window ever exceeds calls_per_minute. Callers reserve a token under a thread lock
+# and then wait outside it, so one bucket paces every fetcher in the process, whichever
+# thread or event loop it runs on.
+class TokenBucket:
+    def __init__(self, calls_per_minute: int, burst: int):
+        self.calls_per_minute = calls_per_minute
+        self.burst = burst
+        self.capacity = max(1, min(burst, calls_per_minute))
+        self.rate = max(calls_per_minute - self.capacity, 1) / 60.0
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Takes a token, possibly one that only refills later; returns the seconds to wait
+        # before using it
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, 0.0)
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def shared_bucket(api_key: str, calls_per_minute: int = FINNHUB_CALLS_PER_MINUTE, burst: int = FINNHUB_BURST):
+    # The quota belongs to the API key, so every fetcher using it (e.g. the orchestrator's
+    # fetch threads) draws from the same bucket
+    with _buckets_lock:
+        bucket = _buckets.get(api_key)
+        if bucket is None or (bucket.calls_per_minute, bucket.burst) != (calls_per_minute, burst):
+            bucket = _buckets[api_key] = TokenBucket(calls_per_minute, burst)
+        return bucket
+
+
+# One JSON file per (symbol, day) so interrupted runs resume where they stopped
+class NewsResponseCache:
+    def __init__(self, cache_dir: str = os.path.join("data", "news_cache")):
+        self.cache_dir = cache_dir
+
+    def path(self, symbol: str, day: date):
+        return os.path.join(self.cache_dir, symbol, f"{day.isoformat()}.json")
+
+    def has(self, symbol: str, day: date):
+        return os.path.exists(self.path(symbol, day))
+
+    def load(self, symbol: str, day: date):
+        with open(self.path(symbol, day)) as f:
+            return json.load(f)
+
+    def save(self, symbol: str, day: date, articles):
+        path = self.path(symbol, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(articles, f)
+        os.replace(tmp_path, path)
+
+
+class AsyncFinnhubNewsFetcher:
+    def __init__(self, api_key: str, base_url: str = FINNHUB_NEWS_URL, calls_per_minute: int = FINNHUB_CALLS_PER_MINUTE,
+                 burst: int = FINNHUB_BURST, range_days: int = FINNHUB_RANGE_DAYS, max_concurrency: int = FINNHUB_MAX_CONCURRENCY,
+                 max_retries: int = FINNHUB_MAX_RETRIES, cache: NewsResponseCache = None):
+        try:
+            self.api_key = api_key
+            self.base_url = base_url
+            self.calls_per_minute = calls_per_minute
+            self.burst = burst
+            self.range_days = max(1, range_days)
+            self.max_concurrency = max_concurrency
+            self.max_retries = max_retries
+            self.cache = cache or NewsResponseCache()
+            self.requests_made = 0
+            # Articles for days that are not complete yet (today), kept out of the disk cache
+            self._live = {}
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    async def _get(self, session, bucket, params):
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            self.requests_made += 1
+            try:
+                async with session.get(self.base_url, params=params) as response:
+                    if response.status in RETRYABLE_STATUS and attempt < self.max_retries:
+                        retry_after = response.headers.get("Retry-After")
+                        delay = float(retry_after) if retry_after else 2 ** attempt
+                    else:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = 2 ** attempt
+                logger.info(f"Finnhub request failed ({e}), retrying")
+            # Exponential backoff with jitter so parallel retries do not line up
+            await asyncio.sleep(delay + random.uniform(0, 0.5))
+
+    def _group_by_day(self, articles, start_day: date, end_day: date):
+        # The original one-call-per-day fetch labelled every article with the day it queried.
+        # A range call has to label articles with their UTC publish date instead, which can
+        # move an article published late in the US evening to the next day. Articles Finnhub
+        # returns outside the range (its day boundaries need not be UTC) stay on the nearest
+        # queried day, so with FINNHUB_RANGE_DAYS=1 the labels match the per-day fetch.
+        by_day = {start_day + timedelta(days=i): [] for i in range((end_day - start_day).days + 1)}
+        for article in articles:
+            published = article.get("datetime")
+            if published is None:
+                continue
+            day = datetime.fromtimestamp(published, tz=timezone.utc).date()
+            by_day[min(max(day, start_day), end_day)].append(article)
+        return by_day
+
+    async def _fetch_range(self, session, bucket, semaphore, symbol: str, start_day: date, end_day: date):
+        params = {"symbol": symbol, "from": start_day.isoformat(), "to": end_day.isoformat(), "token": self.api_key}
+        async with semaphore:
+            data = await self._get(session, bucket, params)
+        articles = data if isinstance(data, list) else []
+
+        # A saturated multi-day answer may be truncated, so fetch the halves separately
+        if len(articles) >= FINNHUB_RANGE_SATURATION and start_day < end_day:
+            middle = start_day + timedelta(days=(end_day - start_day).days // 2)
+            await asyncio.gather(
+                self._fetch_range(session, bucket, semaphore, symbol, start_day, middle),
+                self._fetch_range(session, bucket, semaphore, symbol, middle + timedelta(days=1), end_day),
+            )
+            return
+
+        today = datetime.now(timezone.utc).date()
+        for day, day_articles in self._group_by_day(articles, start_day, end_day).items():
+            # Today's news is still coming in, so it is never treated as complete
+            if day < today:
+                self.cache.save(symbol, day, day_articles)
+            else:
+                self._live[(symbol, day)] = day_articles
+        logger.info(f"Fetched {len(articles)} articles for {symbol} {start_day} to {end_day}")
+
+    def _uncached_ranges(self, symbol: str, days):
+        ranges, current = [], []
+        for day in days:
+            if self.cache.has(symbol, day):
+                if current:
+                    ranges.append((current[0], current[-1]))
+                    current = []
+                continue
+            current.append(day)
+            if len(current) == self.range_days:
+                ranges.append((current[0], current[-1]))
+                current = []
+        if current:
+            ranges.append((current[0], current[-1]))
+        return ranges
+
+    async def fetch(self, symbol: str, start_date: date, end_date: date):
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        ranges = self._uncached_ranges(symbol, days)
+        logger.info(f"{symbol}: {len(days) - sum((e - s).days + 1 for s, e in ranges)} of {len(days)} days cached, fetching {len(ranges)} ranges")
+
+        self._live = {}
+        if ranges:
+            bucket = shared_bucket(self.api_key, self.calls_per_minute, self.burst)
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            timeout = aiohttp.ClientTimeout(total=60)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                await asyncio.gather(*[
+                    self._fetch_range(session, bucket, semaphore, symbol, start_day, end_day)
+                    for start_day, end_day in ranges
+                ])
+
+        all_articles = []
+        for day in days:
+            day_articles = self._live.get((symbol, day))
+            if day_articles is None:
+                day_articles = self.cache.load(symbol, day) if self.cache.has(symbol, day) else []
+            for article in day_articles:
+                all_articles.append({**article, "fetched_date": day.isoformat()})
+        return all_articles
+
+    def fetch_dataframe(self, symbol: str, start_date: date, end_date: date):
+        try:
+            if isinstance(start_date, datetime):
+                start_date = start_date.date()
+            if isinstance(end_date, datetime):
+                end_date = end_date.date()
+            articles = asyncio.run(self.fetch(symbol, start_date, end_date))
+
+            df = pd.DataFrame(articles)
+            if 'datetime' in df.columns:
+                df['datetime'] = pd.to_datetime(df['datetime'], unit='s', errors='coerce')
+                df = df.dropna(subset=['datetime'])
+            return df
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
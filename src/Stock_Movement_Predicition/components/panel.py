@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.components.dataset_journal import dataset_journal
+
+PANEL_DIR = os.getenv("PANEL_DIR", os.path.join("data", "panels"))
+
+META_FILE = "meta.json"
+
+
+def _to_day(value):
+    return None if value is None else np.datetime64(pd.Timestamp(value).normalize().date(), "D")
+
+
+# Many symbols on one shared calendar. Logically date x symbol x field, stored field-major
+# as a float64 array (fields, symbols, dates) so every field is one contiguous
+# (symbols, dates) block that the indicator kernels process in a single call. Days a
+# symbol has no row for are NaN.
+class Panel:
+    def __init__(self, dates, symbols, fields, values):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.symbols = list(symbols)
+        self.fields = list(fields)
+        self.values = values
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+
+    @property
+    def shape(self):
+        # (dates, symbols, fields)
+        return len(self.dates), len(self.symbols), len(self.fields)
+
+    def has(self, field: str):
+        return field in self._field_index
+
+    def field(self, name: str):
+        # (symbols, dates) view
+        return self.values[self._field_index[name]]
+
+    def present(self):
+        # (symbols, dates) mask of the days each symbol has a row: it traded (has a Close)
+        # or, for panels without prices, has any value
+        if self.has("Close"):
+            return ~np.isnan(self.field("Close"))
+        return ~np.isnan(self.values).all(axis=0)
+
+    def with_fields(self, arrays: dict):
+        # New panel with extra (or replaced) fields; each array is (symbols, dates) or
+        # (dates,) for values shared by every symbol
+        extra = {name: np.broadcast_to(np.asarray(array, dtype=np.float64), self.values.shape[1:])
+                 for name, array in arrays.items()}
+        kept = [field for field in self.fields if field not in extra]
+        values = np.empty((len(kept) + len(extra),) + self.values.shape[1:])
+        for i, field in enumerate(kept):
+            values[i] = self.values[self._field_index[field]]
+        for i, array in enumerate(extra.values(), start=len(kept)):
+            values[i] = array
+        return Panel(self.dates, self.symbols, kept + list(extra), values)
+
+    def select(self, symbols=None, fields=None, start=None, end=None):
+        lo = 0 if start is None else int(np.searchsorted(self.dates, _to_day(start), side="left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, _to_day(end), side="right"))
+        values = self.values[:, :, lo:hi]
+        if fields is not None:
+            values = values[[self._field_index[field] for field in fields]]
+        if symbols is not None:
+            values = values[:, [self._symbol_index[symbol] for symbol in symbols]]
+        return Panel(self.dates[lo:hi], symbols or self.symbols, fields or self.fields, values)
+
+    def frame(self, symbol: str, date_column: str = "Date"):
+        # One symbol as the per-symbol DataFrame layout, only the days it has a row
+        index = self._symbol_index[symbol]
+        block = self.values[:, index, :].T
+        present = self.present()[index]
+        df = pd.DataFrame(block[present], columns=self.fields)
+        df.insert(0, date_column, pd.DatetimeIndex(self.dates[present]))
+        return df
+
+    def to_long(self, date_column: str = "Date", symbol_column: str = "symbol"):
+        flat = self.values.reshape(len(self.fields), -1).T
+        present = self.present().ravel()
+        df = pd.DataFrame(flat[present], columns=self.fields)
+        symbol_codes, date_codes = np.divmod(np.flatnonzero(present), len(self.dates))
+        df.insert(0, symbol_column, np.asarray(self.symbols, dtype=object)[symbol_codes])
+        df.insert(0, date_column, pd.DatetimeIndex(self.dates[date_codes]))
+        return df
+
+    @classmethod
+    def from_long(cls, df, fields=None, date_column: str = "Date", symbol_column: str = "symbol",
+                  dates=None, symbols=None):
+        # Scatters a long frame (one row per symbol and day) into a panel in one assignment.
+        # The calendar is the union of the frame's days unless `dates` is given, in which
+        # case rows on other days are dropped.
+        try:
+            if fields is None:
+                fields = [col for col in df.columns if col not in (date_column, symbol_column)
+                          and pd.api.types.is_numeric_dtype(df[col])]
+            days = pd.to_datetime(df[date_column]).dt.normalize().to_numpy().astype("datetime64[D]")
+            dates = np.unique(days) if dates is None else np.asarray(dates, dtype="datetime64[D]")
+            if symbols is None:
+                symbols = sorted(df[symbol_column].unique().tolist())
+
+            date_codes = np.searchsorted(dates, days)
+            on_calendar = date_codes < len(dates)
+            on_calendar[on_calendar] = dates[date_codes[on_calendar]] == days[on_calendar]
+            symbol_codes = pd.Index(symbols).get_indexer(df[symbol_column])
+            keep = on_calendar & (symbol_codes >= 0)
+
+            values = np.full((len(fields), len(symbols), len(dates)), np.nan)
+            data = df[fields].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+            values[:, symbol_codes[keep], date_codes[keep]] = data.T
+            return cls(dates, symbols, fields, values)
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    @classmethod
+    def from_frames(cls, frames: dict, fields=None, date_column: str = "Date", dates=None):
+        # frames: symbol -> per-symbol DataFrame
+        try:
+            long_df = pd.concat(
+                [df.assign(symbol=symbol) for symbol, df in frames.items()], ignore_index=True
+            )
+            return cls.from_long(long_df, fields, date_column=date_column, dates=dates, symbols=list(frames))
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+
+# data/panels/{name}/ holds values.npy (fields, symbols, dates), dates.npy and meta.json.
+# Reads memory-map values.npy, so loading a universe is one open and a range or subset
+# query only pages in what it slices.
+class PanelStore:
+    def __init__(self, panel_dir: str = PANEL_DIR):
+        try:
+            self.panel_dir = panel_dir
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def path(self, name: str):
+        return os.path.join(self.panel_dir, name)
+
+    def exists(self, name: str):
+        return os.path.exists(os.path.join(self.path(name), META_FILE))
+
+    def write(self, name: str, panel: Panel):
+        try:
+            os.makedirs(self.panel_dir, exist_ok=True)
+            tmp_dir = os.path.join(self.panel_dir, f".{name}.{uuid.uuid4().hex}.tmp")
+            os.makedirs(tmp_dir)
+            np.save(os.path.join(tmp_dir, "values.npy"), np.ascontiguousarray(panel.values, dtype=np.float64))
+            np.save(os.path.join(tmp_dir, "dates.npy"), panel.dates)
+            with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+                json.dump({"symbols": panel.symbols, "fields": panel.fields}, f)
+
+            # Same swap as the dataset store: build next to the old version, then rename
+            target_dir = self.path(name)
+            old_dir = None
+            if os.path.exists(target_dir):
+                old_dir = os.path.join(self.panel_dir, f".{name}.{uuid.uuid4().hex}.old")
+                os.rename(target_dir, old_dir)
+            os.rename(tmp_dir, target_dir)
+            if old_dir is not None:
+                shutil.rmtree(old_dir, ignore_errors=True)
+            logger.info(f"Saved panel {name}: {len(panel.dates)} dates x {len(panel.symbols)} symbols x {len(panel.fields)} fields")
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def read(self, name: str, symbols=None, fields=None, start=None, end=None):
+        try:
+            with open(os.path.join(self.path(name), META_FILE)) as f:
+                meta = json.load(f)
+            panel = Panel(
+                np.load(os.path.join(self.path(name), "dates.npy")),
+                meta["symbols"],
+                meta["fields"],
+                np.load(os.path.join(self.path(name), "values.npy"), mmap_mode="r"),
+            )
+            if symbols is None and fields is None and start is None and end is None:
+                return panel
+            return panel.select(symbols, fields, start, end)
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+
+def load_dataset_panel(symbols, dataset: str = "full_dataset", fields=None, journal=dataset_journal):
+    # Builds a panel from the per-symbol {symbol}_{dataset} datasets (stored rows plus
+    # journaled ones), e.g. to move an existing universe into the panel store
+    try:
+        frames = {symbol: journal.read(f"{symbol}_{dataset}", date_column="Date") for symbol in symbols}
+        return Panel.from_frames(frames, fields)
+    except Exception as e:
+        raise StockMovingPredicitionException(e, sys)
+
+
+panel_store = PanelStore()
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import numpy as np
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.components.indicator_kernels import INDICATORS, indicator_features
+
+# JSON object symbol -> sector used for sector-relative features; symbols without an entry
+# get NaN there
+SECTOR_MAP_PATH = os.getenv("SECTOR_MAP_PATH", os.path.join("data", "sectors.json"))
+
+SENTIMENT_INDICATORS = ["sentiment_momentum", "rolling_sentiment_3"]
+
+
+def load_sector_map(path: str = SECTOR_MAP_PATH):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _masked_mean(values, weights=None):
+    # Mean over symbols (axis 0) ignoring NaN, NaN on days where no symbol has a value
+    present = ~np.isnan(values)
+    weights = present.astype(np.float64) if weights is None else np.where(present, np.nan_to_num(weights), 0.0)
+    total = weights.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (np.where(present, values, 0.0) * weights).sum(axis=0) / total, np.nan)
+
+
+def cross_sectional_rank(values):
+    # Percentile rank (1/n .. 1) of each symbol among the symbols with a value that day;
+    # ties are ranked in symbol order
+    present = ~np.isnan(values)
+    order = np.argsort(np.where(present, values, np.inf), axis=0, kind="stable")
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, np.arange(1, values.shape[0] + 1, dtype=np.float64)[:, None], axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(present, ranks / present.sum(axis=0), np.nan)
+
+
+def sector_means(values, symbols, sectors: dict):
+    # Each symbol's sector average per day as (symbols, dates); one matrix product over a
+    # sector x symbol membership matrix gives every sector's sums and counts at once
+    names = sorted(set(sectors[symbol] for symbol in symbols if symbol in sectors))
+    codes = np.array([names.index(sectors[symbol]) if symbol in sectors else -1 for symbol in symbols])
+    membership = (codes[None, :] == np.arange(len(names))[:, None]).astype(np.float64)
+    present = ~np.isnan(values)
+    sums = membership @ np.where(present, values, 0.0)
+    counts = membership @ present.astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    out = np.full(values.shape, np.nan)
+    out[codes >= 0] = means[codes[codes >= 0]]
+    return out
+
+
+def cross_sectional_features(panel, sectors: dict = None):
+    # Features that compare a symbol with the rest of the universe on the same day. Returns
+    # come from lag_1_return (known before the open), sentiment from the same-day score
+    # like the per-symbol sentiment features.
+    try:
+        features = {}
+        if panel.has("lag_1_return"):
+            returns = panel.field("lag_1_return")
+            market_return = _masked_mean(returns)
+            features["market_return"] = market_return
+            features["relative_return"] = returns - market_return
+            features["return_rank"] = cross_sectional_rank(returns)
+            if sectors:
+                features["sector_relative_return"] = returns - sector_means(returns, panel.symbols, sectors)
+        if panel.has("sentiment_score"):
+            scores = panel.field("sentiment_score")
+            # Symbols with more articles that day weigh more in the market-wide sentiment
+            counts = panel.field("news_count") if panel.has("news_count") else None
+            market_sentiment = _masked_mean(scores, counts)
+            features["market_sentiment"] = market_sentiment
+            features["relative_sentiment"] = scores - market_sentiment
+            if counts is not None:
+                features["market_news_count"] = np.nansum(counts, axis=0)
+        return features
+    except Exception as e:
+        raise StockMovingPredicitionException(e, sys)
+
+
+def _compact_order(present):
+    # Per symbol, the days it has a row first (in date order), then the absent days; with
+    # it every symbol's rows are gathered into a left-aligned series without holes
+    order = np.argsort(~present, axis=1, kind="stable")
+    valid = np.arange(present.shape[1])[None, :] < present.sum(axis=1)[:, None]
+    return order, valid
+
+
+def _gather(values, order, valid):
+    gathered = np.take_along_axis(values, np.broadcast_to(order, values.shape), axis=-1)
+    return np.where(valid, gathered, np.nan) if values.dtype.kind == "f" else gathered
+
+
+def _scatter(values, order, valid):
+    out = np.full(order.shape, np.nan)
+    np.put_along_axis(out, order, np.where(valid, values, np.nan), axis=1)
+    return out
+
+
+def panel_features(panel, sectors: dict = None):
+    # Every per-symbol indicator for all symbols at once (same definitions as the feature
+    # graph), the cross-sectional features and the next-day target, as a new panel
+    try:
+        # Each symbol's rows are compacted to a series of only the days it has a row, as in
+        # its own dataset, so days before a listing or dropped mid-series (no news that day)
+        # are not observations for the lags, windows, RSI and the EMAs; results are
+        # scattered back onto the shared calendar
+        present = panel.present()
+        order, valid = _compact_order(present)
+        columns = {field: _gather(panel.field(field), order, valid) for field in panel.fields}
+        columns["Date"] = _gather(np.broadcast_to(panel.dates, present.shape), order, valid)
+        outputs = [name for name in INDICATORS if not name.startswith("_")
+                   and (panel.has("sentiment_score") or name not in SENTIMENT_INDICATORS)]
+        features = {name: _scatter(np.broadcast_to(np.asarray(values, dtype=np.float64), present.shape), order, valid)
+                    for name, values in indicator_features(columns, outputs).items()}
+
+        # Next-day target against the symbol's next row, NaN where it is not known yet
+        close = columns["Close"]
+        next_close = np.concatenate([close[:, 1:], np.full((close.shape[0], 1), np.nan)], axis=1)
+        target = np.where(np.isnan(next_close) | np.isnan(close), np.nan, (next_close > close).astype(np.float64))
+        features["target"] = _scatter(target, order, valid)
+
+        featured = panel.with_fields(features)
+        return featured.with_fields(cross_sectional_features(featured, sectors))
+    except Exception as e:
+        raise StockMovingPredicitionException(e, sys)
@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import uuid
+import threading
+import numpy as np
+import pandas as pd
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.components.trading_calendar import trading_calendar
+
+SOURCES = ["actual", "predicted", "insufficient_data"]
+LABELS = {1: "UP", 0: "DOWN", -1: "N/A"}
+
+
+class PredictionIndexSnapshot:
+    def __init__(self, dates, labels, probabilities, sources, model_version, dataset_mtime, top_features, file_mtime):
+        # dates: sorted datetime64[ns] as int64
+        self.dates = dates
+        self.labels = labels
+        self.probabilities = probabilities
+        self.sources = sources
+        self.model_version = model_version
+        self.dataset_mtime = dataset_mtime
+        self.top_features = top_features
+        self.file_mtime = file_mtime
+        # Response records are built once per load, so a lookup is two binary searches and a slice
+        date_strings = pd.to_datetime(dates).strftime("%Y-%m-%d")
+        self.records = [
+            {"date": date, "prediction": LABELS[int(label)], "probability_up": None if np.isnan(prob) else float(prob),
+             "source": SOURCES[int(source)]}
+            for date, label, prob, source in zip(date_strings, labels, probabilities, sources)
+        ]
+
+
+# Materialized predictions per symbol, stored as sorted arrays in
+# data/{symbol}_prediction_index.npz: date -> (label, probability_up, source), plus the
+# model version and dataset mtime they were computed from. A date range is answered
+# with two binary searches, and only while both the model version and the dataset mtime
+# still match.
+class PredictionIndex:
+    def __init__(self, data_dir: str = "data"):
+        try:
+            self.data_dir = data_dir
+            self._snapshots = {}
+            self._lock = threading.Lock()
+            self.hits = 0
+            self.misses = 0
+            self.materializations = 0
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def path(self, symbol: str):
+        return os.path.join(self.data_dir, f"{symbol}_prediction_index.npz")
+
+    def load(self, symbol: str):
+        # In-memory copy reused until the file on disk is replaced
+        path = self.path(symbol)
+        try:
+            file_mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        snapshot = self._snapshots.get(symbol)
+        if snapshot is not None and snapshot.file_mtime == file_mtime:
+            return snapshot
+
+        with np.load(path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz["meta"]))
+            snapshot = PredictionIndexSnapshot(
+                npz["dates"], npz["labels"], npz["probabilities"], npz["sources"],
+                meta["model_version"], meta["dataset_mtime"], meta["top_features"], file_mtime,
+            )
+        with self._lock:
+            self._snapshots[symbol] = snapshot
+        return snapshot
+
+    def is_current(self, symbol: str, model_version: str, dataset_mtime: int):
+        snapshot = self.load(symbol)
+        return snapshot is not None and snapshot.model_version == model_version and snapshot.dataset_mtime == dataset_mtime
+
+    def lookup(self, symbol: str, start, end, model_version: str, dataset_mtime: int):
+        # Returns (predictions, top_features) when every trading session in [start, end] is
+        # materialized and still valid, otherwise None
+        try:
+            snapshot = self.load(symbol)
+            if snapshot is None or snapshot.model_version != model_version:
+                self.misses += 1
+                return None
+
+            start_ns, end_ns = pd.Timestamp(start).value, pd.Timestamp(end).value
+            lo = np.searchsorted(snapshot.dates, start_ns, side="left")
+            hi = np.searchsorted(snapshot.dates, end_ns, side="right")
+            if hi - lo < trading_calendar.session_count(start, end):
+                self.misses += 1
+                return None
+            # Any row can change with the dataset (a placeholder replaced by real prices turns
+            # into an actual outcome), so every slice needs the dataset it was computed from
+            if snapshot.dataset_mtime != dataset_mtime:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return snapshot.records[lo:hi], snapshot.top_features
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def materialize(self, symbol: str, predictions, model_version: str, dataset_mtime: int, top_features):
+        # predictions: batch_predict records for the whole engineered dataset
+        try:
+            label_codes = {label: code for code, label in LABELS.items()}
+            dates = pd.to_datetime([p["date"] for p in predictions]).as_unit("ns").asi8
+            order = np.argsort(dates, kind="stable")
+            arrays = {
+                "dates": dates[order],
+                "labels": np.array([label_codes[p["prediction"]] for p in predictions], dtype=np.int8)[order],
+                "probabilities": np.array([np.nan if p["probability_up"] is None else p["probability_up"] for p in predictions],
+                                          dtype=np.float64)[order],
+                "sources": np.array([SOURCES.index(p["source"]) for p in predictions], dtype=np.int8)[order],
+                "meta": np.array(json.dumps({"model_version": model_version, "dataset_mtime": dataset_mtime,
+                                             "top_features": top_features})),
+            }
+
+            os.makedirs(self.data_dir, exist_ok=True)
+            tmp_path = f"{self.path(symbol)}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.path(symbol))
+            self.materializations += 1
+            logger.info(f"Materialized {len(dates)} predictions for {symbol} ({model_version})")
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def invalidate(self, symbol: str):
+        # Called when a dataset is rewritten wholesale, since historical rows may have changed
+        with self._lock:
+            self._snapshots.pop(symbol, None)
+        if os.path.exists(self.path(symbol)):
+            os.remove(self.path(symbol))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "materializations": self.materializations,
+            "symbols": list(self._snapshots.keys()),
+        }
+
+
+prediction_index = PredictionIndex()
@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+
+# Optional article weighting for the weighted_* columns: exponential decay by article age
+# at the end of its day (hours), and per-source weights as JSON, e.g. {"Reuters": 2.0}
+SENTIMENT_DECAY_HALF_LIFE_HOURS = float(os.getenv("SENTIMENT_DECAY_HALF_LIFE_HOURS", "0")) or None
+SENTIMENT_SOURCE_WEIGHTS = json.loads(os.getenv("SENTIMENT_SOURCE_WEIGHTS", "{}"))
+
+LABEL_VALUES = np.array([-1, 0, 1])
+
+
+def article_weights(news_df, dates, half_life_hours=None, source_weights=None,
+                    time_column: str = "datetime", source_column: str = "source"):
+    # dates: each article's normalized day. Sources without a weight count 1.
+    weights = np.ones(len(news_df))
+    if source_weights and source_column in news_df.columns:
+        weights *= news_df[source_column].map(source_weights).fillna(1.0).to_numpy(dtype=np.float64)
+    if half_life_hours and time_column in news_df.columns:
+        published = pd.to_datetime(news_df[time_column], unit="s")
+        age_hours = ((dates + pd.Timedelta(days=1)) - published).dt.total_seconds().to_numpy() / 3600
+        weights *= 0.5 ** (np.clip(np.nan_to_num(age_hours, nan=0.0), 0, None) / half_life_hours)
+    return weights
+
+
+def aggregate_daily_sentiment(news_df, date_column: str = "fetched_date", symbol_column: str = None,
+                              half_life_hours=SENTIMENT_DECAY_HALF_LIFE_HOURS, source_weights=SENTIMENT_SOURCE_WEIGHTS):
+    # One row per (symbol, day) with the mean score, the most common label (the lowest one
+    # on ties, like Series.mode), the share of positive articles and the article count.
+    # Groups are integer codes and every statistic is a bincount over them, so a frame
+    # holding the news of many symbols is aggregated in one pass. With weighting enabled,
+    # weighted_sentiment_score and weighted_polarity (label * score) are added.
+    try:
+        dates = pd.to_datetime(news_df[date_column]).dt.normalize()
+        date_codes, date_values = pd.factorize(dates, sort=True)
+        keys = date_codes.astype(np.int64)
+        valid = date_codes >= 0
+        if symbol_column is not None:
+            symbol_codes, symbol_values = pd.factorize(news_df[symbol_column], sort=True)
+            keys = symbol_codes.astype(np.int64) * len(date_values) + date_codes
+            valid &= symbol_codes >= 0
+
+        groups, group_index = np.unique(keys[valid], return_inverse=True)
+        n_groups = len(groups)
+        scores = news_df["sentiment_score"].to_numpy(dtype=np.float64)[valid]
+        labels = news_df["sentiment_label"].to_numpy(dtype=np.int64)[valid]
+
+        counts = np.bincount(group_index, minlength=n_groups)
+        label_counts = np.bincount(group_index * 3 + (labels + 1), minlength=3 * n_groups).reshape(n_groups, 3)
+
+        out = pd.DataFrame({date_column: date_values[groups % max(len(date_values), 1)]})
+        if symbol_column is not None:
+            out.insert(0, symbol_column, symbol_values[groups // len(date_values)])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["sentiment_score"] = np.bincount(group_index, weights=scores, minlength=n_groups) / counts
+            out["sentiment_label"] = LABEL_VALUES[label_counts.argmax(axis=1)] if n_groups else np.array([], dtype=np.int64)
+            out["positive_ratio"] = label_counts[:, 2] / counts
+            out["news_count"] = counts
+
+            if half_life_hours or source_weights:
+                weights = article_weights(news_df, dates, half_life_hours, source_weights)[valid]
+                total = np.bincount(group_index, weights=weights, minlength=n_groups)
+                out["weighted_sentiment_score"] = np.bincount(group_index, weights=weights * scores, minlength=n_groups) / total
+                out["weighted_polarity"] = np.bincount(group_index, weights=weights * scores * labels, minlength=n_groups) / total
+        return out
+    except Exception as e:
+        raise StockMovingPredicitionException(e, sys)
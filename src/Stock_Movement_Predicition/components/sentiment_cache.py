@@ -0,0 +1,88 @@
+import os
+import sys
+import sqlite3
+import hashlib
+import threading
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", os.path.join("data", "sentiment_cache.sqlite"))
+
+# SQLite caps the number of bound parameters per statement
+SQLITE_BATCH = 500
+
+
+# Content-addressed store of FinBERT results: sha256(text) -> (score, label), kept per
+# model name so switching models never serves stale scores. WAL mode lets several
+# ETL worker processes read and write the same file.
+class SentimentCache:
+    def __init__(self, db_path: str = SENTIMENT_CACHE_PATH, model_name: str = "ProsusAI/finbert"):
+        try:
+            self.db_path = db_path
+            self.model_name = model_name
+            self.hits = 0
+            self.misses = 0
+            self._lock = threading.Lock()
+
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment ("
+                "text_hash TEXT NOT NULL, model TEXT NOT NULL, score REAL NOT NULL, label INTEGER NOT NULL, "
+                "PRIMARY KEY (text_hash, model)) WITHOUT ROWID"
+            )
+            self._conn.commit()
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Error opening sentiment cache: {str(e)}", sys)
+
+    @staticmethod
+    def hash_text(text: str):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, hashes):
+        try:
+            hashes = list(dict.fromkeys(hashes))
+            found = {}
+            with self._lock:
+                for i in range(0, len(hashes), SQLITE_BATCH):
+                    batch = hashes[i:i + SQLITE_BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT text_hash, score, label FROM sentiment WHERE model = ? AND text_hash IN ({placeholders})",
+                        [self.model_name, *batch],
+                    ).fetchall()
+                    found.update({text_hash: (score, label) for text_hash, score, label in rows})
+                self.hits += len(found)
+                self.misses += len(hashes) - len(found)
+            return found
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Error reading sentiment cache: {str(e)}", sys)
+
+    def put_many(self, results):
+        # results: iterable of (text_hash, score, label)
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sentiment (text_hash, model, score, label) VALUES (?, ?, ?, ?)",
+                    [(text_hash, self.model_name, float(score), int(label)) for text_hash, score, label in results],
+                )
+                self._conn.commit()
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Error writing sentiment cache: {str(e)}", sys)
+
+    def stats(self, count_entries: bool = False):
+        # Hits and misses are kept in memory; counting entries scans the table, so it is
+        # only done on request (e.g. for the orchestrator summary)
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "model": self.model_name,
+                "path": self.db_path,
+            }
+            if count_entries:
+                stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM sentiment WHERE model = ?", [self.model_name]).fetchone()[0]
+            return stats
@@ -0,0 +1,251 @@
+import os
+import sys
+import gc
+import threading
+import numpy as np
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+
+FINBERT_MODEL_NAME = os.getenv("FINBERT_MODEL_NAME", "ProsusAI/finbert")
+# "torch" (eager PyTorch) or "onnx" (ONNX Runtime, exported on first use)
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")
+# Dynamic int8 quantization of the Linear layers (or of the ONNX graph)
+SENTIMENT_QUANTIZE = os.getenv("SENTIMENT_QUANTIZE", "0") == "1"
+# A batch holds at most this many padded tokens (rows * longest row) and SENTIMENT_MAX_BATCH rows
+SENTIMENT_TOKEN_BUDGET = int(os.getenv("SENTIMENT_TOKEN_BUDGET", "8192"))
+SENTIMENT_MAX_BATCH = int(os.getenv("SENTIMENT_MAX_BATCH", "64"))
+SENTIMENT_MAX_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", "512"))
+# 0 keeps the library default
+SENTIMENT_NUM_THREADS = int(os.getenv("SENTIMENT_NUM_THREADS", "0"))
+SENTIMENT_ONNX_DIR = os.getenv("SENTIMENT_ONNX_DIR", os.path.join("models", "finbert_onnx"))
+# Optimised backends are checked against fp32 labels on the first texts they score
+SENTIMENT_VALIDATE = os.getenv("SENTIMENT_VALIDATE", "1") == "1"
+SENTIMENT_VALIDATE_TEXTS = int(os.getenv("SENTIMENT_VALIDATE_TEXTS", "64"))
+SENTIMENT_MIN_AGREEMENT = float(os.getenv("SENTIMENT_MIN_AGREEMENT", "0.98"))
+
+
+def make_token_batches(lengths, token_budget: int = SENTIMENT_TOKEN_BUDGET, max_batch: int = SENTIMENT_MAX_BATCH):
+    # Sorting by length keeps texts of similar size together, so short headlines are not
+    # padded up to the longest summary. Returns lists of positions into `lengths`.
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    batches, current, longest = [], [], 0
+    for index in order:
+        length = int(lengths[index])
+        # Rows are sorted, so the new row is always the longest in the batch
+        if current and ((len(current) + 1) * max(longest, length) > token_budget or len(current) == max_batch):
+            batches.append(current)
+            current, longest = [], 0
+        current.append(int(index))
+        longest = max(longest, length)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def engine_variant(model_name: str = FINBERT_MODEL_NAME, backend: str = SENTIMENT_BACKEND, quantize: bool = SENTIMENT_QUANTIZE):
+    # Scores differ slightly between variants, so this also namespaces the sentiment cache
+    return f"{model_name}:{backend}{'-int8' if quantize else ''}"
+
+
+def softmax(logits):
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+# CPU inference for FinBERT. Texts are tokenized once without padding, grouped into
+# token-budgeted batches of similar length and scored; results come back in input order.
+class FinbertSentimentEngine:
+    def __init__(self, model_name: str = FINBERT_MODEL_NAME, backend: str = SENTIMENT_BACKEND,
+                 quantize: bool = SENTIMENT_QUANTIZE, token_budget: int = SENTIMENT_TOKEN_BUDGET,
+                 max_batch: int = SENTIMENT_MAX_BATCH, max_length: int = SENTIMENT_MAX_LENGTH,
+                 num_threads: int = SENTIMENT_NUM_THREADS, validate: bool = SENTIMENT_VALIDATE):
+        try:
+            if backend not in ("torch", "onnx"):
+                raise ValueError(f"Unknown sentiment backend '{backend}', expected 'torch' or 'onnx'")
+            self.model_name = model_name
+            self.backend = backend
+            self.quantize = quantize
+            self.token_budget = token_budget
+            self.max_batch = max_batch
+            self.max_length = max_length
+            self.num_threads = num_threads
+            # Only optimised variants need checking against the fp32 reference
+            self._pending_validation = validate and (backend != "torch" or quantize)
+
+            # torch and transformers are imported here so that importing this module stays cheap
+            import torch
+            from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+            if num_threads > 0:
+                torch.set_num_threads(num_threads)
+
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+            self.model.eval()
+            self.id2label = {int(i): label.lower() for i, label in self.model.config.id2label.items()}
+            self.session = None
+
+            if backend == "onnx":
+                self.session = self._load_onnx_session()
+            elif quantize:
+                self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info(f"Loaded FinBERT engine {self.variant}")
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Error loading tokenizer/model: {str(e)}", sys)
+
+    @property
+    def variant(self):
+        return engine_variant(self.model_name, self.backend, self.quantize)
+
+    def _load_onnx_session(self):
+        # onnxruntime is only needed when the ONNX backend is selected
+        import torch
+        import onnxruntime
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        os.makedirs(SENTIMENT_ONNX_DIR, exist_ok=True)
+        fp32_path = os.path.join(SENTIMENT_ONNX_DIR, "model.onnx")
+        if not os.path.exists(fp32_path):
+            sample = self.tokenizer(["warm up"], return_tensors="pt")
+            input_names = list(sample.keys())
+            dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+            dynamic_axes["logits"] = {0: "batch"}
+            torch.onnx.export(
+                self.model, tuple(sample[name] for name in input_names), fp32_path,
+                input_names=input_names, output_names=["logits"], dynamic_axes=dynamic_axes, opset_version=14,
+            )
+            logger.info(f"Exported FinBERT to {fp32_path}")
+
+        path = fp32_path
+        if self.quantize:
+            path = os.path.join(SENTIMENT_ONNX_DIR, "model.int8.onnx")
+            if not os.path.exists(path):
+                quantize_dynamic(fp32_path, path, weight_type=QuantType.QInt8)
+
+        options = onnxruntime.SessionOptions()
+        if self.num_threads > 0:
+            options.intra_op_num_threads = self.num_threads
+        session = onnxruntime.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._onnx_inputs = [node.name for node in session.get_inputs()]
+        return session
+
+    def _logits(self, encodings):
+        import torch
+        if self.session is not None:
+            inputs = self.tokenizer.pad(encodings, return_tensors="np")
+            feed = {name: inputs[name].astype(np.int64) for name in self._onnx_inputs}
+            return self.session.run(["logits"], feed)[0]
+        inputs = self.tokenizer.pad(encodings, return_tensors="pt")
+        with torch.inference_mode():
+            return self.model(**inputs).logits.float().numpy()
+
+    def _score(self, texts):
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+
+        scores = np.zeros(len(texts), dtype=np.float64)
+        preds = np.zeros(len(texts), dtype=np.int64)
+        for batch in make_token_batches(lengths, self.token_budget, self.max_batch):
+            encodings = {key: [values[i] for i in batch] for key, values in encoded.items()}
+            probs = softmax(self._logits(encodings))
+            scores[batch] = probs.max(axis=1)
+            preds[batch] = probs.argmax(axis=1)
+        return scores.tolist(), [self.id2label[int(p)] for p in preds]
+
+    def score(self, texts):
+        # Returns (max softmax probability, lowercase label) per text, in input order
+        try:
+            if not len(texts):
+                return [], []
+            if self._pending_validation:
+                self._pending_validation = False
+                self._validate_or_fall_back(texts[:SENTIMENT_VALIDATE_TEXTS])
+            return self._score(texts)
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Error during sentiment analysis: {str(e)}", sys)
+
+    def compare_to_fp32(self, texts):
+        # Label agreement and score drift of this engine against plain fp32 eager PyTorch
+        import torch
+        from transformers import AutoModelForSequenceClassification
+        reference = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        reference.eval()
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)
+        encodings = {key: list(values) for key, values in encoded.items()}
+        with torch.inference_mode():
+            reference_probs = softmax(reference(**self.tokenizer.pad(encodings, return_tensors="pt")).logits.float().numpy())
+        probs = softmax(self._logits(encodings))
+        return {
+            "texts": len(texts),
+            "label_agreement": float((probs.argmax(axis=1) == reference_probs.argmax(axis=1)).mean()),
+            "max_score_diff": float(np.abs(probs.max(axis=1) - reference_probs.max(axis=1)).max()),
+        }
+
+    def _validate_or_fall_back(self, texts):
+        report = self.compare_to_fp32(texts)
+        logger.info(f"FinBERT {self.variant} vs fp32: {report}")
+        if report["label_agreement"] < SENTIMENT_MIN_AGREEMENT:
+            logger.error(f"FinBERT {self.variant} agrees with fp32 on only {report['label_agreement']:.1%} of labels, "
+                         f"falling back to fp32 torch")
+            from transformers import AutoModelForSequenceClassification
+            self.backend, self.quantize, self.session = "torch", False, None
+            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            self.model.eval()
+
+
+# Process-wide holder for the engine. Nothing is loaded until the first text actually
+# needs scoring, and every DataIngestion in the process shares the same copy. Loading
+# it in a parent before forking workers lets them share the weights copy-on-write.
+class SharedSentimentEngine:
+    def __init__(self, **engine_kwargs):
+        self.engine_kwargs = engine_kwargs
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def variant(self):
+        keys = ("model_name", "backend", "quantize")
+        return engine_variant(**{k: v for k, v in self.engine_kwargs.items() if k in keys})
+
+    @property
+    def effective_variant(self):
+        # The variant actually scoring: differs from the configured one once an optimised
+        # engine failed its fp32 agreement check and fell back
+        if self._engine is None:
+            return self.variant
+        return self._engine.variant
+
+    @property
+    def is_loaded(self):
+        return self._engine is not None
+
+    def get(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = FinbertSentimentEngine(**self.engine_kwargs)
+        return self._engine
+
+    def score(self, texts):
+        return self.get().score(texts)
+
+    def warm_up(self, texts=("Shares rose after the company beat earnings estimates.",)):
+        # The first forward pass allocates buffers and picks kernels; do it off the hot path
+        try:
+            self.get().score(list(texts))
+            logger.info(f"FinBERT {self.variant} warmed up")
+        except Exception as e:
+            raise StockMovingPredicitionException(f"Error warming up sentiment engine: {str(e)}", sys)
+
+    def preload(self):
+        # Call in the parent right before forking workers. Only the weights are loaded:
+        # no forward pass runs here, so no intra-op thread pool exists at fork time and
+        # each child warms up on its own. gc.freeze moves the loaded objects out of the
+        # collector's reach so collections in the children do not write to (and so copy)
+        # the shared pages.
+        self.get()
+        gc.freeze()
+
+
+finbert_engine = SharedSentimentEngine()
@@ -0,0 +1,174 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+import pandas as pd
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.utils.telemetry import span
+from src.Stock_Movement_Predicition.components.dataset_journal import dataset_journal
+from src.Stock_Movement_Predicition.components.model_registry import model_registry
+from src.Stock_Movement_Predicition.components.incremental_feature_engineering import IncrementalFeatureEngineering
+
+# Upper bound for everything held in the cache (datasets + features + models)
+TICKER_CACHE_MAX_MB = int(os.getenv("TICKER_CACHE_MAX_MB", "512"))
+
+
+class TickerCacheEntry:
+    def __init__(self, symbol, dataset, features, model, dataset_mtime, model_version, size_bytes):
+        self.symbol = symbol
+        self.dataset = dataset
+        self.features = features
+        self.model = model
+        self.dataset_mtime = dataset_mtime
+        self.model_version = model_version
+        self.size_bytes = size_bytes
+
+
+# Process-wide cache keyed by symbol holding the parsed full dataset, its engineered
+# features and the loaded model. Entries are invalidated when the dataset mtime or the
+# registry's current model version changes and evicted least-recently-used first once
+# the cap is exceeded.
+class TickerCache:
+    def __init__(self, max_bytes: int, journal=dataset_journal, registry=model_registry):
+        try:
+            self.max_bytes = max_bytes
+            self.journal = journal
+            self.store = journal.store
+            self.registry = registry
+            self._entries = OrderedDict()
+            self._lock = threading.Lock()
+            self._load_locks = {}
+            self.hits = 0
+            self.misses = 0
+            self.reloads = 0
+            self.evictions = 0
+            self.stale_served = 0
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def dataset_name(self, symbol: str):
+        return f"{symbol}_full_dataset"
+
+    def has_dataset(self, symbol: str):
+        return self.store.exists(self.dataset_name(symbol))
+
+    def has_model(self, symbol: str):
+        return self.registry.current(symbol) is not None
+
+    def model_version(self, symbol: str):
+        return self.registry.current_version(symbol)
+
+    def _load_lock(self, symbol: str):
+        with self._lock:
+            return self._load_locks.setdefault(symbol, threading.Lock())
+
+    def _lookup(self, symbol: str, dataset_mtime: int, model_version: str):
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and entry.dataset_mtime == dataset_mtime and entry.model_version == model_version:
+                self._entries.move_to_end(symbol)
+                self.hits += 1
+                return entry
+            return None
+
+    def _load(self, symbol: str, dataset_mtime: int, model_version):
+        # Stored rows plus any journaled rows that have not been compacted yet
+        with span("predict", "dataset_load"):
+            df = self.journal.read(self.dataset_name(symbol), date_column="Date")
+
+        with span("predict", "model_load"):
+            model = self.registry.load(model_version)
+
+        # Only rows appended since the last load are engineered, the rest comes from the persisted
+        # state, and only the features the model reads (plus the target) are computed
+        features = getattr(model, "feature_name_", None)
+        with span("predict", "feature_engineering"):
+            fe = IncrementalFeatureEngineering(state_dir=self.store.data_dir)
+            df_fe = fe.initiate_incremental_feature_engineering(df.copy(), symbol, features=features)
+
+        # Artifact size is a reasonable proxy for the in-memory size of a tree ensemble
+        size_bytes = (
+            int(df.memory_usage(deep=True).sum())
+            + int(df_fe.memory_usage(deep=True).sum())
+            + os.path.getsize(model_version.artifact_path("pkl"))
+        )
+        return TickerCacheEntry(symbol, df, df_fe, model, dataset_mtime, model_version.version, size_bytes)
+
+    def _store(self, entry: TickerCacheEntry):
+        with self._lock:
+            if entry.symbol in self._entries:
+                self.reloads += 1
+            self._entries[entry.symbol] = entry
+            self._entries.move_to_end(entry.symbol)
+
+            # Evict least recently used entries, but always keep the one just loaded
+            while self.size_bytes() > self.max_bytes and len(self._entries) > 1:
+                evicted_symbol, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                logger.info(f"Evicted {evicted_symbol} from ticker cache")
+
+    def get(self, symbol: str):
+        try:
+            dataset_mtime = self.journal.mtime(self.dataset_name(symbol))
+            model_version = self.registry.current(symbol)
+            if model_version is None:
+                raise FileNotFoundError(f"No registered model for {symbol}")
+
+            entry = self._lookup(symbol, dataset_mtime, model_version.version)
+            if entry is not None:
+                return entry
+
+            # Only one request per symbol loads from disk, the others wait and reuse it. While a
+            # newly promoted model loads, requests keep being served by the previous version.
+            load_lock = self._load_lock(symbol)
+            if not load_lock.acquire(blocking=False):
+                with self._lock:
+                    stale = self._entries.get(symbol)
+                    if stale is not None and stale.dataset_mtime == dataset_mtime:
+                        self.stale_served += 1
+                        return stale
+                load_lock.acquire()
+            try:
+                entry = self._lookup(symbol, dataset_mtime, model_version.version)
+                if entry is not None:
+                    return entry
+
+                with self._lock:
+                    self.misses += 1
+                logger.info(f"Ticker cache miss for {symbol}, loading dataset and model version {model_version.version}")
+                entry = self._load(symbol, dataset_mtime, model_version)
+                self._store(entry)
+                return entry
+            finally:
+                load_lock.release()
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def invalidate(self, symbol: str = None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
+
+    def size_bytes(self):
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "stale_served": self.stale_served,
+                "entries": list(self._entries.keys()),
+                "size_bytes": self.size_bytes(),
+                "max_bytes": self.max_bytes,
+            }
+
+
+ticker_cache = TickerCache(max_bytes=TICKER_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,148 @@
+import os
+import sys
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+
+# XNYS (NYSE holidays and closures), weekdays (Monday to Friday) or all (every calendar
+# day, the behaviour before the calendar existed)
+TRADING_CALENDAR = os.getenv("TRADING_CALENDAR", "XNYS")
+TRADING_CALENDAR_FIRST_YEAR = int(os.getenv("TRADING_CALENDAR_FIRST_YEAR", "1990"))
+TRADING_CALENDAR_LAST_YEAR = int(os.getenv("TRADING_CALENDAR_LAST_YEAR", "2100"))
+
+# Unscheduled full-day NYSE closures
+XNYS_SPECIAL_CLOSURES = [
+    "1994-04-27",  # Nixon funeral
+    "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14",  # September 11
+    "2004-06-11",  # Reagan funeral
+    "2007-01-02",  # Ford funeral
+    "2012-10-29", "2012-10-30",  # Hurricane Sandy
+    "2018-12-05",  # Bush funeral
+    "2025-01-09",  # Carter funeral
+]
+
+
+def easter_sunday(year: int):
+    # Anonymous Gregorian algorithm
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int):
+    # n-th given weekday (Monday=0) of the month; n=-1 is the last one
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def observed(day: date):
+    # Saturday holidays are observed on Friday, Sunday holidays on Monday
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def xnys_holidays(year: int):
+    holidays = [
+        # A Saturday New Year's Day is not observed on the Friday before
+        date(year, 1, 2) if date(year, 1, 1).weekday() == 6 else date(year, 1, 1),
+        nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        easter_sunday(year) - timedelta(days=2),  # Good Friday
+        nth_weekday(year, 5, 0, -1),  # Memorial Day
+        observed(date(year, 7, 4)),
+        nth_weekday(year, 9, 0, 1),  # Labor Day
+        nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        observed(date(year, 12, 25)),
+    ]
+    if year >= 1998:
+        holidays.append(nth_weekday(year, 1, 0, 3))  # Martin Luther King Jr. Day
+    if year >= 2022:
+        holidays.append(observed(date(year, 6, 19)))  # Juneteenth
+    return [day for day in holidays if day.weekday() < 5]
+
+
+# Sessions of one exchange as a sorted datetime64[D] array built once from the bundled
+# rules, so membership, range and gap queries are binary searches over it
+class TradingCalendar:
+    def __init__(self, name: str = TRADING_CALENDAR, first_year: int = TRADING_CALENDAR_FIRST_YEAR,
+                 last_year: int = TRADING_CALENDAR_LAST_YEAR):
+        try:
+            if name not in ("XNYS", "weekdays", "all"):
+                raise ValueError(f"Unknown trading calendar '{name}', expected XNYS, weekdays or all")
+            self.name = name
+            days = np.arange(np.datetime64(f"{first_year}-01-01"), np.datetime64(f"{last_year + 1}-01-01"))
+            if name != "all":
+                # 1970-01-01 was a Thursday
+                days = days[(days.astype(np.int64) + 3) % 7 < 5]
+            if name == "XNYS":
+                closed = [day for year in range(first_year, last_year + 1) for day in xnys_holidays(year)]
+                closed = np.array(closed + XNYS_SPECIAL_CLOSURES, dtype="datetime64[D]")
+                days = days[~np.isin(days, closed)]
+            self.sessions = days
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    @staticmethod
+    def _to_days(values):
+        return pd.to_datetime(pd.Series(np.atleast_1d(values))).dt.normalize().to_numpy().astype("datetime64[D]")
+
+    def _bounds(self, start, end):
+        lo = np.searchsorted(self.sessions, self._to_days(start)[0], side="left")
+        hi = np.searchsorted(self.sessions, self._to_days(end)[0], side="right")
+        return int(lo), int(hi)
+
+    def sessions_in_range(self, start, end):
+        lo, hi = self._bounds(start, end)
+        return self.sessions[lo:hi]
+
+    def session_count(self, start, end):
+        lo, hi = self._bounds(start, end)
+        return max(hi - lo, 0)
+
+    def is_session(self, dates):
+        # Elementwise for any sequence of dates
+        days = self._to_days(dates)
+        index = np.minimum(np.searchsorted(self.sessions, days), len(self.sessions) - 1)
+        return self.sessions[index] == days
+
+    def next_session(self, day, inclusive: bool = False):
+        # First session after `day` (or on it, when inclusive)
+        index = np.searchsorted(self.sessions, self._to_days(day)[0], side="left" if inclusive else "right")
+        return pd.Timestamp(self.sessions[index])
+
+    def previous_session(self, day, inclusive: bool = False):
+        index = np.searchsorted(self.sessions, self._to_days(day)[0], side="right" if inclusive else "left") - 1
+        return pd.Timestamp(self.sessions[index])
+
+    def missing_sessions(self, start, end, present_dates):
+        # Sessions in [start, end] without a row in present_dates
+        sessions = self.sessions_in_range(start, end)
+        present = np.unique(self._to_days(present_dates)) if len(present_dates) else np.array([], dtype="datetime64[D]")
+        index = np.minimum(np.searchsorted(present, sessions), max(len(present) - 1, 0))
+        found = present[index] == sessions if len(present) else np.zeros(len(sessions), dtype=bool)
+        return pd.DatetimeIndex(sessions[~found])
+
+    def drop_placeholders(self, df, date_column: str = "Date", value_column: str = "Close"):
+        # Rows on non-session days without a price are placeholders for days the exchange
+        # was closed; real rows on those days (other venues, synthetic data) are kept
+        if df.empty or date_column not in df.columns or value_column not in df.columns:
+            return df
+        keep = self.is_session(df[date_column]) | df[value_column].notna().to_numpy()
+        if keep.all():
+            return df
+        return df[keep].reset_index(drop=True)
+
+
+trading_calendar = TradingCalendar()
@@ -0,0 +1,209 @@
+import os
+import sys
+import time
+import traceback
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.utils.telemetry import trace, summarize_spans
+
+STAGES = ["fetch", "sentiment", "features"]
+
+# One DataIngestion per worker process, reused across symbols. FinBERT itself lives in
+# the process-wide finbert_engine and is inherited from the parent when workers fork.
+_worker_ingestion = None
+
+
+def init_cpu_worker(warm_up_sentiment: bool):
+    # An initializer that raises breaks the whole pool, so a failed warm-up is only
+    # logged and the sentiment stage reports the error per symbol instead
+    if warm_up_sentiment:
+        from src.Stock_Movement_Predicition.components.sentiment_engine import finbert_engine
+        try:
+            finbert_engine.warm_up()
+        except Exception as e:
+            logger.error(f"FinBERT warm-up failed in worker {os.getpid()}: {e}")
+
+
+def isolated_stage(fn):
+    # StockMovingPredicitionException keeps a reference to the sys module and cannot be
+    # pickled back from a worker process, so stage errors cross the boundary as plain text
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            raise RuntimeError(str(e)) from None
+    return wrapper
+
+
+@isolated_stage
+def run_fetch_stage(symbol: str, months: int, vantage_api_key: str, finn_api_key: str, streaming: bool = False):
+    from src.Stock_Movement_Predicition.components.market_data import MarketDataIngestion
+
+    started = time.perf_counter()
+    with trace() as spans:
+        fetched = MarketDataIngestion().initiate_data_ingestion(
+            symbol=symbol, months=months, vantage_api_key=vantage_api_key, finn_api_key=finn_api_key,
+            streaming=streaming,
+        )
+    # Anything but the row counts means the fetch did not complete; failing the stage keeps
+    # sentiment from running on stale or missing data
+    if not isinstance(fetched, dict):
+        raise RuntimeError(f"Fetch for {symbol} returned {type(fetched).__name__} instead of row counts")
+    return {"seconds": time.perf_counter() - started, **fetched, "spans_ms": summarize_spans(spans)}
+
+
+@isolated_stage
+def run_sentiment_stage(symbol: str, months: int, streaming: bool = False, finn_api_key: str = None):
+    global _worker_ingestion
+    from src.Stock_Movement_Predicition.components.data_ingestion import DataIngestion
+
+    started = time.perf_counter()
+    if _worker_ingestion is None:
+        _worker_ingestion = DataIngestion()
+    if streaming:
+        # News is read back from the fetch stage's per-day cache one chunk at a time
+        with trace() as spans:
+            streamed = _worker_ingestion.initiate_streaming_ingestion(symbol=symbol, months=months, finn_api_key=finn_api_key)
+        return {"seconds": time.perf_counter() - started, **streamed, "spans_ms": summarize_spans(spans),
+                "sentiment_cache": _worker_ingestion.sentiment_cache.stats(count_entries=True)}
+    with trace() as spans:
+        full_df = _worker_ingestion.initiate_data_ingestion(symbol=symbol, months=months)
+    return {"seconds": time.perf_counter() - started, "rows": len(full_df), "spans_ms": summarize_spans(spans),
+            "sentiment_cache": _worker_ingestion.sentiment_cache.stats(count_entries=True)}
+
+
+@isolated_stage
+def run_features_stage(symbol: str):
+    from src.Stock_Movement_Predicition.components.data_preprocessing import FeatureEngineering
+    from src.Stock_Movement_Predicition.components.dataset_journal import dataset_journal
+
+    started = time.perf_counter()
+    full_df = dataset_journal.read(f"{symbol}_full_dataset", date_column="Date")
+    final_df = FeatureEngineering().initiate_feature_engineering(full_df, symbol=symbol)
+    return {"seconds": time.perf_counter() - started, "rows": len(final_df)}
+
+
+def load_symbols(symbols=None, symbols_file: str = None):
+    universe = [s.upper() for s in (symbols or [])]
+    if symbols_file:
+        with open(symbols_file) as f:
+            for line in f:
+                line = line.split("#")[0].strip()
+                if line:
+                    universe.extend(s.strip().upper() for s in line.split(",") if s.strip())
+    # Keep the given order but drop duplicates
+    return list(dict.fromkeys(universe))
+
+
+# Runs fetch -> sentiment -> features for many symbols as overlapping stages: network
+# fetches run on a thread pool while FinBERT scoring and feature engineering run on a
+# process pool, and each symbol moves to its next stage as soon as its previous one ends.
+# A failing symbol is recorded and skipped without stopping the others.
+class PipelineOrchestrator:
+    def __init__(self, months: int = 24, stages=None, workers: int = None, fetch_workers: int = 4,
+                 vantage_api_key: str = None, finn_api_key: str = None, streaming: bool = False):
+        try:
+            self.months = months
+            self.stages = [stage for stage in STAGES if stage in (stages or STAGES)]
+            self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+            self.fetch_workers = fetch_workers
+            self.vantage_api_key = vantage_api_key
+            self.finn_api_key = finn_api_key
+            # Chunked fetch -> score -> aggregate -> append with bounded memory for long histories
+            self.streaming = streaming
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def _submit(self, symbol: str, stage: str, io_pool, cpu_pool):
+        if stage == "fetch":
+            return io_pool.submit(run_fetch_stage, symbol, self.months, self.vantage_api_key, self.finn_api_key, self.streaming)
+        if stage == "sentiment":
+            return cpu_pool.submit(run_sentiment_stage, symbol, self.months, self.streaming, self.finn_api_key)
+        return cpu_pool.submit(run_features_stage, symbol)
+
+    def _next_stage(self, stage: str):
+        index = self.stages.index(stage) + 1
+        return self.stages[index] if index < len(self.stages) else None
+
+    def run(self, symbols):
+        try:
+            results = {symbol: {"status": "pending", "stages": {}} for symbol in symbols}
+            if not self.stages or not symbols:
+                return self.summarize(results, 0.0)
+
+            started = time.perf_counter()
+            total_steps = len(symbols) * len(self.stages)
+            completed_steps = 0
+            logger.info(f"Running {self.stages} for {len(symbols)} symbols on {self.workers} workers")
+
+            warm_up_sentiment = "sentiment" in self.stages
+            if warm_up_sentiment and multiprocessing.get_start_method() == "fork":
+                # Load FinBERT once here so forked workers share its pages copy-on-write
+                from src.Stock_Movement_Predicition.components.sentiment_engine import finbert_engine
+                try:
+                    finbert_engine.preload()
+                except Exception as e:
+                    logger.error(f"FinBERT preload failed, workers will load it themselves: {e}")
+
+            with ThreadPoolExecutor(max_workers=self.fetch_workers) as io_pool, \
+                    ProcessPoolExecutor(max_workers=self.workers, initializer=init_cpu_worker,
+                                        initargs=(warm_up_sentiment,)) as cpu_pool:
+                in_flight = {self._submit(symbol, self.stages[0], io_pool, cpu_pool): (symbol, self.stages[0]) for symbol in symbols}
+
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        symbol, stage = in_flight.pop(future)
+                        completed_steps += 1
+                        try:
+                            outcome = future.result()
+                        except Exception as e:
+                            # Remaining stages for this symbol are skipped, the rest carry on
+                            results[symbol]["status"] = "failed"
+                            results[symbol]["failed_stage"] = stage
+                            results[symbol]["error"] = str(e)
+                            completed_steps += len(self.stages) - self.stages.index(stage) - 1
+                            logger.error(f"[{completed_steps}/{total_steps}] {symbol} failed in {stage}: {e}")
+                            logger.debug("".join(traceback.format_exception(e)))
+                            continue
+
+                        results[symbol]["stages"][stage] = outcome
+                        logger.info(f"[{completed_steps}/{total_steps}] {symbol} {stage} done in {outcome['seconds']:.2f}s")
+
+                        next_stage = self._next_stage(stage)
+                        if next_stage is None:
+                            results[symbol]["status"] = "succeeded"
+                        else:
+                            in_flight[self._submit(symbol, next_stage, io_pool, cpu_pool)] = (symbol, next_stage)
+
+            return self.summarize(results, time.perf_counter() - started)
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def summarize(self, results, wall_seconds: float):
+        stage_timings = {}
+        for stage in self.stages:
+            seconds = [r["stages"][stage]["seconds"] for r in results.values() if stage in r["stages"]]
+            # Time inside each stage split by span (load, sentiment, merge, save, ...)
+            spans_ms = {}
+            for r in results.values():
+                for name, ms in r["stages"].get(stage, {}).get("spans_ms", {}).items():
+                    spans_ms[name] = spans_ms.get(name, 0.0) + ms
+            stage_timings[stage] = {
+                "count": len(seconds),
+                "total_seconds": sum(seconds),
+                "mean_seconds": sum(seconds) / len(seconds) if seconds else 0.0,
+                "max_seconds": max(seconds) if seconds else 0.0,
+                "spans_ms": spans_ms,
+            }
+        return {
+            "wall_seconds": wall_seconds,
+            "succeeded": [s for s, r in results.items() if r["status"] == "succeeded"],
+            "failed": {s: {"stage": r["failed_stage"], "error": r["error"]} for s, r in results.items() if r["status"] == "failed"},
+            "stages": stage_timings,
+            "symbols": results,
+        }
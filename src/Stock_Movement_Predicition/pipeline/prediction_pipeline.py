@@ -0,0 +1,105 @@
+import sys
+import numpy as np
+import pandas as pd
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+
+# Columns that are never model inputs, used when the model does not carry its feature names
+NON_FEATURE_COLUMNS = ["Date", "target", "Open", "High", "Low", "Close", "Volume", "text", "sentiment_score"]
+
+
+class PredictionPipeline:
+    def __init__(self, top_n_features: int = 15):
+        try:
+            self.top_n_features = top_n_features
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def get_feature_columns(self, df, model):
+        if hasattr(model, "feature_name_"):
+            return list(model.feature_name_)
+        return [col for col in df.columns if col not in NON_FEATURE_COLUMNS]
+
+    def get_top_features(self, model):
+        if hasattr(model, "feature_importances_") and hasattr(model, "feature_name_"):
+            importance_df = pd.DataFrame({
+                "feature": model.feature_name_,
+                "importance": model.feature_importances_
+            }).sort_values(by="importance", ascending=False).head(self.top_n_features)
+            return importance_df.to_dict(orient="records")
+        return []
+
+    def batch_predict(self, df_final, model):
+        try:
+            n_rows = len(df_final)
+            labels = np.full(n_rows, -1, dtype=np.int64)
+            probabilities = np.full(n_rows, np.nan, dtype=np.float64)
+            sources = np.full(n_rows, "insufficient_data", dtype=object)
+
+            # Rows whose next-day close is already known report the actual movement
+            if "target" in df_final.columns:
+                target = df_final["target"].to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                target = np.full(n_rows, np.nan)
+            has_target = ~np.isnan(target)
+            labels[has_target] = target[has_target].astype(np.int64)
+            sources[has_target] = "actual"
+
+            # Every remaining row with a complete feature vector goes into a single model call
+            feature_cols = self.get_feature_columns(df_final, model)
+            X = np.ascontiguousarray(df_final[feature_cols].to_numpy(dtype=np.float32, na_value=np.nan))
+            needs_inference = ~has_target & ~np.isnan(X).any(axis=1)
+
+            if needs_inference.any():
+                X_infer = X[needs_inference]
+                if hasattr(model, "predict_proba"):
+                    proba = model.predict_proba(X_infer)
+                    classes = np.asarray(getattr(model, "classes_", np.arange(proba.shape[1])))
+                    labels[needs_inference] = classes[np.argmax(proba, axis=1)]
+                    probabilities[needs_inference] = proba[:, list(classes).index(1)] if 1 in classes else np.nan
+                else:
+                    labels[needs_inference] = model.predict(X_infer)
+                sources[needs_inference] = "predicted"
+
+            predictions = np.where(labels == 1, "UP", np.where(labels == 0, "DOWN", "N/A"))
+            dates = pd.to_datetime(df_final["Date"]).dt.strftime("%Y-%m-%d").to_numpy()
+            probabilities = [None if np.isnan(p) else float(p) for p in probabilities]
+
+            return [
+                {"date": date, "prediction": pred, "probability_up": prob, "source": source}
+                for date, pred, prob, source in zip(dates, predictions.tolist(), probabilities, sources.tolist())
+            ]
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def _panel_rows(self, panel, feature_cols, symbol_indices):
+        # Feature rows of the given symbols straight from the panel array, symbol-major,
+        # without the days a symbol did not trade (those are not rows of its dataset)
+        block = panel.values[[panel.fields.index(col) for col in feature_cols + ["target"]]][:, symbol_indices, :]
+        traded = panel.present()[symbol_indices]
+        df_final = pd.DataFrame(block.reshape(block.shape[0], -1).T[traded.ravel()], columns=feature_cols + ["target"])
+        df_final["Date"] = np.broadcast_to(panel.dates, traded.shape)[traded].astype("datetime64[ns]")
+        return df_final, traded.sum(axis=1)
+
+    def predict_panel(self, panel, models):
+        # models: one model shared by every symbol, predicted in a single call over the
+        # whole panel, or symbol -> model with one call per symbol (symbols without a model
+        # are skipped). Returns symbol -> the same records as batch_predict.
+        try:
+            if not isinstance(models, dict):
+                feature_cols = self.get_feature_columns(pd.DataFrame(columns=panel.fields), models)
+                df_final, counts = self._panel_rows(panel, feature_cols, list(range(len(panel.symbols))))
+                records = self.batch_predict(df_final, models)
+                bounds = np.concatenate([[0], np.cumsum(counts)])
+                return {symbol: records[bounds[i]:bounds[i + 1]] for i, symbol in enumerate(panel.symbols)}
+
+            results = {}
+            for i, symbol in enumerate(panel.symbols):
+                model = models.get(symbol)
+                if model is None:
+                    continue
+                feature_cols = self.get_feature_columns(pd.DataFrame(columns=panel.fields), model)
+                df_final, _ = self._panel_rows(panel, feature_cols, [i])
+                results[symbol] = self.batch_predict(df_final, model)
+            return results
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
@@ -0,0 +1,109 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.Stock_Movement_Predicition.logging import logger
+
+# Threads work here because the ticker cache is per process and LightGBM releases the GIL
+PREDICT_WORKERS = int(os.getenv("PREDICT_WORKERS", "4"))
+# Distinct computations allowed to run or wait for a worker; beyond this requests get 429
+PREDICT_MAX_IN_FLIGHT = int(os.getenv("PREDICT_MAX_IN_FLIGHT", "32"))
+# Computations allowed to wait for a free worker; beyond this requests get 429 as well
+PREDICT_MAX_QUEUED = int(os.getenv("PREDICT_MAX_QUEUED", str(max(PREDICT_MAX_IN_FLIGHT - PREDICT_WORKERS, 1))))
+# A request still waiting for its result after this many seconds gets 503
+PREDICT_TIMEOUT_SECONDS = float(os.getenv("PREDICT_TIMEOUT_SECONDS", "30"))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int = 1):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+# Runs blocking prediction work on a bounded thread pool so the event loop only awaits
+# it. Identical requests that arrive while one is running share its future instead of
+# computing again, and new work is refused once too much is already queued. Bookkeeping
+# happens on the event loop thread, except the queued count, which workers decrement when
+# they pick a computation up.
+class PredictionScheduler:
+    def __init__(self, workers: int = PREDICT_WORKERS, max_in_flight: int = PREDICT_MAX_IN_FLIGHT,
+                 timeout: float = PREDICT_TIMEOUT_SECONDS, max_queued: int = PREDICT_MAX_QUEUED):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict")
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self._in_flight = {}
+        # Submitted computations no worker has started yet
+        self.queued = 0
+        self._queued_lock = threading.Lock()
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def admit(self):
+        if len(self._in_flight) >= self.max_in_flight or self.queued >= self.max_queued:
+            self.rejected += 1
+            logger.info(f"Rejecting prediction request, {len(self._in_flight)} computations in flight, {self.queued} queued")
+            raise AdmissionRejected(429, "Too many prediction requests in flight, retry shortly")
+
+    def _submit(self, fn, *args):
+        state = {"started": False}
+
+        def start():
+            with self._queued_lock:
+                state["started"] = True
+                self.queued -= 1
+            return fn(*args)
+
+        def done(_):
+            # A computation cancelled before a worker picked it up never ran start()
+            with self._queued_lock:
+                if not state["started"]:
+                    state["started"] = True
+                    self.queued -= 1
+
+        with self._queued_lock:
+            self.queued += 1
+        future = asyncio.get_running_loop().run_in_executor(self.executor, start)
+        future.add_done_callback(done)
+        return future
+
+    async def run(self, key, fn, *args, admit: bool = True):
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            if admit:
+                self.admit()
+            future = self._submit(fn, *args)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.submitted += 1
+
+        try:
+            # shield keeps the shared computation alive if this caller times out or disconnects
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise AdmissionRejected(503, "Prediction timed out waiting for a worker", retry_after=int(self.timeout))
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "in_flight": len(self._in_flight),
+            # Submitted computations waiting for a free worker thread
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+prediction_scheduler = PredictionScheduler()
@@ -0,0 +1,181 @@
+import sys
+from datetime import datetime
+import pandas as pd
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.utils.telemetry import span
+from src.Stock_Movement_Predicition.components.dataset_journal import dataset_journal
+from src.Stock_Movement_Predicition.components.ticker_cache import ticker_cache
+from src.Stock_Movement_Predicition.components.prediction_index import prediction_index
+from src.Stock_Movement_Predicition.components.trading_calendar import trading_calendar
+from src.Stock_Movement_Predicition.pipeline.prediction_pipeline import PredictionPipeline
+
+PLACEHOLDER_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "sentiment_score", "text"]
+
+
+# Raised for problems with the request itself; the API turns these into HTTP errors
+class PredictionRequestError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+# Synchronous prediction work shared by the API endpoints: resolves a symbol's cached
+# dataset, features and model, journals placeholders for missing dates and predicts
+# any number of date ranges against one feature frame.
+class PredictionService:
+    def __init__(self, cache=ticker_cache, journal=dataset_journal, pipeline: PredictionPipeline = None, index=prediction_index):
+        try:
+            self.cache = cache
+            self.journal = journal
+            self.index = index
+            self.pipeline = pipeline or PredictionPipeline()
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    @staticmethod
+    def parse_range(start_date: str, end_date: str):
+        try:
+            start = datetime.strptime(start_date, "%Y-%m-%d").date()
+            end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            raise PredictionRequestError(400, "Dates must be given as YYYY-MM-DD")
+        if start > end:
+            raise PredictionRequestError(400, "start_date is after end_date")
+        if trading_calendar.session_count(start, end) == 0:
+            raise PredictionRequestError(400, f"No {trading_calendar.name} trading sessions between start_date and end_date")
+        return start, end
+
+    def load(self, symbol: str, ranges):
+        # Returns the cache entry for the symbol with every date in `ranges` present
+        if not self.cache.has_dataset(symbol):
+            raise PredictionRequestError(404, "Full dataset not found.")
+        if not self.cache.has_model(symbol):
+            raise PredictionRequestError(404, "Model not found.")
+        entry = self.cache.get(symbol)
+
+        with span("predict", "gap_fill"):
+            # Only trading sessions without a row are gaps; weekends and holidays never get rows
+            present_dates = entry.dataset["Date"].to_numpy()
+            missing_dates = sorted(set().union(*[
+                trading_calendar.missing_sessions(start, end, present_dates) for start, end in ranges
+            ]))
+
+            if missing_dates:
+                logger.info(f"{symbol}: journaling {len(missing_dates)} placeholder rows for missing dates")
+                # Placeholder rows for every missing date go to the journal in one locked append,
+                # a background compaction merges them into the stored dataset later
+                placeholders = pd.DataFrame({"Date": pd.DatetimeIndex(missing_dates)})
+                for col in PLACEHOLDER_COLUMNS:
+                    placeholders[col] = None
+                self.journal.append(self.cache.dataset_name(symbol), placeholders, date_column="Date")
+
+            # The append bumps the journal mtime, so this reloads and re-engineers once
+            entry = self.cache.get(symbol)
+
+        self.materialize(symbol, entry)
+        return entry
+
+    def materialize(self, symbol: str, entry):
+        # Whenever the engineered features or the model change, every row is predicted in
+        # one call and stored in the prediction index for later lookups
+        if self.index.is_current(symbol, entry.model_version, entry.dataset_mtime):
+            return
+        with span("predict", "inference"):
+            predictions = self.pipeline.batch_predict(entry.features, entry.model)
+            top_features = self.pipeline.get_top_features(entry.model)
+        with span("predict", "index_write"):
+            self.index.materialize(symbol, predictions, entry.model_version, entry.dataset_mtime, top_features)
+
+    def lookup(self, symbol: str, start, end):
+        # Answers the range from the prediction index without touching the dataset or model
+        model_version = self.cache.model_version(symbol) if self.cache.has_dataset(symbol) else None
+        if model_version is None:
+            return None
+        with span("predict", "index_lookup"):
+            dataset_mtime = self.journal.mtime(self.cache.dataset_name(symbol))
+            hit = self.index.lookup(symbol, start, end, model_version, dataset_mtime)
+        if hit is None:
+            return None
+        predictions, top_features = hit
+        return {
+            "symbol": symbol,
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": end.strftime("%Y-%m-%d"),
+            "predictions": predictions,
+            "top_15_features": top_features,
+        }
+
+    def predict_range(self, symbol: str, entry, start, end, top_features=None):
+        df_fe = entry.features
+        df_final = df_fe[(df_fe["Date"] >= pd.Timestamp(start)) & (df_fe["Date"] <= pd.Timestamp(end))]
+        if df_final.empty:
+            raise PredictionRequestError(400, "No feature-engineered data in range")
+
+        with span("predict", "inference"):
+            if top_features is None:
+                top_features = self.pipeline.get_top_features(entry.model)
+            predictions = self.pipeline.batch_predict(df_final, entry.model)
+        return {
+            "symbol": symbol,
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": end.strftime("%Y-%m-%d"),
+            "predictions": predictions,
+            "top_15_features": top_features,
+        }
+
+    def predict(self, symbol: str, start_date: str, end_date: str):
+        start, end = self.parse_range(start_date, end_date)
+        cached = self.lookup(symbol, start, end)
+        if cached is not None:
+            return cached
+        entry = self.load(symbol, [(start, end)])
+        return self.predict_range(symbol, entry, start, end)
+
+    @staticmethod
+    def group_by_symbol(items):
+        # items: iterable of (symbol, start_date, end_date); keeps each item's position
+        groups = {}
+        for index, (symbol, start_date, end_date) in enumerate(items):
+            groups.setdefault(symbol.upper(), []).append((index, start_date, end_date))
+        return groups
+
+    def predict_symbol_batch(self, symbol: str, items):
+        # One load (and at most one placeholder append) for all ranges of a symbol. Never
+        # raises: every item gets either a result or an error record.
+        def error_record(index, start_date, end_date, status_code, detail):
+            return {"index": index, "symbol": symbol, "start_date": start_date, "end_date": end_date,
+                    "error": {"status_code": status_code, "detail": detail}}
+
+        records, parsed = [], []
+        for index, start_date, end_date in items:
+            try:
+                start, end = self.parse_range(start_date, end_date)
+                # Ranges already materialized in the prediction index need no computation
+                cached = self.lookup(symbol, start, end)
+                if cached is not None:
+                    records.append({"index": index, **cached})
+                else:
+                    parsed.append((index, start, end))
+            except Exception as e:
+                status_code, detail = (e.status_code, e.detail) if isinstance(e, PredictionRequestError) else (500, str(e))
+                records.append(error_record(index, start_date, end_date, status_code, detail))
+
+        if not parsed:
+            return records
+        try:
+            entry = self.load(symbol, [(start, end) for _, start, end in parsed])
+            top_features = self.pipeline.get_top_features(entry.model)
+        except Exception as e:
+            status_code, detail = (e.status_code, e.detail) if isinstance(e, PredictionRequestError) else (500, str(e))
+            logger.error(f"Batch prediction failed for {symbol}: {detail}")
+            return records + [error_record(index, str(start), str(end), status_code, detail) for index, start, end in parsed]
+
+        for index, start, end in parsed:
+            try:
+                records.append({"index": index, **self.predict_range(symbol, entry, start, end, top_features)})
+            except Exception as e:
+                status_code, detail = (e.status_code, e.detail) if isinstance(e, PredictionRequestError) else (500, str(e))
+                records.append(error_record(index, str(start), str(end), status_code, detail))
+        return records
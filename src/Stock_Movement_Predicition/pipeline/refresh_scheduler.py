@@ -0,0 +1,317 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.utils.telemetry import span
+from src.Stock_Movement_Predicition.components.dataset_journal import dataset_journal
+from src.Stock_Movement_Predicition.components.model_registry import model_registry
+from src.Stock_Movement_Predicition.components.trading_calendar import trading_calendar
+from src.Stock_Movement_Predicition.pipeline.prediction_service import PLACEHOLDER_COLUMNS
+
+# Runs inside the API process when enabled; `python refresh.py` runs the same loop as a sidecar
+REFRESH_ENABLED = os.getenv("REFRESH_ENABLED", "0") == "1"
+# Comma separated symbols to refresh; every symbol with a registered model when empty
+REFRESH_SYMBOLS = [s.strip().upper() for s in os.getenv("REFRESH_SYMBOLS", "").split(",") if s.strip()]
+REFRESH_TIMEZONE = os.getenv("REFRESH_TIMEZONE", "America/New_York")
+REFRESH_MARKET_CLOSE = os.getenv("REFRESH_MARKET_CLOSE", "16:00")
+# Minutes after the close before a run starts, so the day's bars and news have landed
+REFRESH_DELAY_MINUTES = int(os.getenv("REFRESH_DELAY_MINUTES", "30"))
+# Each symbol starts after a random delay of up to this many seconds, spreading API calls
+REFRESH_JITTER_SECONDS = float(os.getenv("REFRESH_JITTER_SECONDS", "300"))
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "2"))
+# Calendar days fetched before the first missing session when a symbol has no data yet
+REFRESH_LOOKBACK_DAYS = int(os.getenv("REFRESH_LOOKBACK_DAYS", "10"))
+REFRESH_STATUS_PATH = os.getenv("REFRESH_STATUS_PATH", os.path.join("data", "refresh_status.json"))
+
+
+def _iso(value):
+    return None if value is None else pd.Timestamp(value).isoformat()
+
+
+def last_closed_day(now: datetime = None):
+    # Today once its close has passed on the exchange clock, yesterday before that
+    now = now or datetime.now(ZoneInfo(REFRESH_TIMEZONE))
+    if now.time() >= dt_time.fromisoformat(REFRESH_MARKET_CLOSE):
+        return now.date()
+    return now.date() - timedelta(days=1)
+
+
+# Brings one symbol up to date after the close and leaves its serving state warm:
+#   1. fetch the sessions after the last stored one, score their news and append them
+#   2. add a placeholder for the next session and compact the journal, so the dataset
+#      does not change again before the morning
+#   3. load the ticker cache entry (incremental features) and materialize the prediction
+#      index, which includes the next-session prediction
+class SymbolRefresher:
+    def __init__(self, prediction_service, vantage_api_key: str = None, finn_api_key: str = None):
+        try:
+            self.prediction_service = prediction_service
+            self.vantage_api_key = vantage_api_key or os.getenv("vantage_api_key")
+            self.finn_api_key = finn_api_key or os.getenv("finn_api_key")
+            self._ingestion = None
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    @property
+    def ingestion(self):
+        # FinBERT is only loaded once there is news to score
+        if self._ingestion is None:
+            from src.Stock_Movement_Predicition.components.data_ingestion import DataIngestion
+            self._ingestion = DataIngestion()
+        return self._ingestion
+
+    def fetch_sessions(self, symbol: str, start, end):
+        from src.Stock_Movement_Predicition.components.market_data import MarketDataIngestion, require_frame
+        from src.Stock_Movement_Predicition.components.news_fetcher import AsyncFinnhubNewsFetcher
+
+        with span("refresh", "fetch_stock"):
+            stock_df = MarketDataIngestion().fetch_alpha_vantage_stock_data(symbol, start, end, self.vantage_api_key)
+        require_frame(stock_df, f"Alpha Vantage prices for {symbol}")
+        if stock_df.empty:
+            return None
+        with span("refresh", "fetch_news"):
+            news_df = AsyncFinnhubNewsFetcher(api_key=self.finn_api_key).fetch_dataframe(symbol, start, end)
+        if news_df.empty:
+            return None
+        return self.ingestion.merge_sentiment(stock_df, news_df)
+
+    def refresh(self, symbol: str, as_of=None):
+        try:
+            started = time.perf_counter()
+            name = f"{symbol}_full_dataset"
+            # as_of: a day whose session (if any) has closed, by default the last one closed on
+            # the exchange clock (the server's local date can be a day ahead or behind)
+            last_closed = trading_calendar.previous_session(as_of or last_closed_day(), inclusive=True)
+            next_session = trading_calendar.next_session(last_closed)
+
+            df = dataset_journal.read(name, date_column="Date")
+            stored = df.loc[df["Close"].notna(), "Date"]
+            last_stored = stored.max() if len(stored) else None
+            start = (last_stored + timedelta(days=1)) if last_stored is not None else last_closed - timedelta(days=REFRESH_LOOKBACK_DAYS)
+
+            rows, added = [], 0
+            if start <= last_closed:
+                new_rows = self.fetch_sessions(symbol, start.date(), last_closed.date())
+                if new_rows is not None and not new_rows.empty:
+                    rows.append(new_rows)
+                    added = len(new_rows)
+                    last_stored = new_rows["Date"].max()
+            if not (df["Date"] == next_session).any():
+                placeholder = pd.DataFrame({"Date": [next_session]})
+                for col in PLACEHOLDER_COLUMNS:
+                    placeholder[col] = None
+                rows.append(placeholder)
+
+            with span("refresh", "save"):
+                if rows:
+                    dataset_journal.append(name, pd.concat(rows, ignore_index=True), date_column="Date")
+                # Compacted now rather than later in the background, so the mtime the warm
+                # caches are keyed on stays valid until the next refresh
+                dataset_journal.compact(name, date_column="Date")
+
+            with span("refresh", "warm"):
+                entry = self.prediction_service.cache.get(symbol)
+                self.prediction_service.materialize(symbol, entry)
+            cached = self.prediction_service.lookup(symbol, next_session, next_session)
+
+            logger.info(f"Refreshed {symbol} through {last_closed.date()}: {added} new sessions, caches warm")
+            return {
+                "status": "succeeded",
+                "seconds": time.perf_counter() - started,
+                "sessions_added": added,
+                "last_session": _iso(last_stored),
+                "next_session": _iso(next_session),
+                "next_prediction": cached["predictions"][0] if cached and cached["predictions"] else None,
+            }
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+
+# Wakes up once per session after the close and refreshes the tracked symbols with a
+# bounded number running at a time, each after a random jitter. Blocking work runs on the
+# scheduler's own small thread pool, so refreshes never take prediction workers. Status is
+# kept in memory and mirrored to REFRESH_STATUS_PATH for a sidecar's API to read.
+class RefreshScheduler:
+    def __init__(self, refresher: SymbolRefresher = None, symbols=None, concurrency: int = REFRESH_CONCURRENCY,
+                 jitter_seconds: float = REFRESH_JITTER_SECONDS, status_path: str = REFRESH_STATUS_PATH):
+        try:
+            self.refresher = refresher
+            self.symbols = list(symbols or REFRESH_SYMBOLS)
+            self.concurrency = max(1, concurrency)
+            self.jitter_seconds = jitter_seconds
+            self.status_path = status_path
+            self.timezone = ZoneInfo(REFRESH_TIMEZONE)
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="refresh")
+            self._task = None
+            self._running = None
+            # Run started through trigger() (POST /refresh/run), kept so it is not collected
+            self._triggered = None
+            self.state = "stopped"
+            self.next_run = None
+            self.last_run = None
+            self.symbol_status = {}
+            self.runs = 0
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def tracked_symbols(self):
+        return self.symbols or model_registry.symbols()
+
+    def last_closed_day(self, now: datetime = None):
+        return last_closed_day(now or datetime.now(self.timezone))
+
+    def next_run_time(self, now: datetime = None):
+        # Close plus delay on the first session whose run time is still ahead
+        now = now or datetime.now(self.timezone)
+        close = dt_time.fromisoformat(REFRESH_MARKET_CLOSE)
+        session = trading_calendar.next_session(now.date(), inclusive=True)
+        while True:
+            run_at = datetime.combine(session.date(), close, tzinfo=self.timezone) + timedelta(minutes=REFRESH_DELAY_MINUTES)
+            if run_at > now:
+                return run_at
+            session = trading_calendar.next_session(session)
+
+    async def _refresh_one(self, symbol: str, semaphore, as_of):
+        await asyncio.sleep(random.uniform(0, self.jitter_seconds))
+        async with semaphore:
+            self.symbol_status[symbol] = {**self.symbol_status.get(symbol, {}), "status": "running", "started": _iso(datetime.now(self.timezone))}
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, self.refresher.refresh, symbol, as_of)
+            except Exception as e:
+                logger.error(f"Refresh failed for {symbol}: {e}")
+                result = {"status": "failed", "error": str(e)}
+            self.symbol_status[symbol] = {**result, "finished": _iso(datetime.now(self.timezone))}
+            self.save_status()
+
+    async def run_once(self, as_of=None):
+        # One refresh of every tracked symbol; a second call while one runs joins it
+        as_of = as_of or self.last_closed_day()
+        if self._running is not None:
+            return await asyncio.shield(self._running)
+        self._running = asyncio.ensure_future(self._run(as_of))
+        try:
+            return await asyncio.shield(self._running)
+        finally:
+            self._running = None
+
+    async def _run(self, as_of):
+        symbols = self.tracked_symbols()
+        started = datetime.now(self.timezone)
+        self.state = "running"
+        self.runs += 1
+        self.last_run = {"started": _iso(started), "finished": None, "symbols": len(symbols)}
+        self.save_status()
+        logger.info(f"Refreshing {len(symbols)} symbols, {self.concurrency} at a time")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*[self._refresh_one(symbol, semaphore, as_of) for symbol in symbols])
+
+        outcomes = [self.symbol_status.get(symbol, {}).get("status") for symbol in symbols]
+        self.last_run.update({
+            "finished": _iso(datetime.now(self.timezone)),
+            "seconds": (datetime.now(self.timezone) - started).total_seconds(),
+            "succeeded": outcomes.count("succeeded"),
+            "failed": outcomes.count("failed"),
+        })
+        self.state = "idle" if self._task is not None else "stopped"
+        self.save_status()
+        return self.last_run
+
+    async def serve(self):
+        # Sleeps until the next close-plus-delay, refreshes, repeats
+        while True:
+            self.next_run = self.next_run_time()
+            self.state = "idle"
+            self.save_status()
+            logger.info(f"Next refresh at {self.next_run.isoformat()}")
+            await asyncio.sleep(max((self.next_run - datetime.now(self.timezone)).total_seconds(), 0))
+            try:
+                await self.run_once(self.next_run.date())
+            except Exception as e:
+                logger.error(f"Refresh run failed: {e}")
+
+    def in_progress(self):
+        return self._running is not None or (self._triggered is not None and not self._triggered.done())
+
+    def trigger(self):
+        # Starts a run in the background; None when one is already in progress
+        if self.in_progress():
+            return None
+        self._triggered = asyncio.get_running_loop().create_task(self.run_once())
+        self._triggered.add_done_callback(self._log_triggered)
+        return self._triggered
+
+    @staticmethod
+    def _log_triggered(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Triggered refresh run failed: {task.exception()}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.serve())
+
+    async def stop(self):
+        # Only an instance that ran writes its status on the way out, so an API without the
+        # in-process scheduler leaves the sidecar's status file alone
+        ran = self._task is not None or self.last_run is not None
+        for task in (self._task, self._triggered):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._triggered = None
+        self.state = "stopped"
+        self.next_run = None
+        if ran:
+            self.save_status()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self):
+        return {
+            "state": self.state,
+            "next_run": _iso(self.next_run),
+            "concurrency": self.concurrency,
+            "jitter_seconds": self.jitter_seconds,
+            "tracked_symbols": self.tracked_symbols(),
+            "last_run": self.last_run,
+            "symbols": self.symbol_status,
+        }
+
+    def save_status(self):
+        try:
+            os.makedirs(os.path.dirname(self.status_path) or ".", exist_ok=True)
+            tmp_path = f"{self.status_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.status(), f, default=str)
+            os.replace(tmp_path, self.status_path)
+        except Exception as e:
+            logger.error(f"Could not write refresh status: {e}")
+
+    def load_status(self):
+        # Status written by a scheduler in another process (the sidecar)
+        if not os.path.exists(self.status_path):
+            return None
+        with open(self.status_path) as f:
+            return json.load(f)
+
+    def stats(self):
+        outcomes = [s.get("status") for s in self.symbol_status.values()]
+        return {
+            "runs": self.runs,
+            "running": int(self.state == "running"),
+            "tracked": len(self.symbol_status),
+            "succeeded": outcomes.count("succeeded"),
+            "failed": outcomes.count("failed"),
+            "last_run_seconds": (self.last_run or {}).get("seconds", 0.0),
+        }
@@ -0,0 +1,299 @@
+import os
+import sys
+import time
+import random
+import itertools
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from lightgbm import LGBMClassifier
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.exception import StockMovingPredicitionException
+from src.Stock_Movement_Predicition.pipeline.prediction_pipeline import NON_FEATURE_COLUMNS
+from src.Stock_Movement_Predicition.pipeline.orchestrator import isolated_stage
+
+TRAIN_N_SPLITS = int(os.getenv("TRAIN_N_SPLITS", "5"))
+# The most recent rows are held out of the search and only used to score the final model
+TRAIN_HOLDOUT_FRACTION = float(os.getenv("TRAIN_HOLDOUT_FRACTION", "0.2"))
+TRAIN_MAX_ROUNDS = int(os.getenv("TRAIN_MAX_ROUNDS", "1000"))
+TRAIN_EARLY_STOPPING_ROUNDS = int(os.getenv("TRAIN_EARLY_STOPPING_ROUNDS", "50"))
+# 0 evaluates the whole grid, otherwise a random sample of this many candidates
+TRAIN_SEARCH_ITER = int(os.getenv("TRAIN_SEARCH_ITER", "0"))
+
+PARAM_GRID = {
+    "num_leaves": [7, 15, 31],
+    "learning_rate": [0.03, 0.1],
+    "min_child_samples": [10, 20],
+    "colsample_bytree": [0.8, 1.0],
+}
+# Besides the usual non-features, the notebooks also left the daily label out of the inputs
+TRAIN_EXCLUDED_COLUMNS = NON_FEATURE_COLUMNS + ["sentiment_label"]
+
+
+def param_candidates(grid=PARAM_GRID, n_iter: int = TRAIN_SEARCH_ITER, seed: int = 42):
+    keys = sorted(grid)
+    candidates = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    if n_iter and n_iter < len(candidates):
+        candidates = random.Random(seed).sample(candidates, n_iter)
+    return candidates
+
+
+def build_training_matrix(final_df):
+    feature_cols = [
+        col for col in final_df.columns
+        if col not in TRAIN_EXCLUDED_COLUMNS and pd.api.types.is_numeric_dtype(final_df[col])
+    ]
+    df = final_df.dropna(subset=feature_cols + ["target"]).sort_values("Date").reset_index(drop=True)
+    X = np.ascontiguousarray(df[feature_cols].to_numpy(dtype=np.float32))
+    y = df["target"].to_numpy(dtype=np.int64)
+    return X, y, feature_cols
+
+
+def holdout_metrics(y_true, proba):
+    y_pred = (proba > 0.5).astype(int)
+    return {
+        "accuracy": float(accuracy_score(y_true, y_pred)),
+        "precision": float(precision_score(y_true, y_pred, zero_division=0)),
+        "recall": float(recall_score(y_true, y_pred, zero_division=0)),
+        "f1": float(f1_score(y_true, y_pred, zero_division=0)),
+        "auc": float(roc_auc_score(y_true, proba)) if len(np.unique(y_true)) > 1 else None,
+    }
+
+
+def training_matrix_path(symbol: str, data_dir: str = "data"):
+    return os.path.join(data_dir, f"{symbol}_train_matrix.npz")
+
+
+# Walk-forward model selection for one symbol. Every fold's train/validation matrices are
+# binned into LightGBM Datasets once and reused by all candidates, and each candidate
+# trains with early stopping on the fold's validation slice.
+class WalkForwardTrainer:
+    def __init__(self, n_splits: int = TRAIN_N_SPLITS, holdout_fraction: float = TRAIN_HOLDOUT_FRACTION,
+                 max_rounds: int = TRAIN_MAX_ROUNDS, early_stopping_rounds: int = TRAIN_EARLY_STOPPING_ROUNDS,
+                 num_threads: int = 1, seed: int = 42):
+        try:
+            self.n_splits = n_splits
+            self.holdout_fraction = holdout_fraction
+            self.max_rounds = max_rounds
+            self.early_stopping_rounds = early_stopping_rounds
+            self.num_threads = num_threads
+            self.seed = seed
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def base_params(self):
+        return {
+            "objective": "binary",
+            "metric": "auc",
+            "verbosity": -1,
+            "num_threads": self.num_threads,
+            "seed": self.seed,
+            # Bins are fixed when a cached Dataset is built, so min_data_in_leaf must stay
+            # free to vary across candidates
+            "feature_pre_filter": False,
+        }
+
+    def n_search_rows(self, n_rows: int):
+        n_search = n_rows - int(n_rows * self.holdout_fraction)
+        if n_search < (self.n_splits + 1) * 10 or n_search == n_rows:
+            raise ValueError(f"Only {n_rows} complete rows, too few for {self.n_splits} walk-forward folds")
+        return n_search
+
+    def build_folds(self, X, y):
+        # Only the search rows are split; the holdout stays unseen until the final scoring
+        n_search = self.n_search_rows(len(X))
+        folds = []
+        for train_idx, valid_idx in TimeSeriesSplit(n_splits=self.n_splits).split(X[:n_search]):
+            train_set = lgb.Dataset(X[train_idx], label=y[train_idx], params=self.base_params(), free_raw_data=False)
+            valid_set = lgb.Dataset(X[valid_idx], label=y[valid_idx], reference=train_set, free_raw_data=False)
+            train_set.construct()
+            valid_set.construct()
+            folds.append((train_set, valid_set))
+        return folds
+
+    def evaluate(self, params, folds):
+        scores, rounds = [], []
+        for train_set, valid_set in folds:
+            booster = lgb.train(
+                {**self.base_params(), **params}, train_set, num_boost_round=self.max_rounds,
+                valid_sets=[valid_set], callbacks=[lgb.early_stopping(self.early_stopping_rounds, verbose=False)],
+            )
+            scores.append(booster.best_score["valid_0"]["auc"])
+            rounds.append(booster.best_iteration or self.max_rounds)
+        return {"params": params, "cv_auc": float(np.mean(scores)), "n_estimators": int(np.median(rounds))}
+
+    def search(self, candidates, folds):
+        return [self.evaluate(params, folds) for params in candidates]
+
+    def finalize(self, X, y, feature_cols, best):
+        try:
+            n_search = self.n_search_rows(len(X))
+
+            def classifier():
+                return LGBMClassifier(n_estimators=best["n_estimators"], n_jobs=self.num_threads, random_state=self.seed,
+                                      verbose=-1, **best["params"])
+
+            X_search = pd.DataFrame(X[:n_search], columns=feature_cols)
+            X_holdout = pd.DataFrame(X[n_search:], columns=feature_cols)
+            holdout = holdout_metrics(y[n_search:], classifier().fit(X_search, y[:n_search]).predict_proba(X_holdout)[:, 1])
+
+            # The deployed model sees every row, holdout included
+            model = classifier().fit(pd.DataFrame(X, columns=feature_cols), y)
+            metrics = {
+                "cv_auc": best["cv_auc"],
+                "holdout": holdout,
+                "rows": int(len(X)),
+                "params": best["params"],
+                "n_estimators": best["n_estimators"],
+            }
+            return model, metrics
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+
+# Per worker process: the last loaded matrix and its binned folds, so search chunks of
+# the same symbol that land on the same worker skip loading and binning
+_matrix_cache = {}
+_fold_cache = {}
+
+
+def load_training_matrix(symbol: str):
+    path = training_matrix_path(symbol)
+    key = (path, os.stat(path).st_mtime_ns)
+    if key not in _matrix_cache:
+        _matrix_cache.clear()
+        with np.load(path, allow_pickle=False) as npz:
+            _matrix_cache[key] = (npz["X"], npz["y"], npz["features"].tolist())
+    return key, _matrix_cache[key]
+
+
+@isolated_stage
+def prepare_symbol(symbol: str):
+    from src.Stock_Movement_Predicition.components.data_preprocessing import FeatureEngineering
+    from src.Stock_Movement_Predicition.components.dataset_journal import dataset_journal
+
+    full_df = dataset_journal.read(f"{symbol}_full_dataset", date_column="Date")
+    final_df = FeatureEngineering().initiate_feature_engineering(full_df, symbol=symbol)
+    X, y, feature_cols = build_training_matrix(final_df)
+    WalkForwardTrainer().n_search_rows(len(X))
+
+    path = training_matrix_path(symbol)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, X=X, y=y, features=np.array(feature_cols))
+    os.replace(tmp_path, path)
+    return len(X)
+
+
+@isolated_stage
+def search_chunk(symbol: str, candidates, num_threads: int):
+    trainer = WalkForwardTrainer(num_threads=num_threads)
+    key, (X, y, _) = load_training_matrix(symbol)
+    if (key, num_threads) not in _fold_cache:
+        _fold_cache.clear()
+        _fold_cache[(key, num_threads)] = trainer.build_folds(X, y)
+    return trainer.search(candidates, _fold_cache[(key, num_threads)])
+
+
+@isolated_stage
+def finalize_symbol(symbol: str, best, num_threads: int, promote: str):
+    from src.Stock_Movement_Predicition.components.model_registry import model_registry
+
+    _, (X, y, feature_cols) = load_training_matrix(symbol)
+    model, metrics = WalkForwardTrainer(num_threads=num_threads).finalize(X, y, feature_cols, best)
+
+    current = model_registry.current(symbol)
+    current_auc = None if current is None else ((current.record.get("metrics") or {}).get("holdout") or {}).get("auc")
+    new_auc = metrics["holdout"]["auc"]
+    # if_better replaces a version whose recorded holdout AUC is lower, and a version with
+    # no recorded AUC at all (e.g. the migrated legacy pickle), which cannot be compared
+    if promote == "always":
+        do_promote, reason = True, "policy is always"
+    elif promote == "never":
+        do_promote, reason = False, "policy is never"
+    elif current is None:
+        do_promote, reason = True, "no current version"
+    elif new_auc is None:
+        do_promote, reason = False, "new holdout AUC is undefined"
+    elif current_auc is None:
+        do_promote, reason = True, f"current version {current.version} has no recorded holdout AUC"
+    elif new_auc > current_auc:
+        do_promote, reason = True, f"holdout AUC {new_auc:.3f} beats {current_auc:.3f}"
+    else:
+        do_promote, reason = False, f"holdout AUC {new_auc:.3f} does not beat current {current_auc:.3f}"
+    version = model_registry.register(symbol, model, features=feature_cols, metrics=metrics,
+                                      source="training_pipeline", promote=do_promote)
+    logger.info(f"{symbol} {version} {'promoted' if do_promote else 'not promoted'}: {reason}")
+    return {"version": version, "promoted": do_promote, "promotion_reason": reason, **metrics}
+
+
+# Trains many symbols on one process pool in three steps per symbol: build the feature
+# matrix, search hyperparameters, fit and register the winner. With fewer symbols than
+# workers each symbol's candidates are split into chunks so every core has work; with
+# many symbols each symbol is a single chunk and LightGBM runs single threaded.
+class TrainingPipeline:
+    def __init__(self, workers: int = None, promote: str = "if_better", candidates=None):
+        try:
+            if promote not in ("never", "if_better", "always"):
+                raise ValueError(f"Unknown promote policy '{promote}'")
+            self.workers = workers or os.cpu_count() or 1
+            self.promote = promote
+            self.candidates = candidates or param_candidates()
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
+
+    def chunks(self, n_symbols: int):
+        n_chunks = max(1, min(len(self.candidates), -(-self.workers // max(n_symbols, 1))))
+        return [self.candidates[i::n_chunks] for i in range(n_chunks)]
+
+    def run(self, symbols):
+        try:
+            started = time.perf_counter()
+            chunks = self.chunks(len(symbols))
+            logger.info(f"Training {len(symbols)} symbols on {self.workers} workers, "
+                        f"{len(self.candidates)} candidates in {len(chunks)} chunks per symbol")
+
+            results = {symbol: {"status": "pending", "search": []} for symbol in symbols}
+            pending_chunks = {}
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                in_flight = {pool.submit(prepare_symbol, symbol): (symbol, "prepare") for symbol in symbols}
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        symbol, step = in_flight.pop(future)
+                        try:
+                            outcome = future.result()
+                        except Exception as e:
+                            results[symbol].update(status="failed", failed_step=step, error=str(e))
+                            logger.error(f"{symbol} training failed in {step}: {e}")
+                            continue
+                        if results[symbol]["status"] == "failed":
+                            continue
+
+                        if step == "prepare":
+                            pending_chunks[symbol] = len(chunks)
+                            for chunk in chunks:
+                                in_flight[pool.submit(search_chunk, symbol, chunk, 1)] = (symbol, "search")
+                        elif step == "search":
+                            results[symbol]["search"].extend(outcome)
+                            pending_chunks[symbol] -= 1
+                            if pending_chunks[symbol] == 0:
+                                best = max(results[symbol]["search"], key=lambda r: r["cv_auc"])
+                                in_flight[pool.submit(finalize_symbol, symbol, best, 1, self.promote)] = (symbol, "finalize")
+                        else:
+                            results[symbol].update(status="succeeded", **outcome)
+                            logger.info(f"{symbol} trained: cv_auc {outcome['cv_auc']:.3f}, holdout auc "
+                                        f"{outcome['holdout']['auc']}, version {outcome['version']}"
+                                        f"{' promoted' if outcome['promoted'] else ''}")
+
+            return {
+                "wall_seconds": time.perf_counter() - started,
+                "succeeded": [s for s, r in results.items() if r["status"] == "succeeded"],
+                "failed": {s: {"step": r["failed_step"], "error": r["error"]} for s, r in results.items() if r["status"] == "failed"},
+                "symbols": results,
+            }
+        except Exception as e:
+            raise StockMovingPredicitionException(e, sys)
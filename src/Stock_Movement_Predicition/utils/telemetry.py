@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Histogram, Gauge, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+
+# ?profile=1 on /predict is refused with 403 unless this is 1. Off by default: profiled
+# requests skip coalescing and return stacks with internal file paths.
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram(
+    "stock_stage_seconds", "Time spent in one stage of the prediction or ingestion pipeline",
+    ["pipeline", "stage"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "stock_http_request_seconds", "HTTP request latency by route and status code",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("stock_http_requests_in_progress", "HTTP requests being handled")
+
+# Spans of the current trace, when one is active (see trace())
+_current_trace = ContextVar("stock_trace", default=None)
+
+
+@contextmanager
+def span(pipeline: str, stage: str):
+    # Times one stage into stock_stage_seconds, and into the active trace if there is one
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(pipeline, stage).observe(elapsed)
+        spans = _current_trace.get()
+        if spans is not None:
+            spans.append({"pipeline": pipeline, "stage": stage, "ms": elapsed * 1000})
+
+
+@contextmanager
+def trace():
+    # Collects the spans recorded in this thread/context while the block runs
+    spans = []
+    token = _current_trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_trace.reset(token)
+
+
+def summarize_spans(spans):
+    # Total milliseconds per stage
+    totals = {}
+    for s in spans:
+        totals[s["stage"]] = totals.get(s["stage"], 0.0) + s["ms"]
+    return totals
+
+
+# Samples the Python stack of the thread that enters it from a background thread and
+# aggregates the samples as folded stacks ("outer;inner;leaf count" per line), the input
+# format of flamegraph.pl, speedscope and inferno
+class SamplingProfiler:
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._sampler.join()
+        self.seconds = time.perf_counter() - self._started
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+                self.samples += 1
+
+    def folded(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def profile_call(fn, *args):
+    # Runs fn(*args) under a trace and the sampling profiler; returns (result, profile)
+    with trace() as spans, SamplingProfiler() as profiler:
+        result = fn(*args)
+    return result, {
+        "seconds": profiler.seconds,
+        "interval_ms": profiler.interval * 1000,
+        "samples": profiler.samples,
+        "spans": spans,
+        "folded": profiler.folded(),
+    }
+
+
+# Exposes the numeric fields of components' stats() dicts (cache hits and hit rates,
+# queue depths, ...) as gauges, read at scrape time
+class StatsCollector:
+    def __init__(self):
+        self.sources = {}
+
+    def register(self, name: str, stats_fn):
+        self.sources[name] = stats_fn
+
+    def collect(self):
+        for name, stats_fn in self.sources.items():
+            try:
+                stats = stats_fn()
+            except Exception:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauge = GaugeMetricFamily(f"stock_{name}_{key}", f"{key} from {name}.stats()")
+                    gauge.add_metric([], float(value))
+                    yield gauge
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def register_stats(name: str, stats_fn):
+    stats_collector.register(name, stats_fn)
+
+
+def metrics_payload():
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,57 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from src.Stock_Movement_Predicition.components.dataset_store import NpyDatasetStore, MANIFEST_FILE, VERSION_PREFIX
+from src.Stock_Movement_Predicition.components.dataset_journal import DatasetJournal
+
+
+def make_frame(rows: int):
+    return pd.DataFrame({"Date": pd.bdate_range("2024-01-01", periods=rows), "Close": np.arange(rows, dtype=float)})
+
+
+def test_csv_is_migrated_once_under_the_journal(tmp_path):
+    make_frame(80).to_csv(tmp_path / "X.csv", index=False)
+    store = NpyDatasetStore(str(tmp_path))
+    # Reading the store directly does not migrate
+    assert len(store.read("X")) == 80
+    assert store.needs_migration("X")
+
+    journal = DatasetJournal(store)
+    first = journal.mtime("X")
+    assert journal.mtime("X") == first
+    assert not (tmp_path / "X.csv").exists()
+    assert (tmp_path / "X.csv.migrated").exists()
+    assert not store.needs_migration("X")
+    assert len(store.read("X")) == 80
+
+
+def test_reads_during_writes_see_a_whole_version(tmp_path):
+    store = NpyDatasetStore(str(tmp_path))
+    short, long = make_frame(50), make_frame(80)
+    store.write("X", short)
+    stop = threading.Event()
+    seen, errors = set(), []
+
+    def read():
+        while not stop.is_set():
+            try:
+                seen.add(len(store.read("X")))
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for i in range(60):
+        store.write("X", long if i % 2 else short)
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert not errors, errors[0]
+    assert seen <= {50, 80}
+    # Only the current and the previous version are kept
+    entries = os.listdir(tmp_path / "X")
+    assert MANIFEST_FILE in entries
+    assert len([entry for entry in entries if entry.startswith(VERSION_PREFIX)]) <= 2
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.Stock_Movement_Predicition.components.feature_graph import feature_graph
+from src.Stock_Movement_Predicition.components.panel import Panel
+from src.Stock_Movement_Predicition.components.panel_features import panel_features
+
+# Same tolerance the README documents for FEATURE_BACKEND=numpy
+TOLERANCE = 1e-9
+
+
+def make_frame(seed: int, days: int = 300, start: str = "2023-01-02"):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start=start, periods=days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, days)))
+    open_ = close * (1 + rng.normal(0, 0.005, days))
+    return pd.DataFrame({
+        "Date": dates,
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, days)),
+        "Low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, days)),
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, days).astype(float),
+        "sentiment_score": rng.uniform(-1, 1, days),
+    })
+
+
+def assert_parity(df):
+    report = feature_graph.parity(df, rtol=TOLERANCE, atol=TOLERANCE)
+    assert report
+    failures = {column: result for column, result in report.items() if not result["ok"]}
+    assert not failures, failures
+
+
+def test_parity_on_complete_history():
+    assert_parity(make_frame(0))
+
+
+def test_parity_with_nan_gaps():
+    df = make_frame(1)
+    # Placeholder rows (no prices, no news) and days without news
+    df.loc[[40, 41, 120, 250], ["Open", "High", "Low", "Close", "Volume", "sentiment_score"]] = np.nan
+    df.loc[df.index % 7 == 3, "sentiment_score"] = np.nan
+    assert_parity(df)
+
+
+def test_parity_on_short_history():
+    # Fewer rows than the longest window (MACD's 26-day EMA) leaves whole columns NaN
+    assert_parity(make_frame(2, days=20))
+
+
+def assert_panel_matches_per_symbol_features(frames):
+    panel = panel_features(Panel.from_frames(frames))
+    for symbol, df in frames.items():
+        expected = feature_graph.compute(df.copy(), backend="pandas")
+        actual = panel.frame(symbol)
+        assert len(actual) == len(expected)
+        for column in expected.columns.difference(df.columns):
+            if not panel.has(column):
+                continue
+            want = expected[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            got = actual[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            np.testing.assert_array_equal(np.isnan(got), np.isnan(want), err_msg=f"{symbol} {column} NaN positions")
+            np.testing.assert_allclose(got, want, rtol=TOLERANCE, atol=TOLERANCE, equal_nan=True,
+                                       err_msg=f"{symbol} {column}")
+
+
+def test_panel_matches_per_symbol_features_for_a_late_listing():
+    early = make_frame(3)
+    late = make_frame(4, days=200, start=str(early["Date"].iloc[100].date()))
+    assert_panel_matches_per_symbol_features({"EARLY": early, "LATE": late})
+
+
+def test_panel_matches_per_symbol_features_with_gaps():
+    # Days dropped from one symbol's dataset (e.g. no news that day) are holes on the
+    # shared calendar but not rows of that symbol
+    full = make_frame(6)
+    one_gap = make_frame(7).drop(index=[150]).reset_index(drop=True)
+    many_gaps = make_frame(8).drop(index=[3, 30, 31, 32, 120, 298]).reset_index(drop=True)
+    late_and_gapped = make_frame(9, days=200, start=str(full["Date"].iloc[60].date())).drop(index=[0, 10, 11]).reset_index(drop=True)
+    assert_panel_matches_per_symbol_features({
+        "FULL": full, "ONE_GAP": one_gap, "MANY_GAPS": many_gaps, "LATE_AND_GAPPED": late_and_gapped,
+    })
+
+
+@pytest.mark.parametrize("column", ["RSI", "MACD", "bollinger_h", "volatility"])
+def test_parity_detects_a_divergence(column, monkeypatch):
+    # The guard itself must fail when a kernel drifts
+    from src.Stock_Movement_Predicition.components import feature_graph as graph_module
+
+    kernel = graph_module.INDICATORS[column]
+    monkeypatch.setitem(graph_module.INDICATORS, column, lambda array: kernel(array) * (1 + 1e-6))
+    report = feature_graph.parity(make_frame(5), rtol=TOLERANCE, atol=TOLERANCE)
+    assert not report[column]["ok"]
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.Stock_Movement_Predicition.components import incremental_feature_engineering as ife
+from src.Stock_Movement_Predicition.components.data_preprocessing import FeatureEngineering
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "sentiment_score"]
+
+
+def make_frame(seed: int = 0, days: int = 260):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, days)))
+    open_ = close * (1 + rng.normal(0, 0.005, days))
+    return pd.DataFrame({
+        "Date": pd.bdate_range(start="2024-01-02", periods=days),
+        "Open": open_,
+        "High": np.maximum(open_, close) * 1.01,
+        "Low": np.minimum(open_, close) * 0.99,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, days).astype(float),
+        "sentiment_score": rng.uniform(-1, 1, days),
+    })
+
+
+def with_placeholder(df, row: int):
+    # What /predict journals for a session that has no data yet
+    df = df.copy()
+    df.loc[row, PRICE_COLUMNS] = np.nan
+    return df
+
+
+def assert_identical(actual, df):
+    expected = FeatureEngineering().add_features(df.copy())
+    assert list(actual.columns) == list(expected.columns)
+    assert len(actual) == len(expected)
+    for column in expected.columns:
+        if expected[column].dtype.kind in "fiub":
+            np.testing.assert_array_equal(actual[column].to_numpy(dtype=np.float64),
+                                          expected[column].to_numpy(dtype=np.float64), err_msg=column)
+        else:
+            assert actual[column].tolist() == expected[column].tolist(), column
+
+
+@pytest.fixture
+def engineering(tmp_path, monkeypatch):
+    monkeypatch.setattr(ife, "FEATURE_TAIL_ROWS", 16)
+    return ife.IncrementalFeatureEngineering(state_dir=str(tmp_path))
+
+
+def test_appended_rows_match_a_full_recompute(engineering):
+    df = make_frame()
+    engineering.initiate_incremental_feature_engineering(df.iloc[:200].copy(), "TEST")
+    # Crosses several folds of the tail into the base file
+    for n in range(203, len(df) + 1, 3):
+        assert_identical(engineering.initiate_incremental_feature_engineering(df.iloc[:n].copy(), "TEST"), df.iloc[:n])
+
+
+def test_replaced_placeholder_matches_a_full_recompute(engineering):
+    df = make_frame()
+    # The next session is journaled as a placeholder and engineered
+    engineering.initiate_incremental_feature_engineering(with_placeholder(df, len(df) - 1), "TEST")
+    # The refresh then replaces it with the real row: same row count, different content
+    result = engineering.initiate_incremental_feature_engineering(df.copy(), "TEST")
+    assert_identical(result, df)
+    assert not np.isnan(result["target"].iloc[-2])
+
+
+def test_replaced_placeholder_inside_the_tail_matches_a_full_recompute(engineering):
+    df = make_frame()
+    engineering.initiate_incremental_feature_engineering(df.iloc[:240].copy(), "TEST")
+    gapped = with_placeholder(df.iloc[:250], 244)
+    engineering.initiate_incremental_feature_engineering(gapped.copy(), "TEST")
+    assert_identical(engineering.initiate_incremental_feature_engineering(df.iloc[:252].copy(), "TEST"), df.iloc[:252])
+
+
+def test_changed_history_before_the_checkpoint_is_recomputed(engineering):
+    df = make_frame()
+    engineering.initiate_incremental_feature_engineering(with_placeholder(df, 50), "TEST")
+    assert_identical(engineering.initiate_incremental_feature_engineering(df.copy(), "TEST"), df)
@@ -0,0 +1,200 @@
+import time
+import uuid
+import asyncio
+import threading
+from datetime import date, datetime, timedelta, timezone
+import pytest
+from aiohttp import web
+from src.Stock_Movement_Predicition.components import news_fetcher
+from src.Stock_Movement_Predicition.components.news_fetcher import AsyncFinnhubNewsFetcher, NewsResponseCache
+
+ARTICLES_PER_DAY = 2
+
+
+def published(day: date, hour: int = 14):
+    return int(datetime(day.year, day.month, day.day, hour, tzinfo=timezone.utc).timestamp())
+
+
+# Stand-in for the company-news endpoint: ARTICLES_PER_DAY articles per day of the
+# requested range. `fail` maps a request number (1-based) to the response it gets
+# instead, e.g. (429, "0") for a rate limit with Retry-After: 0.
+class StubFinnhub:
+    def __init__(self, fail=None, articles=None):
+        self.fail = fail or {}
+        self.articles = articles
+        self.requests = []
+
+    async def handle(self, request):
+        start = date.fromisoformat(request.query["from"])
+        end = date.fromisoformat(request.query["to"])
+        self.requests.append((time.monotonic(), start, end))
+        failure = self.fail.get(len(self.requests))
+        if failure is not None:
+            status, retry_after = failure
+            return web.json_response({"error": "stub"}, status=status,
+                                     headers={"Retry-After": retry_after} if retry_after is not None else None)
+        if self.articles is not None:
+            return web.json_response(self.articles(start, end))
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return web.json_response([
+            {"id": f"{day.isoformat()}-{n}", "datetime": published(day), "headline": "h", "summary": "s"}
+            for day in days for n in range(ARTICLES_PER_DAY)
+        ])
+
+    def ranges(self):
+        return [(start, end) for _, start, end in self.requests]
+
+
+def run_fetch(stub, cache_dir, start: date, end: date, api_key: str = None, **fetcher_kwargs):
+    # Each test gets its own key, so it does not share a rate limit with the others
+    api_key = api_key or uuid.uuid4().hex
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/news", stub.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            fetcher = AsyncFinnhubNewsFetcher(api_key=api_key, base_url=f"http://127.0.0.1:{port}/news",
+                                              cache=NewsResponseCache(str(cache_dir)), **fetcher_kwargs)
+            return fetcher, await fetcher.fetch("TEST", start, end)
+        finally:
+            await runner.cleanup()
+    return asyncio.run(main())
+
+
+# The stub served from its own thread and event loop, for fetchers running in other threads
+class StubServerThread:
+    def __init__(self, stub):
+        self.stub = stub
+        self.started = threading.Event()
+
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+        self.started.wait(10)
+        return f"http://127.0.0.1:{self.port}/news"
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_get("/news", self.stub.handle)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.started.set()
+        self.loop.run_forever()
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(10)
+
+
+START = date(2024, 3, 4)
+
+
+def test_token_bucket_paces_requests(tmp_path):
+    stub = StubFinnhub()
+    # Burst of 2, then (600 - 2) / 60 calls per second
+    fetcher, articles = run_fetch(stub, tmp_path, START, START + timedelta(days=6),
+                                  calls_per_minute=600, burst=2, range_days=1)
+    assert len(articles) == 7 * ARTICLES_PER_DAY
+    times = sorted(t for t, _, _ in stub.requests)
+    assert len(times) == 7
+    # Five calls beyond the burst at ~10 per second
+    assert times[-1] - times[0] >= 5 / ((600 - 2) / 60) * 0.9
+
+
+def test_fetchers_sharing_a_key_share_its_rate_limit(tmp_path):
+    # Two fetch threads (like the orchestrator's fetch workers) with the same key: burst
+    # of 2, then (600 - 2) / 60 calls per second between them
+    stub = StubFinnhub()
+    api_key = uuid.uuid4().hex
+    results = {}
+
+    def fetch(name, symbol):
+        fetcher = AsyncFinnhubNewsFetcher(api_key=api_key, base_url=url, calls_per_minute=600, burst=2, range_days=1,
+                                          cache=NewsResponseCache(str(tmp_path / name)))
+        results[name] = fetcher.fetch_dataframe(symbol, START, START + timedelta(days=6))
+
+    with StubServerThread(stub) as url:
+        threads = [threading.Thread(target=fetch, args=(name, name.upper())) for name in ("a", "b")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+    assert all(len(df) == 7 * ARTICLES_PER_DAY for df in results.values())
+    times = sorted(t for t, _, _ in stub.requests)
+    assert len(times) == 14
+    # Twelve calls beyond the burst, not six per fetcher
+    assert times[-1] - times[0] >= 12 / ((600 - 2) / 60) * 0.9
+    # No 60 / 600 second window holds more than burst + 1 calls
+    window = 60 / 600
+    assert max(sum(1 for u in times if t <= u < t + window) for t in times) <= 3
+
+
+def test_429_is_retried_after_retry_after(tmp_path):
+    stub = StubFinnhub(fail={1: (429, "0"), 2: (503, None)})
+    fetcher, articles = run_fetch(stub, tmp_path, START, START + timedelta(days=2),
+                                  calls_per_minute=6000, burst=10, range_days=7, max_retries=3)
+    assert len(articles) == 3 * ARTICLES_PER_DAY
+    assert fetcher.requests_made == 3
+    assert stub.ranges() == [(START, START + timedelta(days=2))] * 3
+
+
+def test_saturated_range_is_split(tmp_path, monkeypatch):
+    # Seven days of two articles saturate a limit of three, so the range is halved down to
+    # single days
+    monkeypatch.setattr(news_fetcher, "FINNHUB_RANGE_SATURATION", 3)
+    stub = StubFinnhub()
+    fetcher, articles = run_fetch(stub, tmp_path, START, START + timedelta(days=6),
+                                  calls_per_minute=6000, burst=10, range_days=7)
+    assert sorted(a["id"] for a in articles) == sorted(
+        f"{(START + timedelta(days=i)).isoformat()}-{n}" for i in range(7) for n in range(ARTICLES_PER_DAY))
+    assert stub.ranges()[0] == (START, START + timedelta(days=6))
+    single_days = {start for start, end in stub.ranges() if start == end}
+    assert single_days == {START + timedelta(days=i) for i in range(7)}
+
+
+def test_interrupted_fetch_resumes_from_the_cache(tmp_path):
+    # Second range fails for good on the first run
+    stub = StubFinnhub(fail={2: (500, None)})
+    with pytest.raises(Exception, match="500"):
+        run_fetch(stub, tmp_path, START, START + timedelta(days=13), calls_per_minute=6000, burst=1,
+                  range_days=7, max_concurrency=1, max_retries=0)
+    assert stub.ranges()[0] == (START, START + timedelta(days=6))
+
+    stub = StubFinnhub()
+    fetcher, articles = run_fetch(stub, tmp_path, START, START + timedelta(days=13),
+                                  calls_per_minute=6000, burst=10, range_days=7)
+    assert stub.ranges() == [(START + timedelta(days=7), START + timedelta(days=13))]
+    assert len(articles) == 14 * ARTICLES_PER_DAY
+
+    stub = StubFinnhub()
+    run_fetch(stub, tmp_path, START, START + timedelta(days=13), calls_per_minute=6000, burst=10, range_days=7)
+    assert stub.requests == []
+
+
+def test_articles_are_labelled_by_publish_day_within_the_range(tmp_path):
+    # 23:30 UTC stays on its UTC day inside a range; an article Finnhub returns from before
+    # the range stays on the first queried day, as with one call per day
+    late = START + timedelta(days=1)
+    stub = StubFinnhub(articles=lambda start, end: [
+        {"id": "late", "datetime": int(datetime(late.year, late.month, late.day, 23, 30, tzinfo=timezone.utc).timestamp())},
+        {"id": "early", "datetime": published(start - timedelta(days=1), hour=22)},
+    ])
+    _, articles = run_fetch(stub, tmp_path / "range", START, START + timedelta(days=2),
+                            calls_per_minute=6000, burst=10, range_days=7)
+    labels = {a["id"]: a["fetched_date"] for a in articles}
+    assert labels == {"late": late.isoformat(), "early": START.isoformat()}
+
+    _, articles = run_fetch(stub, tmp_path / "daily", late, late, calls_per_minute=6000, burst=10, range_days=1)
+    assert {a["fetched_date"] for a in articles} == {late.isoformat()}
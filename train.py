@@ -0,0 +1,34 @@
+import sys
+import json
+import argparse
+from src.Stock_Movement_Predicition.logging import logger
+from src.Stock_Movement_Predicition.pipeline.orchestrator import load_symbols
+from src.Stock_Movement_Predicition.pipeline.training_pipeline import TrainingPipeline, param_candidates
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Walk-forward training and registration of per-symbol LightGBM models")
+    parser.add_argument("--symbols", nargs="*", default=None, help="Symbols to train, e.g. AAPL MSFT")
+    parser.add_argument("--symbols-file", default=None, help="File with one symbol per line (or comma separated)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to all cores)")
+    parser.add_argument("--search-iter", type=int, default=None, help="Random sample of this many grid candidates")
+    parser.add_argument("--promote", default="if_better", choices=["never", "if_better", "always"],
+                        help="When to make the new version current in the model registry")
+    parser.add_argument("--summary-path", default=None, help="Write the run summary as JSON to this path")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    symbols = load_symbols(args.symbols, args.symbols_file) or ['AAPL']
+
+    candidates = param_candidates(n_iter=args.search_iter) if args.search_iter else None
+    summary = TrainingPipeline(workers=args.workers, promote=args.promote, candidates=candidates).run(symbols)
+    logger.info(f"Training Completed in {summary['wall_seconds']:.1f}s: {len(summary['succeeded'])} succeeded, {len(summary['failed'])} failed")
+    for failed_symbol, failure in summary["failed"].items():
+        logger.info(f"{failed_symbol} failed in {failure['step']}: {failure['error']}")
+
+    if args.summary_path:
+        with open(args.summary_path, "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+    sys.exit(1 if summary["failed"] else 0)